@@ -0,0 +1,323 @@
+# ============================================================
+# BENCHMARK HARNESS
+# ============================================================
+# Times and memory-profiles every public pipeline function on synthetic
+# data (benchmarks/synthetic.py) at one or more sizes:
+#
+#   python -m benchmarks.run --sizes 10k 1m
+#   python -m benchmarks.run --sizes 10k --only transform analyze
+#   python -m benchmarks.run --sizes 10k 1m --save-baseline
+#
+# - time:   best of --repeat runs (perf_counter), setup excluded
+# - memory: tracemalloc peak of one extra run (Python/NumPy/pandas heap;
+#           Arrow's own memory pool is not traced)
+# - results go to benchmarks/results/latest.json; with --save-baseline
+#   they also become benchmarks/results/baseline.json
+# - every case is compared against the baseline; a case is flagged when
+#   it is slower (or uses more memory) by more than --tolerance, above a
+#   small absolute noise floor. Any regression makes the exit code 1.
+#
+# Writers and plots run inside a temporary working directory, so the
+# real data/processed and plots/ outputs are never touched.
+# ============================================================
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import dataset_path, parse_rows
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+LATEST_PATH = os.path.join(RESULTS_DIR, "latest.json")
+
+TIME_FLOOR_S = 0.005
+MEMORY_FLOOR_MB = 1.0
+
+TASKS = [
+    {"type": "bar", "x": "Location", "y": "Total Spent"},
+    {"type": "line", "x": "Transaction Date", "y": "Total Spent"},
+    {"type": "hist", "col": "Total Spent", "bins": 10},
+]
+
+
+class Case:
+    """
+    One benchmark: setup(ctx) builds the arguments (not timed),
+    run(*args) is the measured call. Cases above max_rows are skipped
+    (e.g. the per-row fallbacks at 10M rows).
+    """
+
+    def __init__(self, group, name, run, setup=None, max_rows=None):
+        self.group = group
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda ctx: (ctx.cleaned,))
+        self.max_rows = max_rows
+
+
+class Context:
+    """Inputs shared by the cases of one size, built once."""
+
+    def __init__(self, raw_path: str):
+        from src.load_data import load_csv, CAFE_SALES_SCHEMA
+        from src.clean_data import auto_handle_missing, repair_sales_consistency
+
+        self.raw_path = os.path.abspath(raw_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.raw = load_csv(self.raw_path, schema=CAFE_SALES_SCHEMA)
+            self.cleaned = auto_handle_missing(repair_sales_consistency(self.raw)[0])
+        self.rows = len(self.raw)
+
+
+def _cases():
+    """The benchmark registry (imports kept local so --help stays fast)."""
+    # import_module: src/__init__ re-exports a load_data *function*
+    ld, cd, td, ad, od, vd = (importlib.import_module(f"src.{name}") for name in (
+        "load_data", "clean_data", "transform_data", "analyze_data", "output_data", "visualize_data"))
+    col = td.col
+
+    def raw_copy(ctx):
+        return (ctx.raw.copy(),)
+
+    def chunks(df, size=100_000):
+        return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+    cases = [
+        # ---- load ----
+        Case("load", "load_csv[c]", lambda p: ld.load_csv(p, schema=ld.CAFE_SALES_SCHEMA),
+             setup=lambda ctx: (ctx.raw_path,)),
+        Case("load", "load_csv[pyarrow]",
+             lambda p: ld.load_csv(p, schema=ld.CAFE_SALES_SCHEMA, engine="pyarrow"),
+             setup=lambda ctx: (ctx.raw_path,)),
+        Case("load", "iter_csv", lambda p: sum(len(c) for c in ld.iter_csv(p, schema=ld.CAFE_SALES_SCHEMA)),
+             setup=lambda ctx: (ctx.raw_path,)),
+
+        # ---- clean ----
+        Case("clean", "repair_sales_consistency", cd.repair_sales_consistency, setup=raw_copy),
+        Case("clean", "auto_handle_missing", cd.auto_handle_missing, setup=raw_copy),
+        Case("clean", "MissingValueImputer.fit", lambda df: cd.MissingValueImputer().fit(df),
+             setup=lambda ctx: (ctx.raw,)),
+        Case("clean", "remove_missing", cd.remove_missing, setup=lambda ctx: (ctx.raw,)),
+        Case("clean", "fill_missing", cd.fill_missing,
+             setup=lambda ctx: (ctx.raw, {"Quantity": 0, "Total Spent": 0.0})),
+
+        # ---- transform ----
+        Case("transform", "filter_rows[expr]", td.filter_rows,
+             setup=lambda ctx: (ctx.cleaned, (col("Location") == "Takeaway") & (col("Total Spent") > 10))),
+        Case("transform", "filter_rows[callable]", td.filter_rows, max_rows=100_000,
+             setup=lambda ctx: (ctx.cleaned, lambda row: row["Total Spent"] > 10)),
+        Case("transform", "add_new_column[expr]", td.add_new_column,
+             setup=lambda ctx: (ctx.cleaned.copy(), "Revenue", col("Quantity") * col("Price Per Unit"))),
+        Case("transform", "standardize_date_column", td.standardize_date_column,
+             setup=lambda ctx: (pd.DataFrame({"d": ctx.cleaned["Transaction Date"].dt.strftime("%m/%d/%Y")}),
+                                "d")),
+        Case("transform", "group_by", td.group_by,
+             setup=lambda ctx: (ctx.cleaned, ["Location", "Item"],
+                                {"Total Spent": ["sum", "mean", "std"], "Quantity": ["max", "nunique"]})),
+        Case("transform", "aggregate_data", td.aggregate_data,
+             setup=lambda ctx: (ctx.cleaned, "Item", "Total Spent", "mean")),
+        Case("transform", "sort_data", td.sort_data,
+             setup=lambda ctx: (ctx.cleaned, ["Transaction Date", "Total Spent"], [True, False])),
+        Case("transform", "external_sort",
+             lambda parts: sum(len(b) for b in td.external_sort(parts, "Total Spent")),
+             setup=lambda ctx: (chunks(ctx.cleaned),)),
+        Case("transform", "sort_csv", lambda p: td.sort_csv(p, "sorted.csv", "Transaction ID"),
+             setup=lambda ctx: (ctx.raw_path,)),
+
+        # ---- analyze ----
+        Case("analyze", "get_missing_report", ad.get_missing_report, setup=lambda ctx: (ctx.raw,)),
+        Case("analyze", "summary_statistics", ad.summary_statistics),
+        Case("analyze", "summary_statistics[approx]", lambda df: ad.summary_statistics(df, approx_distinct=True)),
+        Case("analyze", "correlation_matrix", ad.correlation_matrix),
+        Case("analyze", "correlation_analysis", ad.correlation_analysis,
+             setup=lambda ctx: (ctx.cleaned, "Quantity", "Total Spent")),
+        Case("analyze", "dataset_overview", ad.dataset_overview),
+        Case("analyze", "detect_outliers", ad.detect_outliers, setup=lambda ctx: (ctx.cleaned, "Total Spent")),
+        Case("analyze", "detect_outliers_iqr", ad.detect_outliers_iqr),
+        Case("analyze", "iqr_bounds", ad.iqr_bounds),
+        Case("analyze", "quantile_sketches", ad.quantile_sketches, setup=lambda ctx: (chunks(ctx.cleaned),)),
+        Case("analyze", "flag_outliers", ad.flag_outliers,
+             setup=lambda ctx: (ctx.cleaned, ad.iqr_bounds(ctx.cleaned))),
+
+        # ---- writers ----
+        Case("output", "save_csv", od.save_csv, setup=lambda ctx: (ctx.cleaned, "bench.csv")),
+        Case("output", "save_json", od.save_json, setup=lambda ctx: (ctx.cleaned, "bench.json")),
+        Case("output", "save_parquet", od.save_parquet, setup=lambda ctx: (ctx.cleaned, "bench.parquet")),
+        Case("output", "save_feather", od.save_feather, setup=lambda ctx: (ctx.cleaned, "bench.feather")),
+        Case("output", "save_sql", od.save_sql, max_rows=1_000_000,
+             setup=lambda ctx: (ctx.cleaned, os.path.abspath("bench.db"), "sales", "replace")),
+    ]
+
+    # ---- plots: reduce + render, and the legacy full-data plot functions ----
+    for task in TASKS:
+        kind = task["type"]
+        cases.append(Case("plot", f"prepare_plot_data[{kind}]", vd.prepare_plot_data,
+                          setup=lambda ctx, task=task: (ctx.cleaned, task)))
+        cases.append(Case("plot", f"render_prepared[{kind}]", vd.render_prepared,
+                          setup=lambda ctx, task=task: (vd.prepare_plot_data(ctx.cleaned, task),)))
+
+    def legacy(fn):
+        def run(*args):
+            import matplotlib.pyplot as plt
+            plt.close(fn(*args, show=False))
+        return run
+
+    cases += [
+        Case("plot", "plot_bar", legacy(vd.plot_bar), max_rows=100_000,
+             setup=lambda ctx: (ctx.cleaned, "Location", "Total Spent")),
+        Case("plot", "plot_line", legacy(vd.plot_line), max_rows=10_000,
+             setup=lambda ctx: (ctx.cleaned, "Transaction Date", "Total Spent")),
+        Case("plot", "plot_histogram", legacy(vd.plot_histogram), max_rows=100_000,
+             setup=lambda ctx: (ctx.cleaned, "Total Spent", 10)),
+    ]
+    return cases
+
+
+def measure(case: Case, ctx: Context, repeat: int) -> dict:
+    """Best wall time over `repeat` runs, then one traced run for the memory peak."""
+    times = []
+    sink = io.StringIO()
+    for _ in range(repeat):
+        args = case.setup(ctx)
+        with contextlib.redirect_stdout(sink):
+            start = time.perf_counter()
+            case.run(*args)
+            times.append(time.perf_counter() - start)
+        sink.seek(0)
+        sink.truncate()
+
+    args = case.setup(ctx)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(sink):
+            case.run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(times)
+    return {
+        "seconds": round(seconds, 6),
+        "peak_mb": round(peak / 1e6, 2),
+        "rows": ctx.rows,
+        "rows_per_second": round(ctx.rows / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """[(key, metric, baseline, current, ratio)] for every regression beyond tolerance."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, floor in (("seconds", TIME_FLOOR_S), ("peak_mb", MEMORY_FLOOR_MB)):
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append((key, metric, old, new, new / old if old else float("inf")))
+    return regressions
+
+
+def _metadata() -> dict:
+    import pyarrow
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pyarrow.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic cafe-sales data")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="e.g. 10k 1m 10m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="groups or case names to run (substring match)")
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="timed runs per case (default: 3 up to 100k rows, else 1)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown / memory growth vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    cases = [c for c in _cases()
+             if not args.only or any(o in c.group or o in c.name for o in args.only)]
+    results = {}
+
+    for size in args.sizes:
+        rows = parse_rows(size)
+        raw_path = os.path.abspath(dataset_path(rows, args.seed))
+        repeat = args.repeat or (3 if rows <= 100_000 else 1)
+        with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                ctx = Context(raw_path)
+                print(f"\n===== {rows:,} rows ({repeat} timed run(s) per case) =====")
+                for case in cases:
+                    if case.max_rows is not None and rows > case.max_rows:
+                        print(f"  {case.group:<10} {case.name:<32} skipped (> {case.max_rows:,} rows)")
+                        continue
+                    result = measure(case, ctx, repeat)
+                    results[f"{rows}/{case.group}/{case.name}"] = result
+                    print(f"  {case.group:<10} {case.name:<32} {result['seconds']:9.4f}s  "
+                          f"peak {result['peak_mb']:9.2f} MB")
+            finally:
+                os.chdir(cwd)
+
+    report = {"meta": _metadata(), "results": results}
+    with open(LATEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[INFO] Results saved → {LATEST_PATH}")
+
+    status = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            status = 1
+            print(f"[WARN] {len(regressions)} regression(s) vs. {args.baseline}:")
+            for key, metric, old, new, ratio in regressions:
+                print(f"  {key:<50} {metric:<8} {old:>10} → {new:<10} (x{ratio:.2f})")
+        else:
+            print(f"[OK] No regressions vs. {args.baseline} (tolerance {args.tolerance:.0%})")
+    else:
+        print(f"[INFO] No baseline at {args.baseline}; run with --save-baseline to create one")
+
+    if args.save_baseline:
+        baseline = {"meta": report["meta"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+            baseline["meta"] = report["meta"]
+        baseline["results"].update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"[SUCCESS] Baseline saved → {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
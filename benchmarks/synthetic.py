@@ -0,0 +1,147 @@
+# ============================================================
+# SYNTHETIC CAFE-SALES GENERATOR
+# ============================================================
+# Writes CSV files with the schema and dirt profile of
+# data/raw/dirty_cafe_sales.csv at any size:
+#
+#   python -m benchmarks.synthetic --rows 1m --out benchmarks/data/cafe_1m.csv
+#
+# - same columns, item → price table, value sets and date range (2023)
+# - per column, the measured share of empty cells and of the
+#   'ERROR' / 'UNKNOWN' tokens (DIRT_PROFILE)
+# - unique Transaction IDs, generated chunk by chunk so 10M rows never
+#   sit in memory at once
+# - fully determined by the seed
+# ============================================================
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+ITEM_PRICES = {
+    "Coffee": 2.0, "Tea": 1.5, "Sandwich": 4.0, "Salad": 5.0,
+    "Cake": 3.0, "Cookie": 1.0, "Smoothie": 4.0, "Juice": 3.0,
+}
+PAYMENT_METHODS = ["Digital Wallet", "Credit Card", "Cash"]
+LOCATIONS = ["Takeaway", "In-store"]
+DATE_RANGE = ("2023-01-01", "2023-12-31")
+
+# column -> (empty, 'ERROR', 'UNKNOWN') share, measured on dirty_cafe_sales.csv
+DIRT_PROFILE = {
+    "Item": (0.0333, 0.0292, 0.0344),
+    "Quantity": (0.0138, 0.0170, 0.0171),
+    "Price Per Unit": (0.0179, 0.0190, 0.0164),
+    "Total Spent": (0.0173, 0.0164, 0.0165),
+    "Payment Method": (0.2579, 0.0306, 0.0293),
+    "Location": (0.3265, 0.0358, 0.0338),
+    "Transaction Date": (0.0159, 0.0142, 0.0159),
+}
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+_ID_MULTIPLIER = 7_368_787   # coprime with 10**k, so ids below are a permutation
+
+
+def parse_rows(value) -> int:
+    """'10k' / '1m' / '10m' or a plain integer."""
+    value = str(value).lower().replace("_", "")
+    if value in SIZES:
+        return SIZES[value]
+    return int(float(value))
+
+
+def _transaction_ids(start: int, count: int, total: int) -> np.ndarray:
+    width = max(7, len(str(total)))
+    modulus = 10 ** width
+    index = np.arange(start, start + count, dtype=np.int64)
+    codes = (index * _ID_MULTIPLIER + 1_000_003) % modulus
+    return np.char.add("TXN_", np.char.zfill(codes.astype(str), width)).astype(object)
+
+
+def _dirty(values: np.ndarray, rates, rng) -> np.ndarray:
+    """Replace cells with '', 'ERROR' or 'UNKNOWN' at the given rates."""
+    empty, error, unknown = rates
+    u = rng.random(len(values))
+    values = values.astype(object)
+    values[u < empty] = ""
+    values[(u >= empty) & (u < empty + error)] = "ERROR"
+    values[(u >= empty + error) & (u < empty + error + unknown)] = "UNKNOWN"
+    return values
+
+
+def _format_number(values: np.ndarray) -> np.ndarray:
+    """2 → '2.0', 1.5 → '1.5' (the raw file's float formatting)."""
+    return pd.Series(values, dtype="float64").astype(str).to_numpy(dtype=object)
+
+
+def generate_sales(rows: int, seed: int = 0, start: int = 0, total: int = None) -> pd.DataFrame:
+    """
+    One frame of raw (string) rows. start/total place the chunk inside a
+    larger file so Transaction IDs stay unique across chunks.
+    """
+    rng = np.random.default_rng([seed, start])
+    items = np.array(list(ITEM_PRICES))
+    prices = np.array(list(ITEM_PRICES.values()))
+
+    item_codes = rng.integers(0, len(items), rows)
+    quantity = rng.integers(1, 6, rows)
+    price = prices[item_codes]
+    days = pd.date_range(*DATE_RANGE, freq="D").strftime("%Y-%m-%d").to_numpy()
+
+    columns = {
+        "Transaction ID": _transaction_ids(start, rows, total or rows),
+        "Item": items[item_codes].astype(object),
+        "Quantity": quantity.astype(str).astype(object),
+        "Price Per Unit": _format_number(price),
+        "Total Spent": _format_number(quantity * price),
+        "Payment Method": np.array(PAYMENT_METHODS)[rng.integers(0, len(PAYMENT_METHODS), rows)],
+        "Location": np.array(LOCATIONS)[rng.integers(0, len(LOCATIONS), rows)],
+        "Transaction Date": days[rng.integers(0, len(days), rows)],
+    }
+    for col, rates in DIRT_PROFILE.items():
+        columns[col] = _dirty(np.asarray(columns[col]), rates, rng)
+    return pd.DataFrame(columns)
+
+
+def write_sales_csv(path: str, rows: int, seed: int = 0, chunk_rows: int = 1_000_000) -> str:
+    """Write `rows` synthetic rows to path in chunks; returns path."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    start_time = time.perf_counter()
+    for start in range(0, rows, chunk_rows):
+        chunk = generate_sales(min(chunk_rows, rows - start), seed, start, rows)
+        chunk.to_csv(tmp, mode="a" if start else "w", header=start == 0, index=False)
+    os.replace(tmp, path)
+    print(f"[INFO] Generated {rows:,} rows → {path} in {time.perf_counter() - start_time:.1f}s")
+    return path
+
+
+def dataset_path(rows: int, seed: int = 0, directory: str = os.path.join("benchmarks", "data")) -> str:
+    """Path of the cached synthetic file for (rows, seed), generated on first use."""
+    path = os.path.join(directory, f"cafe_sales_{rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        write_sales_csv(path, rows, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic dirty cafe-sales CSV files")
+    parser.add_argument("--rows", default="10k", help="row count: 10k, 1m, 10m or an integer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="output CSV (default: benchmarks/data/cafe_sales_<rows>_seed<seed>.csv)")
+    args = parser.parse_args()
+
+    rows = parse_rows(args.rows)
+    if args.out:
+        write_sales_csv(args.out, rows, args.seed)
+    else:
+        dataset_path(rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,249 @@
+import time
+
+_IMPORT_START = time.perf_counter()
+
 from src import (
-    load_data, auto_handle_missing,print_to_console, save_csv, save_json, save_plot, save_summary_report
+    load_data, auto_handle_missing,print_to_console, save_csv, save_json, save_summary_report
 )
-from src.visualize_data import plot_bar, plot_line, plot_histogram
-import pandas as pd
-
-# 1. Load data
-df = load_data("csv", "data/raw/dirty_cafe_sales.csv")
-print_to_console(df, "Original Data")
-
-# 2. Clean missing values
-df_cleaned = auto_handle_missing(df)
-print_to_console(df_cleaned, "Cleaned Data")
-
-# 3. Convert types
-df_cleaned["Quantity"] = pd.to_numeric(df_cleaned["Quantity"], errors="coerce")
-df_cleaned["Price Per Unit"] = pd.to_numeric(df_cleaned["Price Per Unit"], errors="coerce")
-df_cleaned["Total Spent"] = pd.to_numeric(df_cleaned["Total Spent"], errors="coerce")
-df_cleaned["Transaction Date"] = pd.to_datetime(df_cleaned["Transaction Date"], errors="coerce")
-df_cleaned = auto_handle_missing(df_cleaned)
-print_to_console(df_cleaned, "Cleaned & Typed Data")
-
-# 4. Save CSV / JSON
-save_csv(df_cleaned, "cleaned_cafe_sales.csv")
-save_json(df_cleaned, "cleaned_cafe_sales.json")
-
-# 5. Visualization
+from src.visualize_data import import_plotting, plot_filename, prepare_plot_data, render_prepared
+from src.pipeline import Pipeline, run_incremental, run_streaming
+from src.load_data import CAFE_SALES_SCHEMA
+from src.clean_data import repair_sales_consistency
+from src.analyze_data import correlation_matrix, dataset_overview, detect_outliers_iqr, summary_statistics
+from src.output_data import log, save_parquet
+from src.rollup import ROLLUP_DIMENSIONS, ROLLUP_GRAINS, ROLLUP_PATH, RollupCube, build_rollup
+from src.metrics import record_counts, record_stage
+from src.cache import StageCache
+from src import profiling
+from functools import partial
+import argparse
+import os
+import sys
+
+# matplotlib / seaborn are only imported when plotting (visualize_data.import_plotting)
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+RAW_PATH = "data/raw/dirty_cafe_sales.csv"
+
+# Visualization tasks
 tasks = [
     {"type": "bar", "x": "Location", "y": "Total Spent"},
     {"type": "line", "x": "Transaction Date", "y": "Total Spent"},
     {"type": "hist", "col": "Total Spent", "bins": 10}
 ]
 
-for task in tasks:
-    if task["type"] == "bar":
-        if task["x"] in df_cleaned.columns and task["y"] in df_cleaned.columns:
-            print(f"[INFO] Plotting Bar Chart: {task['y']} by {task['x']}")
-            fig = plot_bar(df_cleaned, task["x"], task["y"])
-            save_plot(fig, f"{task['y']}_by_{task['x']}_bar.png")
-
-    elif task["type"] == "line":
-        if task["x"] in df_cleaned.columns and task["y"] in df_cleaned.columns:
-            df_sorted = df_cleaned.sort_values(task["x"])
-            print(f"[INFO] Plotting Line Chart: {task['y']} over {task['x']}")
-            fig = plot_line(df_sorted, task["x"], task["y"])
-            save_plot(fig, f"{task['y']}_over_{task['x']}_line.png")
-
-    elif task["type"] == "hist":
-        if task["col"] in df_cleaned.columns:
-            print(f"[INFO] Plotting Histogram: {task['col']}")
-            fig = plot_histogram(df_cleaned, task["col"], bins=task.get("bins", 10))
-            save_plot(fig, f"{task['col']}_histogram.png")
-
-# 6. Save summary.txt1
-save_summary_report("summary.txt")
-
-print("\n[INFO] All visualizations completed and saved.")
+
+def clean_stage(df):
+    """Repair Quantity / Price Per Unit / Total Spent from each other,
+    then fill what is still missing (one profiling pass, one fillna)."""
+    df_repaired, repair_report = repair_sales_consistency(df)
+    record_counts("repair_sales_consistency", repair_report)
+    log(f"[OK] Consistency repair: {sum(repair_report.values())} values derived "
+        f"({', '.join(f'{rule}={rows}' for rule, rows in repair_report.items())})")
+    return auto_handle_missing(df_repaired)
+
+
+def analyze_stage(df):
+    """Overview, summary statistics, correlations and IQR outliers of the cleaned data."""
+    dataset_overview(df)
+    summary_statistics(df)
+    r, n, p = correlation_matrix(df)
+    bounds, mask = detect_outliers_iqr(df)
+    log("\n===== Correlation (Pearson) =====")
+    log(r.round(3).to_string())
+    log("\n===== IQR Outliers =====")
+    log(bounds.round(2).to_string())
+    log(f"  Rows with an outlier in any column: {int(mask.any(axis=1).sum())}")
+
+
+def preview(df, title):
+    print_to_console(df, title)
+
+
+def build_pipeline(cache, engine="c", outputs=True, analysis=False, plots=True):
+    """
+    load → clean → {save_csv, save_json, save_parquet, rollup, analyze, plot × N}
+
+    The writers run in a thread pool and the plots in a process pool,
+    all at the same time once the cleaned frame exists. Subcommands
+    keep only the branches they need; load and clean are cached, so
+    'analyze' or 'plot' after 'clean' reuse the cleaned frame.
+    """
+    load_key = cache.key("load", cache.file_digest(RAW_PATH), CAFE_SALES_SCHEMA, engine)
+    clean_key = cache.key("clean", load_key, "mean", "mode")
+
+    pipeline = Pipeline(cache=cache)
+
+    # 1. Load data (typed at parse time: ERROR/UNKNOWN become NaN,
+    #    numeric/date/categorical columns come out already converted)
+    pipeline.add("load", partial(load_data, "csv", RAW_PATH, schema=CAFE_SALES_SCHEMA, engine=engine),
+                 outputs=["raw"], cache_key=load_key)
+    pipeline.add("preview_raw", partial(preview, title="Original Data"), inputs=["raw"])
+
+    # 2. Repair and fill missing values
+    pipeline.add("clean", clean_stage, inputs=["raw"], outputs=["cleaned"], cache_key=clean_key)
+    pipeline.add("preview_cleaned", partial(preview, title="Cleaned & Typed Data"), inputs=["cleaned"])
+
+    # 3. Save CSV / JSON / Parquet (typed, partitioned by month and Location)
+    #    and the rollup cube
+    if outputs:
+        pipeline.add("save_csv", partial(save_csv, filename="cleaned_cafe_sales.csv"),
+                     inputs=["cleaned"], kind="thread",
+                     cache_key=cache.key("save_csv", clean_key),
+                     cache_outputs=["data/processed/cleaned_cafe_sales.csv"])
+        pipeline.add("save_json", partial(save_json, filename="cleaned_cafe_sales.json"),
+                     inputs=["cleaned"], kind="thread",
+                     cache_key=cache.key("save_json", clean_key),
+                     cache_outputs=["data/processed/cleaned_cafe_sales.json"])
+        pipeline.add("save_parquet", partial(save_parquet, dirname="cleaned_cafe_sales.parquet"),
+                     inputs=["cleaned"], kind="thread",
+                     cache_key=cache.key("save_parquet", clean_key),
+                     cache_outputs=["data/processed/cleaned_cafe_sales.parquet"])
+        # Location × Item × Payment Method × day / week / month rollup cube
+        pipeline.add("rollup", build_rollup, inputs=["cleaned"], kind="thread",
+                     cache_key=cache.key("rollup", clean_key),
+                     cache_outputs=[ROLLUP_PATH])
+
+    # 4. Analysis (logged, so it ends up in summary.txt)
+    if analysis:
+        pipeline.add("analyze", analyze_stage, inputs=["cleaned"])
+
+    # 5. Visualization: reduce each task's data on the controller, then
+    #    draw the small prepared spec in a worker process (Agg, saved once)
+    if plots:
+        for task in tasks:
+            name = f"plot_{task['type']}"
+            key = cache.key("plot", clean_key, task)
+            output = os.path.join("plots", plot_filename(task))
+            pipeline.add(f"{name}_data", partial(prepare_plot_data, task=task),
+                         inputs=["cleaned"], outputs=[f"{name}_spec"],
+                         cache_key=cache.key("plot_data", key))
+            # matplotlib/seaborn are imported on the controller on the first
+            # plot that is not cached (timed in metrics), so forked workers
+            # inherit them; a fully cached run never imports them.
+            pipeline.add(name, render_prepared, inputs=[f"{name}_spec"], kind="process",
+                         cache_key=key, cache_outputs=[output], setup=import_plotting)
+    return pipeline
+
+
+# -----------------------------
+# Subcommands
+# -----------------------------
+def run_pipeline(args, **branches):
+    pipeline = build_pipeline(StageCache(enabled=not args.no_cache), engine=args.engine, **branches)
+    pipeline.run()
+    pipeline.report()
+    save_summary_report("summary.txt")
+
+
+def cmd_run(args):
+    """Full pipeline: load → clean → save → plots (or --stream / --incremental)."""
+    if args.stream:
+        run_streaming(RAW_PATH, "cleaned_cafe_sales.csv",
+                      "cleaned_cafe_sales.json", chunksize=args.chunksize)
+        save_summary_report("summary.txt")
+        return
+
+    if args.incremental:
+        run_incremental(RAW_PATH, "cleaned_cafe_sales.csv", "cleaned_cafe_sales.json")
+        save_summary_report("summary.txt")
+        return
+
+    run_pipeline(args)
+    print("\n[INFO] All visualizations completed and saved.")
+
+
+def cmd_clean(args):
+    """load → clean → save CSV / JSON / Parquet."""
+    run_pipeline(args, plots=False)
+
+
+def cmd_analyze(args):
+    """load → clean → summary statistics, correlations, outliers."""
+    run_pipeline(args, outputs=False, analysis=True, plots=False)
+
+
+def cmd_plot(args):
+    """load → clean → plots."""
+    run_pipeline(args, outputs=False)
+
+
+def cmd_rollup(args):
+    """Answer a slice / roll-up query from the saved rollup cube (no rescan)."""
+    cube = RollupCube.load(ROLLUP_PATH)
+    if cube is None:
+        print(f"[ERROR] No rollup cube at {ROLLUP_PATH}; run 'python main.py clean' first")
+        return
+    where = {}
+    for condition in args.where:
+        dim, _, value = condition.partition("=")
+        where.setdefault(dim, []).append(value)
+    start = time.perf_counter()
+    result = cube.query(args.grain, by=args.by, where=where, start=args.start, end=args.end,
+                        totals=args.totals)
+    print(result.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"[INFO] {len(result)} rows from {cube!r} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+COMMANDS = {"run": cmd_run, "clean": cmd_clean, "analyze": cmd_analyze, "plot": cmd_plot,
+            "rollup": cmd_rollup}
+
+
+def parse_args(argv=None):
+    """
+    python main.py [run|clean|analyze|plot|rollup] [options]
+
+    Without a subcommand the full pipeline runs (same as 'run'), so
+    existing invocations such as 'python main.py --stream' still work.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "run")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--engine", choices=["c", "pyarrow"], default="c",
+                        help="CSV parser: pandas C parser or multithreaded Arrow reader")
+    common.add_argument("--no-cache", action="store_true",
+                        help="recompute every stage instead of reusing data/processed/.cache")
+    common.add_argument("--profile", nargs="?", const=profiling.PROFILE_DIR, metavar="DIR",
+                        help="profile each stage (cProfile + tracemalloc) into DIR "
+                             f"(default {profiling.PROFILE_DIR}); combine with --no-cache")
+
+    parser = argparse.ArgumentParser(description="Imperative ETL pipeline for the cafe-sales dataset")
+    commands = parser.add_subparsers(dest="command", metavar="{run,clean,analyze,plot,rollup}")
+    run = commands.add_parser("run", parents=[common], help=cmd_run.__doc__)
+    run.add_argument("--stream", action="store_true",
+                     help="clean the raw CSV in bounded-memory chunks (two passes)")
+    run.add_argument("--chunksize", type=int, default=100_000,
+                     help="rows per chunk in --stream mode")
+    run.add_argument("--incremental", action="store_true",
+                     help="only clean rows appended to the raw CSV since the last run")
+    for name in ("clean", "analyze", "plot"):
+        commands.add_parser(name, parents=[common], help=COMMANDS[name].__doc__)
+    rollup = commands.add_parser("rollup", help=cmd_rollup.__doc__)
+    rollup.add_argument("--grain", choices=ROLLUP_GRAINS, default="month")
+    rollup.add_argument("--by", nargs="*", default=[], choices=ROLLUP_DIMENSIONS, metavar="DIM",
+                        help=f"dimensions to keep: {', '.join(ROLLUP_DIMENSIONS)}")
+    rollup.add_argument("--where", action="append", default=[], metavar="DIM=VALUE",
+                        help="slice (repeatable; several values of one DIM are OR-ed)")
+    rollup.add_argument("--start", help="first bucket date (inclusive)")
+    rollup.add_argument("--end", help="last bucket date (inclusive)")
+    rollup.add_argument("--totals", action="store_true", help="also roll up the time buckets")
+    rollup.set_defaults(profile=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    record_stage("import.main", IMPORT_SECONDS)
+
+    if args.profile:
+        profiling.enable(args.profile)
+    try:
+        COMMANDS[args.command](args)
+    finally:
+        profiling.flush()
+
+
+if __name__ == "__main__":
+    main()
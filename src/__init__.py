@@ -1,4 +1,4 @@
-from src.load_data import load_data
+from src.load_data import load_data, CsvSchema, CAFE_SALES_SCHEMA
 from src.utils import show_data_info, get_columns_with_missing_values
-from src.clean_data import auto_handle_missing
+from src.clean_data import auto_handle_missing, MissingValueImputer
 from src.output_data import(print_to_console, save_csv, save_json, save_plot, save_summary_report)
\ No newline at end of file
@@ -4,9 +4,11 @@
 
 
 import pandas as pd
+import math
+
 import numpy as np
-from scipy.stats import pearsonr
 
+from src.metrics import instrument
 
 
 def get_missing_report(df: pd.DataFrame) -> str:
@@ -22,42 +24,352 @@ def get_missing_report(df: pd.DataFrame) -> str:
     return report_str
 
 
-def summary_statistics(df: pd.DataFrame):
+# ------------------------------------------------------------
+# Mergeable statistics: fused moments + HyperLogLog distinct counts
+# ------------------------------------------------------------
+class HyperLogLog:
+    """
+    Approximate distinct counter with fixed memory: 2**precision one-byte
+    registers (16 KiB at the default precision of 14). The standard error
+    of the estimate is about 1.04 / sqrt(2**precision), i.e. ~0.8% at 14.
+    Missing values count as one distinct value, like len(series.unique()).
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 11 <= precision <= 18:
+            raise ValueError("precision must be between 11 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, values: pd.Series):
+        if len(values) == 0:
+            return self
+        hashes = pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(np.uint64)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # rest has at most 53 bits, so frexp gives its exact bit length.
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)   # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+def _nan_value(value):
+    """Collapse every missing marker to one key so sets count NaN once."""
+    return np.nan if pd.isna(value) else value
+
+
+class StatisticsAccumulator:
+    """
+    Summary statistics that can be built chunk by chunk and merged.
+
+    Numeric columns are processed as one float64 block of up to block_rows
+    rows at a time: count, sum, min and max come from one reduction each
+    over the block and M2 from a second pass while the block is still in
+    cache; blocks (and accumulators) are combined with Chan's formula.
+
+    distinct: 'exact'  keeps the set of distinct values per column
+              'approx' keeps one HyperLogLog per column (bounded memory)
+              None     skips distinct counts
+    """
+
+    def __init__(self, distinct="exact", precision: int = 14, block_rows: int = 65_536):
+        if distinct not in ("exact", "approx", None):
+            raise ValueError("distinct must be 'exact', 'approx' or None")
+        self.distinct = distinct
+        self.precision = precision
+        self.block_rows = block_rows
+        self.columns = []
+        self.count = self.mean = self.m2 = self.min = self.max = None
+        self.sketches = {}
+
+    def _start(self, columns):
+        """Empty moments for the numeric columns (count 0, min/max NaN)."""
+        self.columns = list(columns)
+        zeros = np.zeros(len(self.columns))
+        self.count, self.mean, self.m2 = zeros, zeros.copy(), zeros.copy()
+        self.min, self.max = np.full(len(self.columns), np.nan), np.full(len(self.columns), np.nan)
+
+    def _merge_moments(self, count, mean, m2, vmin, vmax):
+        # Means of empty columns are 0 here (NaN only in result()), so they add nothing.
+        n = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * count / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + m2 + delta ** 2 * self.count * count / n, 0.0)
+        self.count = n
+        self.min = np.fmin(self.min, vmin)
+        self.max = np.fmax(self.max, vmax)
+
+    def _update_block(self, block: np.ndarray):
+        present = ~np.isnan(block)
+        count = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, np.nansum(block, axis=0) / count, 0.0)
+        m2 = np.nansum((block - mean) ** 2, axis=0)
+        with np.errstate(invalid="ignore"):
+            vmin = np.where(count > 0, np.nanmin(np.where(present, block, np.inf), axis=0), np.nan)
+            vmax = np.where(count > 0, np.nanmax(np.where(present, block, -np.inf), axis=0), np.nan)
+        self._merge_moments(count, mean, m2, vmin, vmax)
+
+    def update(self, df: pd.DataFrame):
+        numeric = df.select_dtypes(include=np.number)
+        if self.count is None:
+            self._start(numeric.columns)
+        elif list(numeric.columns) != self.columns:
+            raise ValueError("Chunk has different numeric columns than the accumulator")
+        if self.columns:
+            values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            for start in range(0, len(values), self.block_rows):
+                self._update_block(values[start:start + self.block_rows])
+
+        for col in df.columns:
+            if self.distinct == "approx":
+                self.sketches.setdefault(col, HyperLogLog(self.precision)).update(df[col])
+            elif self.distinct == "exact":
+                self.sketches.setdefault(col, set()).update(map(_nan_value, df[col].unique().tolist()))
+        return self
+
+    def merge(self, other: "StatisticsAccumulator"):
+        if other.count is not None:
+            if self.count is None:
+                self._start(other.columns)
+            elif other.columns != self.columns:
+                raise ValueError("Cannot merge accumulators over different numeric columns")
+            self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        for col, sketch in other.sketches.items():
+            if col not in self.sketches:
+                self.sketches[col] = sketch.copy() if isinstance(sketch, set) else \
+                    HyperLogLog(sketch.precision).merge(sketch)
+            elif isinstance(sketch, set):
+                self.sketches[col] |= sketch
+            else:
+                self.sketches[col].merge(sketch)
+        return self
+
+    def result(self) -> pd.DataFrame:
+        """count / mean / variance / std_dev / min / max per numeric column."""
+        if not self.columns:
+            return pd.DataFrame(columns=["count", "mean", "variance", "std_dev", "min", "max"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+        return pd.DataFrame({
+            "count": self.count.astype(np.int64),
+            "mean": np.where(self.count > 0, self.mean, np.nan),
+            "variance": variance,
+            "std_dev": np.sqrt(variance),
+            "min": self.min,
+            "max": self.max,
+        }, index=self.columns)
+
+    def distinct_counts(self) -> pd.Series:
+        counts = {col: (len(s) if isinstance(s, set) else s.count()) for col, s in self.sketches.items()}
+        return pd.Series(counts, dtype=np.int64)
+
+
+@instrument()
+def summary_statistics(df: pd.DataFrame, approx_distinct: bool = False):
     """
     1. Statistical summaries: mean, median, variance, std deviation, min, max, unique count.
+
+    Moments come from one fused StatisticsAccumulator pass; with
+    approx_distinct=True unique counts use HyperLogLog (~0.8% error).
+    Returns (stats, unique_counts).
     """
     print("\n## 1. Calculating Summary Statistics (Imperative Sequence)...")
-    
-  
-    numeric_df = df.select_dtypes(include=np.number)
-    
-    if numeric_df.empty:
+
+    accumulator = StatisticsAccumulator(distinct="approx" if approx_distinct else None)
+    accumulator.update(df)
+    stats = accumulator.result()
+
+    if stats.empty:
         print("  [WARN] No numeric columns found for full statistical summaries.")
     else:
-       
-        stats = pd.DataFrame()
-        
         print("  > Calculating central tendencies and dispersion...")
-       
-        stats['count'] = numeric_df.count()
-        stats['mean'] = numeric_df.mean()
-        stats['median'] = numeric_df.median()
-        stats['variance'] = numeric_df.var()
-        stats['std_dev'] = numeric_df.std()
-        stats['min'] = numeric_df.min()
-        stats['max'] = numeric_df.max()
+        # The median is the one statistic that cannot be merged exactly.
+        numeric = df[accumulator.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        stats.insert(2, "median", np.nanmedian(numeric, axis=0) if len(numeric) else np.nan)
 
         print("\n--- Summary Statistics Results (Numeric Columns) ---")
         print(stats.round(2).to_string())
         print("--------------------------------------------------")
 
-   
     print("  > Calculating Unique Value Counts for all columns...")
-    unique_counts = df.apply(lambda x: len(x.unique()))
-    
-    print("\n--- Unique Value Counts per Column ---")
+    if approx_distinct:
+        unique_counts = accumulator.distinct_counts()
+        note = f" (HyperLogLog, ±{HyperLogLog().relative_error:.1%})"
+    else:
+        unique_counts = df.nunique(dropna=False)
+        note = ""
+
+    print(f"\n--- Unique Value Counts per Column{note} ---")
     print(unique_counts.to_string())
     print("--------------------------------------")
+    return stats, unique_counts
+
+
+# ------------------------------------------------------------
+# All-pairs correlation from mergeable co-moments
+# ------------------------------------------------------------
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta I_x(a, b) (continued fraction, Lentz's method)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _betainc(b, a, 1.0 - x)
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    f = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            f *= c * d
+        if abs(c * d - 1.0) < 1e-14:
+            break
+    return math.exp(log_front) * f / a
+
+
+def _pearson_pvalue(r: float, n: float) -> float:
+    """Two-sided p-value of r under H0: no correlation (t test, n - 2 dof)."""
+    dof = n - 2
+    if not np.isfinite(r) or dof <= 0:
+        return np.nan
+    if abs(r) >= 1.0:
+        return 0.0
+    t2 = r * r * dof / (1.0 - r * r)
+    return _betainc(dof / 2.0, 0.5, dof / (dof + t2))
+
+
+class CoMomentAccumulator:
+    """
+    Running co-moments for every pair of numeric columns, with
+    pairwise-complete observations: for columns i, j it keeps
+        n[i, j]    rows where both are present
+        sx[i, j]   sum of x_i over those rows
+        sxx[i, j]  sum of x_i ** 2 over those rows
+        sxy[i, j]  sum of x_i * x_j over those rows
+    all built with four masked matrix products per chunk. Values are
+    shifted by the first chunk's means to keep the sums well conditioned.
+    Accumulators from separate chunks or daily batches merge by addition.
+
+    Only Pearson is streaming-safe: Spearman needs ranks over the whole
+    column, and ranks taken per chunk do not merge into global ones.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(columns) if columns is not None else None
+        self.shift = None
+        self.n = self.sx = self.sxx = self.sxy = None
+
+    def update(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.select_dtypes(include=np.number).columns)
+        values = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        if self.shift is None:
+            with np.errstate(invalid="ignore"):
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+            k = len(self.columns)
+            self.n, self.sx, self.sxx, self.sxy = (np.zeros((k, k)) for _ in range(4))
+        centered = np.where(present, values - self.shift, 0.0)
+        weights = present.astype(np.float64)
+        self.n += weights.T @ weights
+        self.sx += centered.T @ weights
+        self.sxx += (centered ** 2).T @ weights
+        self.sxy += centered.T @ centered
+        return self
+
+    def merge(self, other: "CoMomentAccumulator"):
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.columns, self.shift = list(other.columns), other.shift.copy()
+            self.n, self.sx, self.sxx, self.sxy = (m.copy() for m in (other.n, other.sx, other.sxx, other.sxy))
+            return self
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge co-moments over different columns")
+        # Re-express the other sums around this accumulator's shift.
+        d = (other.shift - self.shift)[:, None]
+        n, sx = other.n, other.sx
+        self.sxy += other.sxy + d.T * sx + d * sx.T + d * d.T * n
+        self.sxx += other.sxx + 2 * d * sx + d ** 2 * n
+        self.sx += sx + d * n
+        self.n += n
+        return self
+
+    def pearson(self) -> pd.DataFrame:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = self.n * self.sxy - self.sx * self.sx.T
+            var_i = self.n * self.sxx - self.sx ** 2
+            r = cov / np.sqrt(var_i * var_i.T)
+        r = np.clip(r, -1.0, 1.0)
+        return pd.DataFrame(r, index=self.columns, columns=self.columns)
+
+    def counts(self) -> pd.DataFrame:
+        return pd.DataFrame(self.n.astype(np.int64), index=self.columns, columns=self.columns)
+
+    def pvalues(self) -> pd.DataFrame:
+        r = self.pearson().to_numpy()
+        p = np.vectorize(_pearson_pvalue, otypes=[np.float64])(r, self.n)
+        return pd.DataFrame(p, index=self.columns, columns=self.columns)
+
+
+@instrument()
+def correlation_matrix(df: pd.DataFrame, method: str = "pearson", columns=None):
+    """
+    Correlation of every pair of numeric columns at once.
+
+    df:     a DataFrame, or an iterable of DataFrame chunks (Pearson only).
+    method: 'pearson', or 'spearman' (Pearson on per-column ranks; ranks
+            are global, so this mode needs the whole DataFrame).
+    Returns (r, n, p): coefficients, pairwise-complete observation counts
+    and two-sided p-values, each as a column × column DataFrame.
+    """
+    if method not in ("pearson", "spearman"):
+        raise ValueError("method must be 'pearson' or 'spearman'")
+    if not isinstance(df, pd.DataFrame):
+        if method == "spearman":
+            raise ValueError("spearman ranks are global; pass the whole DataFrame, not chunks")
+        accumulator = CoMomentAccumulator(columns)
+        for chunk in df:
+            accumulator.update(chunk)
+        return accumulator.pearson(), accumulator.counts(), accumulator.pvalues()
+
+    columns = columns or list(df.select_dtypes(include=np.number).columns)
+    data = df[columns]
+    if method == "spearman":
+        data = data.rank()
+    accumulator = CoMomentAccumulator(columns).update(data)
+    return accumulator.pearson(), accumulator.counts(), accumulator.pvalues()
 
 
 def correlation_analysis(df: pd.DataFrame, col1: str, col2: str):
@@ -85,7 +397,8 @@ def correlation_analysis(df: pd.DataFrame, col1: str, col2: str):
         return
 
     
-    correlation_coefficient, p_value = pearsonr(x, y)
+    r_matrix, _, p_matrix = correlation_matrix(cleaned_data, columns=[col1, col2])
+    correlation_coefficient, p_value = r_matrix.iat[0, 1], p_matrix.iat[0, 1]
     
    
     interpretation = "No Significant Linear Trend."
@@ -114,6 +427,7 @@ def correlation_analysis(df: pd.DataFrame, col1: str, col2: str):
     print("---------------------------------------------")
 
 
+@instrument()
 def dataset_overview(df: pd.DataFrame):
     """
     3. Dataset summary: number of rows, columns, data types, missing-value overview.
@@ -186,6 +500,149 @@ def detect_outliers(df: pd.DataFrame, column: str):
 
 
 
+# ------------------------------------------------------------
+# Batch IQR outliers (all columns at once) + streaming quantile sketch
+# ------------------------------------------------------------
+class QuantileSketch:
+    """
+    KLL quantile sketch: a stack of compactors where level h holds items of
+    weight 2**h. When a level outgrows its capacity it is sorted and every
+    other item (random offset) is promoted to the next level, so memory
+    stays O(k log(n/k)) while rank error stays around 1/k to 2/k of n
+    (about 1% at k=200). Sketches over separate chunks merge level by level.
+    """
+
+    def __init__(self, k: int = 200, seed: int = None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) >= self._capacity(level):
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        result = items[np.minimum(positions, len(items) - 1)]
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+def quantile_sketches(chunks, columns=None, k: int = 200) -> dict:
+    """One streaming pass over DataFrame chunks → {column: QuantileSketch}."""
+    sketches = {}
+    for chunk in chunks:
+        cols = columns or list(chunk.select_dtypes(include=np.number).columns)
+        for col in cols:
+            sketches.setdefault(col, QuantileSketch(k)).update(chunk[col].to_numpy(dtype=np.float64, na_value=np.nan))
+    return sketches
+
+
+@instrument()
+def iqr_bounds(df: pd.DataFrame = None, columns=None, k: float = 1.5, sketches: dict = None) -> pd.DataFrame:
+    """
+    Q1 / Q3 / IQR / lower / upper for every requested numeric column.
+    Quartiles come from one df[columns].quantile([0.25, 0.75]) call, or
+    from QuantileSketches (approximate) when the data is streamed.
+    """
+    if sketches is not None:
+        columns = columns or list(sketches)
+        quartiles = pd.DataFrame({col: sketches[col].quantiles([0.25, 0.75]) for col in columns},
+                                 index=[0.25, 0.75])
+    else:
+        columns = columns or list(df.select_dtypes(include=np.number).columns)
+        quartiles = df[columns].quantile([0.25, 0.75])
+    bounds = pd.DataFrame({"Q1": quartiles.loc[0.25], "Q3": quartiles.loc[0.75]})
+    bounds["IQR"] = bounds["Q3"] - bounds["Q1"]
+    bounds["lower"] = bounds["Q1"] - k * bounds["IQR"]
+    bounds["upper"] = bounds["Q3"] + k * bounds["IQR"]
+    return bounds
+
+
+def flag_outliers(df: pd.DataFrame, bounds: pd.DataFrame, add_columns: bool = False,
+                  suffix: str = "_is_outlier"):
+    """
+    Apply IQR bounds to a frame (or one chunk) in one vectorized comparison.
+
+    Returns a boolean DataFrame (one column per bounded column), or with
+    add_columns=True a copy of df with '<column>_is_outlier' flag columns.
+    Missing values are never outliers.
+    """
+    columns = list(bounds.index)
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        mask = (values < bounds["lower"].to_numpy()) | (values > bounds["upper"].to_numpy())
+    mask = pd.DataFrame(mask, index=df.index, columns=columns)
+    if not add_columns:
+        return mask
+    return df.assign(**{f"{col}{suffix}": mask[col] for col in columns})
+
+
+@instrument()
+def detect_outliers_iqr(df: pd.DataFrame, columns=None, k: float = 1.5):
+    """
+    Batch IQR outlier detection over several numeric columns at once.
+    Returns (bounds with an 'outliers' count column, row-level boolean mask).
+    Use mask.any(axis=1) for rows that are outliers in any column.
+    """
+    bounds = iqr_bounds(df, columns, k)
+    mask = flag_outliers(df, bounds)
+    bounds["outliers"] = mask.sum().astype(np.int64)
+    return bounds, mask
+
+
 if __name__ == '__main__':
   
     print("=============================================================")
@@ -0,0 +1,199 @@
+# ============================================================
+# STAGE CACHE (content-addressed memoization)
+# ============================================================
+# Each stage result is stored under a key derived from:
+#   - a content hash of the input file (blake2b), and
+#   - the stage name and its parameters,
+# chained stage to stage, so a change upstream invalidates everything
+# below it while a change in one plot task only reruns that task.
+#
+# Frames are pickled (protocol 5) under data/processed/.cache and the
+# cache is bounded in size with least-recently-used eviction.
+# ============================================================
+
+import hashlib
+import json
+import os
+import pickle
+import time
+
+CACHE_DIR = os.path.join("data", "processed", ".cache")
+CACHE_VERSION = 1
+_INDEX_FILE = "index.json"
+
+
+def _hash(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _stat_outputs(paths) -> dict:
+    """{path: [size, mtime_ns]} for existing output files (None if any is missing)."""
+    stats = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stats[path] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+class StageCache:
+    """
+    key = cache.key("load", cache.file_digest(raw_path), params)
+    df  = cache.run(key, load_data, "csv", raw_path)
+
+    Stages that only write files pass outputs=[paths]: nothing is stored,
+    and the stage is skipped while its key is known and the files exist.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = 512 * 1024 * 1024,
+                 enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._index = {"entries": {}, "digests": {}}
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_index()
+
+    # ---- index ----
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, _INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._index = {"entries": {}, "digests": {}}
+
+    def _save_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path())
+
+    # ---- keys ----
+    def file_digest(self, path: str) -> str:
+        """
+        Content hash of a file. Remembered per (path, size, mtime) so an
+        unchanged file is not re-read on the next run.
+        """
+        stat = os.stat(path)
+        abspath = os.path.abspath(path)
+        known = self._index["digests"].get(abspath)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        value = digest.hexdigest()
+        self._index["digests"][abspath] = [stat.st_size, stat.st_mtime_ns, value]
+        if self.enabled:
+            self._save_index()
+        return value
+
+    def key(self, stage: str, *parts) -> str:
+        """Key for a stage: its name, its upstream key(s) and its parameters."""
+        return f"{stage}-{_hash(CACHE_VERSION, stage, *parts)}"
+
+    # ---- lookup / store ----
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def _touch(self, key: str):
+        self._index["entries"][key]["last_used"] = time.time()
+        self._save_index()
+
+    def lookup(self, key: str, outputs=None):
+        """
+        Return (hit, value). For file-writing stages (outputs given) the
+        value is None and a hit means the recorded outputs are unchanged.
+        """
+        if not self.enabled:
+            return False, None
+        entry = self._index["entries"].get(key)
+        if entry is not None:
+            recorded = entry.get("outputs")
+            if outputs is not None and recorded is not None and recorded == _stat_outputs(outputs):
+                self.hits += 1
+                self._touch(key)
+                print(f"[CACHE] hit  {key} (outputs up to date)")
+                return True, None
+            if outputs is None and os.path.exists(self._entry_path(key)):
+                with open(self._entry_path(key), "rb") as f:
+                    value = pickle.load(f)
+                self.hits += 1
+                self._touch(key)
+                print(f"[CACHE] hit  {key}")
+                return True, value
+        self.misses += 1
+        print(f"[CACHE] miss {key}")
+        return False, None
+
+    def store(self, key: str, value=None, outputs=None):
+        """Store a stage result, or record the outputs a file-writing stage produced."""
+        if not self.enabled:
+            return
+        size = 0
+        if outputs is not None:
+            stats = _stat_outputs(outputs)
+            if stats is None:
+                # The stage did not produce its outputs (writers log errors
+                # instead of raising): record nothing, so it runs again.
+                print(f"[CACHE] skip {key} (outputs missing)")
+                if self._index["entries"].pop(key, None) is not None:
+                    self._save_index()
+                return
+        else:
+            with open(self._entry_path(key), "wb") as f:
+                pickle.dump(value, f, protocol=5)
+            size = os.path.getsize(self._entry_path(key))
+        self._index["entries"][key] = {"size": size, "last_used": time.time()}
+        if outputs is not None:
+            # Remember exactly which files this run produced, so outputs
+            # rewritten by a run with another key do not count as a hit.
+            self._index["entries"][key]["outputs"] = stats
+        self._evict()
+        self._save_index()
+
+    def run(self, key: str, fn, *args, outputs=None, **kwargs):
+        """Return the cached result for key, or call fn(*args, **kwargs) and cache it."""
+        hit, value = self.lookup(key, outputs)
+        if hit:
+            return value
+        value = fn(*args, **kwargs)
+        self.store(key, None if outputs is not None else value, outputs)
+        return value
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits max_bytes."""
+        entries = self._index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if entries[key]["size"] == 0:
+                continue   # output markers take no space
+            total -= entries[key]["size"]
+            del entries[key]
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+            print(f"[CACHE] evicted {key}")
+
+    def clear(self):
+        for key in list(self._index["entries"]):
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+        self._index = {"entries": {}, "digests": {}}
+        self._save_index()
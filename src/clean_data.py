@@ -1,5 +1,13 @@
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
+from src.analyze_data import QuantileSketch
+from src.metrics import instrument
+
+@instrument()
 def remove_missing(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove rows with any missing values.
@@ -11,6 +19,7 @@ def remove_missing(df: pd.DataFrame) -> pd.DataFrame:
     return df_cleaned
 
 
+@instrument()
 def fill_missing(df: pd.DataFrame, fill_values: dict) -> pd.DataFrame:
     """
     Fill missing values with specified defaults.
@@ -27,63 +36,341 @@ def fill_missing(df: pd.DataFrame, fill_values: dict) -> pd.DataFrame:
     return df_filled
 
 
+@instrument()
 def auto_handle_missing(df: pd.DataFrame, strategy_num="mean", strategy_cat="mode") -> pd.DataFrame:
     """
     Automatically handles missing data based on column type.
 
     strategy_num:   'mean' or 'median' for numerical columns
-    strategy_cat:   'mode' for categorical/text/boolean/datetime
+    strategy_cat:   'mode' for categorical/text/boolean/datetime (the only
+                    strategy; anything else raises ValueError)
 
-    Returns a cleaned DataFrame.
+    Returns a cleaned DataFrame. Equivalent to
+    MissingValueImputer(strategy_num, strategy_cat).fit_transform(df).
     """
-    df_clean = df.copy()
-    
-    for col in df_clean.columns:
-        missing_count = df_clean[col].isna().sum()
-        if missing_count == 0:
-            continue   # skip column with no missing values
-
-        col_type = df_clean[col].dtype
-        
-        print(f"\n[INFO] Handling '{col}' ({col_type}) - Missing values: {missing_count}")
-
-        try:
-            if pd.api.types.is_numeric_dtype(col_type):
-                if strategy_num == "mean":
-                    fill_value = df_clean[col].mean()
-                else:
-                    fill_value = df_clean[col].median()
-
-                df_clean[col].fillna(fill_value, inplace=True)
-                print(f"[OK] Numeric column → filled with {strategy_num}: {fill_value}")
-
-            elif pd.api.types.is_categorical_dtype(col_type) or df_clean[col].dtype == object:
-                fill_value = df_clean[col].mode(dropna=True)[0] if not df_clean[col].mode(dropna=True).empty else "Unknown"
-                df_clean[col].fillna(fill_value, inplace=True)
-                print(f"[OK] Categorical column → filled with mode: {fill_value}")
-
-            elif pd.api.types.is_bool_dtype(col_type):
-                fill_value = df_clean[col].mode(dropna=True)[0]
-                df_clean[col].fillna(fill_value, inplace=True)
-                print(f"[OK] Boolean column → filled with mode: {fill_value}")
-                
-            elif pd.api.types.is_datetime64_any_dtype(col_type):
-                mq = df_clean[col].mode(dropna=True)
-                if not mq.empty:
-                    fill_value = mq[0]
-                else:
-                    fill_value = df_clean[col].dropna().min()
+    imputer = MissingValueImputer(strategy_num, strategy_cat).fit(df)
+    imputer.report()
+    df_clean = imputer.transform(df)
+    print("\n[INFO] Missing-data handling completed.")
+    return df_clean
+
+
+# -----------------------------
+# Consistency repair: Total Spent = Quantity * Price Per Unit
+# -----------------------------
+def item_price_counts(df: pd.DataFrame, item="Item", price="Price Per Unit") -> pd.Series:
+    """(item, price) -> rows where both are known; counts of chunks add up with .add(fill_value=0)."""
+    return df.groupby([df[item].astype(object), df[price]]).size()
+
+
+def item_prices_from_counts(pairs: pd.Series) -> dict:
+    """Most frequent unit price of each item in an item_price_counts() table."""
+    if pairs is None or pairs.empty:
+        return {}
+    return dict(pairs.groupby(level=0).idxmax().map(lambda key: key[1]))
+
+
+def learn_item_prices(df: pd.DataFrame, item="Item", price="Price Per Unit") -> dict:
+    """Most frequent unit price of each item, from rows where both are known."""
+    return item_prices_from_counts(item_price_counts(df, item, price))
+
+
+@instrument()
+def repair_sales_consistency(df: pd.DataFrame, item_prices: dict = None, inplace: bool = False,
+                             verbose: bool = True,
+                             quantity="Quantity", price="Price Per Unit",
+                             total="Total Spent", item="Item"):
+    """
+    Derive missing members of quantity * price = total from the other two,
+    before any statistical fill.
+
+    Rules run in order, each as one whole-column mask:
+      price_from_item      price    ← item_prices[item]
+      price_from_total     price    ← total / quantity
+      quantity_from_total  quantity ← total / price
+      total_from_parts     total    ← quantity * price
+      item_from_price      item     ← the only item sold at that price
+
+    item_prices defaults to learn_item_prices(df).
+    Returns (DataFrame, {rule_name: rows_repaired}).
+    """
+    if not inplace:
+        df = df.copy()
+    if item_prices is None:
+        item_prices = learn_item_prices(df, item, price)
+
+    # Reverse lookup only where a price identifies exactly one item.
+    by_price = pd.Series(item_prices, dtype="float64")
+    unique_prices = by_price[~by_price.duplicated(keep=False)]
+    price_items = dict(zip(unique_prices.to_numpy(), unique_prices.index))
+
+    rules = [
+        ("price_from_item", price, [item],
+         lambda d: d[item].astype(object).map(item_prices).astype("float64")),
+        ("price_from_total", price, [quantity, total],
+         lambda d: d[total] / d[quantity].where(d[quantity] != 0)),
+        ("quantity_from_total", quantity, [price, total],
+         lambda d: d[total] / d[price].where(d[price] != 0)),
+        ("total_from_parts", total, [quantity, price],
+         lambda d: d[quantity] * d[price]),
+        ("item_from_price", item, [price],
+         lambda d: d[price].map(price_items)),
+    ]
+
+    report = {}
+    for name, target, sources, derive in rules:
+        if target not in df.columns or any(c not in df.columns for c in sources):
+            continue
+        mask = df[target].isna() & df[sources].notna().all(axis=1)
+        if not mask.any():
+            report[name] = 0
+            continue
+        values = derive(df)
+        mask &= values.notna()
+        if isinstance(df[target].dtype, pd.CategoricalDtype):
+            # A chunk's categorical may lack the derived value (e.g. an item not in this batch).
+            missing = pd.Index(values[mask].unique()).difference(df[target].cat.categories)
+            if len(missing):
+                df[target] = df[target].cat.add_categories(list(missing))
+        df.loc[mask, target] = values[mask]
+        report[name] = int(mask.sum())
+        if verbose:
+            print(f"[OK] Repair rule '{name}': {report[name]} rows fixed in '{target}'")
+
+    return df, report
+
+
+# -----------------------------
+# Imputer: fit once, fill many
+# -----------------------------
+def _mode_from_counts(counts: pd.Series):
+    """Most frequent value; ties resolve to the smallest value like Series.mode()."""
+    top = counts[counts == counts.max()]
+    try:
+        return top.sort_index().index[0]
+    except TypeError:
+        return top.index[0]
+
+
+def _median_from_counts(counts: pd.Series) -> float:
+    """Exact median from a value -> frequency table."""
+    counts = counts.sort_index()
+    cumulative = counts.cumsum().to_numpy()
+    total = cumulative[-1]
+    lower = counts.index[np.searchsorted(cumulative, (total - 1) // 2, side="right")]
+    upper = counts.index[np.searchsorted(cumulative, total // 2, side="right")]
+    return (lower + upper) / 2
+
+
+def _encode_value(value):
+    """JSON-safe encoding of a fill value (keeps Timestamps and NaN distinguishable)."""
+    if isinstance(value, pd.Timestamp):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return {"nan": True}
+    return value
 
-                df_clean[col].fillna(fill_value, inplace=True)
-                print(f"[OK] Datetime column → filled with: {fill_value}")
 
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "datetime" in value:
+            return pd.Timestamp(value["datetime"])
+        if value.get("nan"):
+            return np.nan
+    return value
+
+
+def _bounded_counts(counts: pd.Series, limit: int) -> pd.Series:
+    """
+    Misra-Gries reduction to at most `limit` values: exact while a column
+    has no more distinct values, otherwise every value more frequent than
+    1 / (limit + 1) of the rows survives (so a dominant mode is kept).
+    """
+    if len(counts) <= limit:
+        return counts
+    threshold = counts.nlargest(limit + 1).iloc[-1]
+    return counts[counts > threshold] - threshold
+
+
+NUMERIC_STRATEGIES = ("mean", "median")
+CATEGORICAL_STRATEGIES = ("mode",)
+MAX_TRACKED_VALUES = 1024
+
+
+class MissingValueImputer:
+    """
+    Fit/transform version of auto_handle_missing().
+
+    fit() profiles the frame once: a single vectorized isna().sum(), one
+    count/sum pass over the numeric columns that have gaps, and one
+    value_counts() per other column with gaps. The resulting fill values
+    are applied by transform() in a single fillna(dict).
+
+    partial_fit() folds in chunks one at a time (streaming mode). Any
+    column may first show gaps in a later chunk, so every column is
+    summarized, in bounded memory: value counts are capped at
+    MAX_TRACKED_VALUES (exact below that), numeric medians switch to a
+    QuantileSketch past it, and key-like columns (every value distinct)
+    are never counted; they fill like a column with nothing observed.
+
+    save()/load() persist the fitted fill values as JSON so later batches
+    can reuse them instead of rescanning.
+    """
+
+    def __init__(self, strategy_num="mean", strategy_cat="mode"):
+        if strategy_num not in NUMERIC_STRATEGIES:
+            raise ValueError(f"strategy_num must be one of {NUMERIC_STRATEGIES}, got {strategy_num!r}")
+        if strategy_cat not in CATEGORICAL_STRATEGIES:
+            raise ValueError(f"strategy_cat must be one of {CATEGORICAL_STRATEGIES}, got {strategy_cat!r}")
+        self.strategy_num = strategy_num
+        self.strategy_cat = strategy_cat
+        self.fill_values = {}
+        self.missing_counts = {}
+        self._reset()
+
+    def _reset(self):
+        self._missing = None
+        self._dtypes = {}
+        self._totals = {}   # column -> (count, sum)
+        self._counts = {}   # column -> value_counts()
+        self._sketches = {}   # numeric column -> QuantileSketch (partial_fit, many distinct values)
+        self._keys = set()    # key-like columns partial_fit no longer counts
+        self._truncated = set()   # columns whose counts were capped (no longer exact)
+
+    def _profile(self, df: pd.DataFrame, columns, limit: int = None):
+        """Fold df into the statistics; limit bounds the per-column state (partial_fit)."""
+        numeric = [c for c in columns if pd.api.types.is_numeric_dtype(df[c].dtype)]
+        if numeric and self.strategy_num == "mean":
+            counts, sums = df[numeric].count(), df[numeric].sum()
+            for col in numeric:
+                count, total = self._totals.get(col, (0, 0.0))
+                self._totals[col] = (count + counts[col], total + sums[col])
+            columns = [c for c in columns if c not in numeric]
+        for col in columns:
+            if col in self._keys:
+                continue
+            if col in self._sketches:
+                self._sketches[col].update(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+                continue
+            value_counts = df[col].value_counts()
+            if col in self._counts:
+                value_counts = self._counts[col].add(value_counts, fill_value=0)
+            if limit is not None and len(value_counts) > limit:
+                if col not in numeric and col not in self._truncated and value_counts.max() == 1:
+                    # Every value so far is distinct (an ID): no mode worth counting.
+                    self._keys.add(col)
+                    self._counts.pop(col, None)
+                    continue
+                if col in numeric:
+                    # Counts would be truncated: keep the median in a sketch instead.
+                    values = np.repeat(value_counts.index.to_numpy(dtype=np.float64),
+                                       value_counts.to_numpy(dtype=np.int64))
+                    self._sketches[col] = QuantileSketch().update(values)
+                    self._counts.pop(col, None)
+                    continue
+                value_counts = _bounded_counts(value_counts, limit)
+                self._truncated.add(col)
+            self._counts[col] = value_counts
+
+    @instrument()
+    def partial_fit(self, df: pd.DataFrame):
+        """Fold one chunk into the statistics (every column is profiled)."""
+        missing = df.isna().sum()
+        self._missing = missing if self._missing is None else self._missing.add(missing, fill_value=0)
+        self._dtypes.update(df.dtypes.to_dict())
+        self._profile(df, list(df.columns), limit=MAX_TRACKED_VALUES)
+        self._finalize()
+        return self
+
+    @instrument()
+    def fit(self, df: pd.DataFrame):
+        """Profile a whole frame; only columns that have gaps are scanned."""
+        self._reset()
+        self._missing = df.isna().sum()
+        self._dtypes = df.dtypes.to_dict()
+        self._profile(df, list(self._missing.index[self._missing > 0]))
+        self._finalize()
+        return self
+
+    def _finalize(self):
+        self.fill_values = {}
+        self.missing_counts = {}
+        for col, missing_count in self._missing.items():
+            if missing_count == 0:
+                continue
+            col_type = self._dtypes[col]
+            counts = self._counts.get(col)
+            if counts is not None:
+                counts = counts[counts > 0]
+
+            if pd.api.types.is_numeric_dtype(col_type) and self.strategy_num == "mean":
+                count, total = self._totals[col]
+                fill_value = total / count if count else np.nan
+            elif pd.api.types.is_numeric_dtype(col_type) and col in self._sketches:
+                fill_value = self._sketches[col].quantile(0.5)
+            elif pd.api.types.is_numeric_dtype(col_type):
+                fill_value = _median_from_counts(counts) if counts is not None and not counts.empty else np.nan
+            elif counts is not None and not counts.empty:
+                fill_value = _mode_from_counts(counts)
+            elif pd.api.types.is_datetime64_any_dtype(col_type):
+                continue   # nothing observed to fill from
             else:
-                df_clean[col].fillna("Unknown", inplace=True)
-                print(f"[WARN] Unknown dtype → filled with 'Unknown'")
+                fill_value = "Unknown"
 
-        except Exception as e:
-            print(f"[ERROR] Could not fill column '{col}': {e}")
+            self.fill_values[col] = fill_value
+            self.missing_counts[col] = int(missing_count)
 
-    print("\n[INFO] Missing-data handling completed.")
-    return df_clean
+    def report(self):
+        """Print the fitted fill value of every column that had gaps."""
+        for col, value in self.fill_values.items():
+            print(f"[OK] '{col}' ({self._dtypes.get(col, '?')}) - "
+                  f"{self.missing_counts[col]} missing → fill with: {value}")
+
+    @instrument()
+    def transform(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        """Apply the fitted fill values in one fillna(dict)."""
+        fill_values = {c: v for c, v in self.fill_values.items() if c in df.columns}
+        for col, value in fill_values.items():
+            # A chunk's categorical may not have seen the dataset-wide mode yet.
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([value])
+        if inplace:
+            df.fillna(fill_values, inplace=True)
+            return df
+        return df.fillna(fill_values)
+
+    def fit_transform(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        return self.fit(df).transform(df, inplace=inplace)
+
+    # ---- persistence ----
+    def to_dict(self) -> dict:
+        return {
+            "strategy_num": self.strategy_num,
+            "strategy_cat": self.strategy_cat,
+            "fill_values": {c: _encode_value(v) for c, v in self.fill_values.items()},
+            "missing_counts": self.missing_counts,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "MissingValueImputer":
+        imputer = cls(state["strategy_num"], state["strategy_cat"])
+        imputer.fill_values = {c: _decode_value(v) for c, v in state["fill_values"].items()}
+        imputer.missing_counts = dict(state.get("missing_counts", {}))
+        return imputer
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"[INFO] Imputer statistics saved → {path}")
 
+    @classmethod
+    def load(cls, path: str) -> "MissingValueImputer":
+        with open(path, encoding="utf-8") as f:
+            imputer = cls.from_dict(json.load(f))
+        print(f"[INFO] Imputer statistics loaded ← {path}")
+        return imputer
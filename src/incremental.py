@@ -0,0 +1,318 @@
+# ============================================================
+# INCREMENTAL PROCESSING (watermark + dedupe index)
+# ============================================================
+# The raw CSV only ever grows by appended rows, so each run only
+# has to look at the bytes added since the previous one:
+#
+#   - Watermark:   byte offset of the first unprocessed row, plus the
+#                  header and a digest of the bytes just before the
+#                  offset (a rewritten file is detected and rebuilt).
+#   - HashIndex:   sorted 64-bit hashes of every Transaction ID already
+#                  written, used to drop re-sent rows.
+#   - Aggregates:  GroupByAccumulator states, merged with each delta.
+#   - PendingRun:  journal that makes a run all-or-nothing; a run
+#                  interrupted while writing is finished by the next one.
+#
+# Everything lives under data/processed/.incremental. New state is
+# written next to the old ('.next' files) and only moved into place
+# after the outputs have been written.
+# ============================================================
+
+import hashlib
+import io
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.load_data import _reconcile_categoricals, iter_csv, CsvSchema
+
+STATE_DIR = os.path.join("data", "processed", ".incremental")
+STATE_VERSION = 1
+_DIGEST_BYTES = 4096
+_TAIL_BYTES = 64
+_SCAN_BYTES = 1 << 16
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _digest_before(f, offset: int) -> str:
+    """Digest of the (up to) 4 KiB that end at offset."""
+    start = max(0, offset - _DIGEST_BYTES)
+    f.seek(start)
+    return hashlib.blake2b(f.read(offset - start), digest_size=16).hexdigest()
+
+
+# -----------------------------
+# Watermark
+# -----------------------------
+class Watermark:
+    """Byte position up to which a raw CSV has been processed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.state = {}
+        if self.state.get("version") != STATE_VERSION:
+            self.state = {}
+
+    @property
+    def offset(self) -> int:
+        return self.state.get("offset", 0)
+
+    def is_valid_for(self, raw_path: str) -> bool:
+        """True if raw_path is the same file the watermark was taken on, only appended to."""
+        if not self.state or self.state.get("raw_path") != os.path.abspath(raw_path):
+            return False
+        if os.path.getsize(raw_path) < self.offset:
+            return False
+        with open(raw_path, "rb") as f:
+            header = f.readline().decode("utf-8")
+            return (header == self.state.get("header")
+                    and _digest_before(f, self.offset) == self.state.get("digest"))
+
+    def advance(self, raw_path: str, offset: int, rows: int, max_date=None, path: str = None):
+        """Move the watermark past a processed delta; path defaults to self.path."""
+        with open(raw_path, "rb") as f:
+            header = f.readline().decode("utf-8")
+            digest = _digest_before(f, offset)
+        self.state = {
+            "version": STATE_VERSION,
+            "raw_path": os.path.abspath(raw_path),
+            "header": header,
+            "offset": offset,
+            "digest": digest,
+            "rows": self.state.get("rows", 0) + rows,
+            "max_date": max(filter(None, [max_date, self.state.get("max_date")]), default=None),
+        }
+        _atomic_write(path or self.path, json.dumps(self.state, indent=2).encode("utf-8"))
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only stream of a CSV header line followed by the file's bytes [start, end)."""
+
+    def __init__(self, f, header: bytes, start: int, end: int):
+        self._f, self._header = f, header
+        self._start, self._size = start, len(header) + end - start
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = min(max(0, base + pos), self._size)
+        return self._pos
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._size - self._pos)
+        if n <= 0:
+            return 0
+        if self._pos < len(self._header):
+            data = self._header[self._pos:self._pos + n]
+        else:
+            self._f.seek(self._start + self._pos - len(self._header))
+            data = self._f.read(n)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _end_of_last_line(f, start: int, size: int) -> int:
+    """Offset just past the last newline in [start, size), scanning back from the end; start if none."""
+    pos = size
+    while pos > start:
+        block = max(start, pos - _SCAN_BYTES)
+        f.seek(block)
+        newline = f.read(pos - block).rfind(b"\n")
+        if newline >= 0:
+            return block + newline + 1
+        pos = block
+    return start
+
+
+def read_delta(raw_path: str, offset: int, schema: CsvSchema = None, chunksize: int = 100_000):
+    """
+    Parse the complete rows appended after byte `offset`.
+    Returns (df, new_offset); a trailing line without its newline is left
+    for the next run. The delta is streamed through iter_csv in chunks of
+    chunksize rows, so the raw bytes are never held in memory at once.
+    """
+    with open(raw_path, "rb") as f:
+        header = f.readline()
+        start = max(offset, f.tell())
+        end = _end_of_last_line(f, start, os.fstat(f.fileno()).st_size)
+        if end == start:
+            return pd.DataFrame(), start
+        stream = io.BufferedReader(_ByteRange(f, header, start, end), buffer_size=1 << 20)
+        chunks = list(iter_csv(stream, chunksize, schema=schema))
+    return pd.concat(_reconcile_categoricals(chunks), ignore_index=True), end
+
+
+# -----------------------------
+# Dedupe index
+# -----------------------------
+class HashIndex:
+    """
+    Persisted set of 64-bit key hashes (sorted uint64 array, .npy).
+    Membership is a vectorized searchsorted, so a day's delta is checked
+    against the whole history without keeping its keys in memory as strings.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self.hashes = np.load(path)
+        except (FileNotFoundError, ValueError):
+            self.hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def hash(values: pd.Series) -> np.ndarray:
+        """Hashes of the non-missing keys (missing keys are never indexed)."""
+        values = values[values.notna()]
+        return pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(self.hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self.hashes, hashes).clip(max=len(self.hashes) - 1)
+        return self.hashes[pos] == hashes
+
+    def new_rows(self, values: pd.Series) -> np.ndarray:
+        """
+        Mask of rows whose key is neither indexed nor repeated earlier in
+        values. Rows without a key cannot be deduplicated and are kept.
+        """
+        present = values.notna().to_numpy()
+        hashes = self.hash(values)
+        fresh = np.ones(len(values), dtype=bool)
+        fresh[present] = ~self.contains(hashes) & ~pd.Series(hashes).duplicated().to_numpy()
+        return fresh
+
+    def clear(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+        return self
+
+    def add(self, values: pd.Series):
+        """Insert new hashes: only the delta is sorted, then merged in by position."""
+        delta = np.unique(self.hash(values))
+        delta = delta[~self.contains(delta)]
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, delta), delta)
+
+    def save(self, path: str = None):
+        path = path or self.path
+        tmp = path + ".tmp.npy"
+        np.save(tmp, self.hashes)
+        os.replace(tmp, path)
+
+
+# -----------------------------
+# Persisted aggregates
+# -----------------------------
+def load_aggregates(path: str) -> dict:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return {}
+
+
+def save_aggregates(path: str, aggregates: dict):
+    _atomic_write(path, pickle.dumps(aggregates, protocol=5))
+
+
+# -----------------------------
+# Commit journal
+# -----------------------------
+def _tail(path: str, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(max(0, size - _TAIL_BYTES))
+        return f.read()
+
+
+class PendingRun:
+    """
+    Makes one incremental run all-or-nothing.
+
+    Before any output is touched, prepare() stores the cleaned delta, the
+    size and last bytes of every output file, and the list of state files
+    already written as '<target>.next' (index, aggregates, watermark...);
+    pending.json is written last and marks the run as prepared. After the
+    outputs are written, commit() moves the .next files into place and
+    removes the marker.
+
+    A run interrupted after prepare() is finished by the next one:
+    restore_outputs() cuts the outputs back to their recorded state (an
+    appended JSON array also gets its old closing bytes back), the delta is
+    written again and commit() is repeated. Both steps are idempotent.
+    """
+
+    def __init__(self, state_dir: str = STATE_DIR):
+        self.path = os.path.join(state_dir, "pending.json")
+        self.delta_path = os.path.join(state_dir, "pending_delta.pkl")
+
+    @staticmethod
+    def staged(target: str) -> str:
+        return target + ".next"
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def prepare(self, delta: pd.DataFrame, full: bool, outputs, staged) -> dict:
+        outputs_state = {}
+        for path in outputs:
+            if os.path.exists(path):
+                size = os.path.getsize(path)
+                outputs_state[path] = {"size": size, "tail": _tail(path, size).hex()}
+            else:
+                outputs_state[path] = None
+        _atomic_write(self.delta_path, pickle.dumps(delta, protocol=5))
+        state = {"version": STATE_VERSION, "full": full, "rows": len(delta),
+                 "outputs": outputs_state, "staged": list(staged)}
+        _atomic_write(self.path, json.dumps(state, indent=2).encode("utf-8"))
+        return state
+
+    def load(self):
+        """(state, delta) of the interrupted run."""
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        with open(self.delta_path, "rb") as f:
+            delta = pickle.load(f)
+        return state, delta
+
+    def restore_outputs(self, state: dict):
+        for path, recorded in state["outputs"].items():
+            if recorded is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            tail = bytes.fromhex(recorded["tail"])
+            with open(path, "r+b") as f:
+                f.seek(recorded["size"] - len(tail))
+                f.write(tail)
+                f.truncate()
+
+    def commit(self, state: dict):
+        for target in state["staged"]:
+            if os.path.exists(self.staged(target)):
+                os.replace(self.staged(target), target)
+        os.remove(self.path)
+        if os.path.exists(self.delta_path):
+            os.remove(self.delta_path)
@@ -0,0 +1,355 @@
+# ============================================================
+# LAZY QUERY PLANS (load → transform, optimized before running)
+# ============================================================
+#
+#   q3 = (scan_csv("data/raw/dirty_cafe_sales.csv", CAFE_SALES_SCHEMA)
+#         .filter(col("Transaction Date").between("2023-07-01", "2023-09-30"))
+#         .group_by("Location", {"Total Spent": "sum"}))
+#   print(q3.explain())
+#   df = q3.collect()
+#
+# Nothing is read until collect(). The optimizer then:
+#   - fuses adjacent filters into one conjunction and adjacent
+#     derived columns into one step,
+#   - moves filters ahead of derived columns, selects and sorts,
+#   - pushes filter terms into the source (SQL WHERE, Parquet
+#     partition/row-group filters) or, for CSV, into the chunk loop,
+#   - pushes the columns the plan actually needs into the reader
+#     (usecols / SQL projection / Parquet columns) and drops derived
+#     columns nobody reads.
+#
+# The source is read in chunks; filters, derived columns and selects run
+# per chunk, and a group-by (GroupByAccumulator) or sort (external_sort)
+# consumes the chunks without materializing the whole input.
+# ============================================================
+
+import pandas as pd
+
+from src.load_data import CsvSchema, SqlSource, iter_csv, load_parquet
+from src.transform_data import (Expr, GroupByAccumulator, add_new_column, external_sort,
+                                filter_rows, sort_data)
+
+# 'ne' stays in the chunk filter: SQL and Arrow drop NULL rows from col != v,
+# pandas keeps them.
+_PUSHDOWN_OPS = {"eq": "=", "lt": "<", "le": "<=", "gt": ">", "ge": ">="}
+_FLIPPED_OPS = {"eq": "eq", "lt": "gt", "le": "ge", "gt": "lt", "ge": "le"}
+
+
+# -----------------------------
+# Expression helpers
+# -----------------------------
+def _conjuncts(expr: Expr) -> list:
+    """Split a & b & c into [a, b, c]."""
+    if expr.op == "and":
+        return _conjuncts(expr.args[0]) + _conjuncts(expr.args[1])
+    return [expr]
+
+
+def _conjunction(terms: list):
+    result = None
+    for term in terms:
+        result = term if result is None else result & term
+    return result
+
+
+def _as_filter(term: Expr):
+    """(column, op, value) for build_select/load_parquet, or None if not expressible."""
+    op, args = term.op, term.args
+    if op in _PUSHDOWN_OPS:
+        left, right = args
+        if left.op == "col" and right.op == "lit":
+            return left.args[0], _PUSHDOWN_OPS[op], right.args[0]
+        if left.op == "lit" and right.op == "col":
+            return right.args[0], _PUSHDOWN_OPS[_FLIPPED_OPS[op]], left.args[0]
+        return None
+    if op == "isin" and args[0].op == "col":
+        return args[0].args[0], "in", list(args[1])
+    if op in ("isna", "notna") and args[0].op == "col":
+        return args[0].args[0], "is null" if op == "isna" else "is not null", None
+    return None
+
+
+# -----------------------------
+# Sources
+# -----------------------------
+class _Scan:
+    """Where the plan reads from, plus whatever was pushed into the read."""
+
+    def __init__(self, kind, target, schema=None, table=None, chunksize=100_000):
+        self.kind = kind            # 'csv', 'sql' or 'parquet'
+        self.target = target
+        self.schema = schema
+        self.table = table
+        self.chunksize = chunksize
+        self.columns = None         # projection (None = all)
+        self.filters = []           # pushed (column, op, value) terms
+        self.chunk_filter = None    # Expr applied to each chunk as it is read
+
+    def copy(self):
+        scan = _Scan(self.kind, self.target, self.schema, self.table, self.chunksize)
+        scan.columns = self.columns
+        scan.filters = list(self.filters)
+        scan.chunk_filter = self.chunk_filter
+        return scan
+
+    def describe(self) -> str:
+        name = f"{self.target}" + (f" [{self.table}]" if self.table else "")
+        parts = [f"Scan {self.kind} {name}"]
+        parts.append(f"columns={self.columns if self.columns is not None else '*'}")
+        if self.filters:
+            parts.append(f"pushed={self.filters}")
+        if self.chunk_filter is not None:
+            parts.append(f"chunk_filter={self.chunk_filter!r}")
+        return " ".join(parts)
+
+    def chunks(self):
+        if self.kind == "csv":
+            schema = self.schema
+            kwargs = {}
+            if self.columns is not None:
+                kwargs["usecols"] = list(self.columns)
+                schema = schema.select(self.columns) if schema is not None else None
+            source = iter_csv(self.target, self.chunksize, schema=schema, **kwargs)
+        elif self.kind == "sql":
+            source = SqlSource(self.target).iter_select(self.table, self.columns, self.filters,
+                                                       chunksize=self.chunksize)
+        else:
+            source = [load_parquet(self.target, columns=self.columns, filters=self.filters)]
+        for chunk in source:
+            if self.chunk_filter is not None:
+                chunk = filter_rows(chunk, self.chunk_filter)
+            yield chunk
+
+
+def scan_csv(path: str, schema: CsvSchema = None, chunksize: int = 100_000) -> "LazyFrame":
+    return LazyFrame(_Scan("csv", path, schema=schema, chunksize=chunksize))
+
+
+def scan_sql(db: str, table: str, chunksize: int = 50_000) -> "LazyFrame":
+    return LazyFrame(_Scan("sql", db, table=table, chunksize=chunksize))
+
+
+def scan_parquet(path: str) -> "LazyFrame":
+    return LazyFrame(_Scan("parquet", path))
+
+
+# -----------------------------
+# Plan
+# -----------------------------
+class LazyFrame:
+    """
+    An immutable chain of steps over one source. Steps are tuples:
+
+        ("filter", expr)
+        ("with_columns", [(name, expr), ...])
+        ("select", [columns])
+        ("group_by", keys, aggs)
+        ("sort", column, ascending, na_position)
+    """
+
+    def __init__(self, scan: _Scan, steps=()):
+        self.scan = scan
+        self.steps = tuple(steps)
+
+    def _then(self, step) -> "LazyFrame":
+        return LazyFrame(self.scan, self.steps + (step,))
+
+    # ---- building ----
+    def filter(self, condition: Expr) -> "LazyFrame":
+        if not isinstance(condition, Expr):
+            raise TypeError("LazyFrame.filter needs an Expr (e.g. col('Location') == 'Takeaway')")
+        return self._then(("filter", condition))
+
+    def with_column(self, name: str, expr: Expr) -> "LazyFrame":
+        if not isinstance(expr, Expr):
+            raise TypeError("LazyFrame.with_column needs an Expr")
+        return self._then(("with_columns", [(name, expr)]))
+
+    def select(self, *columns) -> "LazyFrame":
+        if len(columns) == 1 and not isinstance(columns[0], str):
+            columns = columns[0]
+        return self._then(("select", list(columns)))
+
+    def group_by(self, keys, aggs) -> "LazyFrame":
+        return self._then(("group_by", keys, aggs))
+
+    def sort(self, column, ascending=True, na_position="last") -> "LazyFrame":
+        return self._then(("sort", column, ascending, na_position))
+
+    # ---- optimizer ----
+    def optimize(self) -> "LazyFrame":
+        """Return an equivalent plan with fused steps and pushed-down work."""
+        steps = _push_filters_down(list(self.steps))
+        steps = _fuse(steps)
+        scan = self.scan.copy()
+
+        # Filters that reached the source.
+        if steps and steps[0][0] == "filter":
+            terms = _conjuncts(steps.pop(0)[1])
+            if scan.kind == "csv":
+                scan.chunk_filter = _conjunction(terms)
+            else:
+                residual = []
+                for term in terms:
+                    pushed = _as_filter(term)
+                    if pushed is None:
+                        residual.append(term)
+                    else:
+                        scan.filters.append(pushed)
+                scan.chunk_filter = _conjunction(residual)
+
+        steps, needed = _prune_columns(steps)
+        if needed is not None:
+            if scan.chunk_filter is not None:
+                needed |= scan.chunk_filter.columns()
+            scan.columns = sorted(needed)
+        return LazyFrame(scan, steps)
+
+    def explain(self) -> str:
+        """The optimized plan, one step per line (source first)."""
+        plan = self.optimize()
+        lines = [plan.scan.describe()]
+        for step in plan.steps:
+            lines.append("  → " + _describe(step))
+        return "\n".join(lines)
+
+    # ---- execution ----
+    def collect(self, optimize: bool = True) -> pd.DataFrame:
+        plan = self.optimize() if optimize else self
+        steps = list(plan.steps)
+
+        # Row-wise steps before the first group-by/sort run on each chunk.
+        split = next((i for i, s in enumerate(steps) if s[0] in ("group_by", "sort")), len(steps))
+        chunk_steps, rest = steps[:split], steps[split:]
+        chunks = (_apply(chunk, chunk_steps) for chunk in plan.scan.chunks())
+
+        rows = 0
+
+        def counted(source):
+            nonlocal rows
+            for chunk in source:
+                rows += len(chunk)
+                yield chunk
+
+        if rest and rest[0][0] == "group_by":
+            _, keys, aggs = rest.pop(0)
+            accumulator = GroupByAccumulator(keys, aggs)
+            for chunk in counted(chunks):
+                accumulator.update(chunk)
+            df = accumulator.result()
+        elif rest and rest[0][0] == "sort":
+            _, column, ascending, na_position = rest.pop(0)
+            blocks = list(external_sort(counted(chunks), column, ascending, na_position))
+            df = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame()
+        else:
+            frames = list(counted(chunks))
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        print(f"[INFO] Lazy plan: {rows} rows passed the scan "
+              f"({len(plan.scan.columns) if plan.scan.columns is not None else 'all'} columns read)")
+        return _apply(df, rest)
+
+    def __repr__(self):
+        return self.explain()
+
+
+# -----------------------------
+# Optimizer passes
+# -----------------------------
+def _push_filters_down(steps: list) -> list:
+    """Move each filter left past derived columns it does not read, selects and sorts."""
+    steps = list(steps)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, len(steps)):
+            step, before = steps[i], steps[i - 1]
+            if step[0] != "filter":
+                continue
+            reads = step[1].columns()
+            movable = (before[0] in ("select", "sort")
+                       or (before[0] == "with_columns"
+                           and not reads & {name for name, _ in before[1]}))
+            if movable:
+                steps[i - 1], steps[i] = step, before
+                changed = True
+    return steps
+
+
+def _fuse(steps: list) -> list:
+    """Merge adjacent filters, adjacent derived columns and adjacent selects."""
+    fused = []
+    for step in steps:
+        last = fused[-1] if fused else None
+        if last is not None and last[0] == step[0] == "filter":
+            fused[-1] = ("filter", last[1] & step[1])
+        elif last is not None and last[0] == step[0] == "with_columns":
+            fused[-1] = ("with_columns", last[1] + step[1])
+        elif last is not None and last[0] == step[0] == "select":
+            fused[-1] = step
+        else:
+            fused.append(step)
+    return fused
+
+
+def _prune_columns(steps: list):
+    """
+    Walk the plan backwards collecting the columns each step needs.
+    Returns (steps without unused derived columns, columns to read or None).
+    """
+    needed = None      # None = every column reaches the output
+    kept = []
+    for step in reversed(steps):
+        kind = step[0]
+        if kind == "select":
+            needed = set(step[1])
+        elif kind == "group_by":
+            keys = [step[1]] if isinstance(step[1], str) else list(step[1])
+            needed = set(keys) | set(step[2])
+        elif kind == "sort" and needed is not None:
+            needed |= {step[1]} if isinstance(step[1], str) else set(step[1])
+        elif kind == "filter" and needed is not None:
+            needed |= step[1].columns()
+        elif kind == "with_columns":
+            columns = step[1]
+            if needed is not None:
+                columns = [(name, expr) for name, expr in columns if name in needed]
+                if not columns:
+                    continue
+                needed -= {name for name, _ in columns}
+                for _, expr in columns:
+                    needed |= expr.columns()
+            step = ("with_columns", columns)
+        kept.append(step)
+    return list(reversed(kept)), needed
+
+
+def _apply(df: pd.DataFrame, steps: list) -> pd.DataFrame:
+    """Run plan steps eagerly on one frame."""
+    for step in steps:
+        kind = step[0]
+        if kind == "filter":
+            df = filter_rows(df, step[1])
+        elif kind == "with_columns":
+            for name, expr in step[1]:
+                df = add_new_column(df, name, expr)
+        elif kind == "select":
+            df = df[step[1]]
+        elif kind == "group_by":
+            df = GroupByAccumulator(step[1], step[2]).update(df).result()
+        elif kind == "sort":
+            df = sort_data(df, step[1], step[2], step[3])
+    return df
+
+
+def _describe(step) -> str:
+    kind = step[0]
+    if kind == "filter":
+        return f"Filter {step[1]!r}"
+    if kind == "with_columns":
+        return "WithColumns " + ", ".join(f"{name}={expr!r}" for name, expr in step[1])
+    if kind == "select":
+        return f"Select {step[1]}"
+    if kind == "group_by":
+        return f"GroupBy {step[1]} {step[2]}"
+    return f"Sort {step[1]} ascending={step[2]}"
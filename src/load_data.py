@@ -1,15 +1,175 @@
+import numpy as np
 import pandas as pd
+import glob
 import json
-import sqlite3
-from typing import Union
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, Union
 
-def load_csv(file_path: str) -> pd.DataFrame:
+from src.metrics import instrument
+
+
+# -----------------------------
+# Declarative CSV schema
+# -----------------------------
+@dataclass
+class CsvSchema:
+    """
+    Column types applied while parsing, so typed columns never pass through
+    a Python-object stage.
+
+    dtypes:        column -> dtype (e.g. 'float64')
+    dates:         column -> strftime format of the raw values
+    categoricals:  columns stored as pandas 'category'
+    na_values:     sentinel tokens parsed as missing (e.g. 'ERROR')
+    """
+    dtypes: dict = field(default_factory=dict)
+    dates: dict = field(default_factory=dict)
+    categoricals: list = field(default_factory=list)
+    na_values: list = field(default_factory=list)
+
+    def read_csv_kwargs(self) -> dict:
+        dtype = dict(self.dtypes)
+        dtype.update({col: "category" for col in self.categoricals})
+        kwargs = {"dtype": dtype, "na_values": list(self.na_values)}
+        if self.dates:
+            kwargs["parse_dates"] = list(self.dates)
+            kwargs["date_format"] = dict(self.dates)
+        return kwargs
+
+    def finalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Coerce date columns the parser could not convert in one go."""
+        for col, fmt in self.dates.items():
+            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], format=fmt, errors="coerce")
+        return df
+
+    def safe_read_csv_kwargs(self) -> dict:
+        """Like read_csv_kwargs(), but numeric columns are coerced after parsing."""
+        kwargs = self.read_csv_kwargs()
+        kwargs["dtype"] = {c: t for c, t in kwargs["dtype"].items() if c not in self.dtypes}
+        return kwargs
+
+    def coerce_numeric(self, df: pd.DataFrame) -> pd.DataFrame:
+        for col, dtype in self.dtypes.items():
+            if col in df.columns and pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype)):
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+        return df
+
+    def select(self, columns) -> "CsvSchema":
+        """The part of the schema that applies to `columns` (e.g. for usecols)."""
+        columns = set(columns)
+        return CsvSchema(
+            dtypes={c: t for c, t in self.dtypes.items() if c in columns},
+            dates={c: f for c, f in self.dates.items() if c in columns},
+            categoricals=[c for c in self.categoricals if c in columns],
+            na_values=list(self.na_values),
+        )
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the schema to an already-parsed frame (e.g. from JSON)."""
+        if self.na_values:
+            df = df.replace(list(self.na_values), None)
+        df = self.coerce_numeric(df)
+        for col in self.categoricals:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        return self.finalize(df)
+
+
+CAFE_SALES_SCHEMA = CsvSchema(
+    dtypes={"Quantity": "float64", "Price Per Unit": "float64", "Total Spent": "float64"},
+    dates={"Transaction Date": "%Y-%m-%d"},
+    categoricals=["Item", "Payment Method", "Location"],
+    na_values=["ERROR", "UNKNOWN"],
+)
+
+
+def _read_csv(source, schema: Optional[CsvSchema] = None, **read_csv_kwargs) -> pd.DataFrame:
+    """pd.read_csv with the schema applied; unexpected tokens in numeric columns become NaN."""
+    if schema is None:
+        return pd.read_csv(source, **read_csv_kwargs)
+    try:
+        df = pd.read_csv(source, **schema.read_csv_kwargs(), **read_csv_kwargs)
+    except ValueError as e:
+        print(f"[WARN] Typed parse failed ({e}); coercing numeric columns instead")
+        df = schema.coerce_numeric(pd.read_csv(source, **schema.safe_read_csv_kwargs(), **read_csv_kwargs))
+    return schema.finalize(df)
+
+
+CSV_ENGINES = ("c", "pyarrow")
+
+
+def _read_csv_arrow(source, schema: Optional[CsvSchema] = None, usecols=None) -> pd.DataFrame:
+    """
+    Parse with Arrow's multithreaded CSV reader. Strings stay Arrow-backed
+    ('str'), datetimes come back as Arrow timestamps and categoricals as
+    dictionary-encoded columns. Unexpected tokens in typed columns fall back
+    to the same coercion as the C engine.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    schema = schema or CsvSchema()
+    column_types = {col: pa.from_numpy_dtype(pd.api.types.pandas_dtype(dtype))
+                    for col, dtype in schema.dtypes.items()}
+    column_types.update({col: pa.dictionary(pa.int32(), pa.string()) for col in schema.categoricals})
+    column_types.update({col: pa.timestamp("s") for col in schema.dates})
+
+    def convert_options(types):
+        return pacsv.ConvertOptions(
+            column_types=types, include_columns=list(usecols) if usecols else None,
+            null_values=["", "NaN", "nan", "NULL", "null"] + list(schema.na_values),
+            strings_can_be_null=True, timestamp_parsers=list(set(schema.dates.values())) or None)
+
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=16 << 20)
+    try:
+        table = pacsv.read_csv(source, read_options=read_options,
+                               convert_options=convert_options(column_types))
+        coerce = False
+    except pa.ArrowInvalid as e:
+        print(f"[WARN] Typed parse failed ({e}); coercing numeric and date columns instead")
+        if hasattr(source, "seek"):
+            source.seek(0)
+        loose = {c: t for c, t in column_types.items() if c not in schema.dtypes and c not in schema.dates}
+        table = pacsv.read_csv(source, read_options=read_options, convert_options=convert_options(loose))
+        coerce = True
+
+    df = table.to_pandas(types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_timestamp(t) else None)
+    if coerce:
+        df = schema.coerce_numeric(schema.finalize(df))
+        for col in schema.dates:
+            if col in df.columns:
+                df[col] = df[col].astype(pd.ArrowDtype(pa.timestamp("s")))
+    return df
+
+
+@instrument(reads="file_path")
+def load_csv(file_path: str, schema: Optional[CsvSchema] = None, engine: str = "c",
+             **read_csv_kwargs) -> pd.DataFrame:
     """
     Load data from a CSV file imperatively.
+    With a schema, dtypes, sentinels and dates are applied while parsing.
+
+    engine="pyarrow" parses on all cores with Arrow's CSV reader and keeps
+    string/datetime columns Arrow-backed; parse throughput is reported.
     """
+    if engine not in CSV_ENGINES:
+        print(f"[ERROR] Unsupported CSV engine: {engine} (expected one of {CSV_ENGINES})")
+        return pd.DataFrame()
     try:
-        df = pd.read_csv(file_path)
-        print(f"[INFO] CSV loaded successfully: {file_path}")
+        start = time.perf_counter()
+        if engine == "pyarrow":
+            df = _read_csv_arrow(file_path, schema, **read_csv_kwargs)
+        else:
+            df = _read_csv(file_path, schema, **read_csv_kwargs)
+        seconds = max(time.perf_counter() - start, 1e-9)
+        megabytes = os.path.getsize(file_path) / 1e6
+        print(f"[INFO] CSV loaded successfully: {file_path} "
+              f"({engine} engine, {len(df)} rows in {seconds:.3f}s, "
+              f"{megabytes / seconds:.1f} MB/s, {len(df) / seconds:,.0f} rows/s)")
         return df
     except FileNotFoundError:
         print(f"[ERROR] CSV file not found: {file_path}")
@@ -19,6 +179,46 @@ def load_csv(file_path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def iter_csv(file_path: str, chunksize: int = 100_000, schema: Optional[CsvSchema] = None,
+             **read_csv_kwargs):
+    """
+    Yield a CSV file as DataFrame chunks of at most `chunksize` rows,
+    so memory stays bounded regardless of file size.
+    file_path may also be a seekable binary stream; it is rewound on a restart.
+    """
+    kwargs = dict(schema.read_csv_kwargs()) if schema is not None else {}
+    kwargs.update(read_csv_kwargs)
+    coerce = False
+    rows_done = 0
+    while True:
+        if hasattr(file_path, "seek"):
+            file_path.seek(0)
+        try:
+            reader = pd.read_csv(file_path, chunksize=chunksize,
+                                 skiprows=range(1, rows_done + 1) if rows_done else None, **kwargs)
+        except FileNotFoundError:
+            print(f"[ERROR] CSV file not found: {file_path}")
+            return
+        try:
+            with reader:
+                for chunk in reader:
+                    if coerce:
+                        chunk = schema.coerce_numeric(chunk)
+                    if schema is not None:
+                        chunk = schema.finalize(chunk)
+                    rows_done += len(chunk)
+                    yield chunk
+            return
+        except ValueError as e:
+            if schema is None or coerce:
+                raise
+            # Restart after the rows already yielded, coercing numeric columns.
+            print(f"[WARN] Typed parse failed ({e}); coercing numeric columns instead")
+            coerce = True
+            kwargs = dict(schema.safe_read_csv_kwargs(), **read_csv_kwargs)
+
+
+@instrument(reads="file_path")
 def load_json(file_path: str) -> pd.DataFrame:
     """
     Load data from a JSON file imperatively.
@@ -38,35 +238,423 @@ def load_json(file_path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def load_sql(db_path: str, query: str) -> pd.DataFrame:
+# -----------------------------
+# Columnar sources (Parquet dataset / Feather file)
+# -----------------------------
+def _arrow_filter(filters):
+    """
+    Turn build_select-style filters [(column, op, value), ...] into one
+    pyarrow.dataset expression (ANDed), or None.
+    """
+    import pyarrow.dataset as ds
+
+    expression = None
+    for column, op, value in filters or []:
+        op = op.lower()
+        field_ = ds.field(column)
+        if op in ("=", "=="):
+            term = field_ == value
+        elif op == "!=":
+            term = field_ != value
+        elif op == "<":
+            term = field_ < value
+        elif op == "<=":
+            term = field_ <= value
+        elif op == ">":
+            term = field_ > value
+        elif op == ">=":
+            term = field_ >= value
+        elif op == "in":
+            term = field_.isin(list(value))
+        elif op == "between":
+            term = (field_ >= value[0]) & (field_ <= value[1])
+        elif op == "is null":
+            term = field_.is_null()
+        elif op == "is not null":
+            term = field_.is_valid()
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _month_filters(filters, date_column: str, month_column: str) -> list:
     """
-    Load data from a SQL database (SQLite) imperatively.
+    Mirror range filters on the date column onto the 'YYYY-MM' partition
+    column, so whole month directories are pruned without being opened.
+    """
+    def month(value):
+        return pd.Timestamp(value).strftime("%Y-%m")
+
+    derived = []
+    for column, op, value in filters or []:
+        op = op.lower()
+        if column != date_column:
+            continue
+        if op == "between":
+            derived.append((month_column, "between", (month(value[0]), month(value[1]))))
+        elif op in ("=", "=="):
+            derived.append((month_column, "=", month(value)))
+        elif op in (">", ">="):
+            derived.append((month_column, ">=", month(value)))
+        elif op in ("<", "<="):
+            derived.append((month_column, "<=", month(value)))
+    return derived
+
+
+def _as_timestamps(value):
+    """Date filter values given as strings are compared as timestamps."""
+    if isinstance(value, (list, tuple)):
+        return type(value)(_as_timestamps(v) for v in value)
+    return pd.Timestamp(value) if isinstance(value, str) else value
+
+
+@instrument(reads="path")
+def load_parquet(path: str, columns=None, filters=None,
+                 date_column: str = "Transaction Date",
+                 month_column: str = "Transaction Month") -> pd.DataFrame:
+    """
+    Read a (hive-partitioned) Parquet dataset with the projection and
+    filters pushed into the scan:
+
+        load_parquet("data/processed/cleaned_cafe_sales.parquet",
+                     columns=["Item", "Total Spent"],
+                     filters=[("Location", "=", "Takeaway"),
+                              ("Transaction Date", "between", ("2023-07-01", "2023-09-30"))])
+
+    Partition directories that cannot match are never opened, row groups
+    are skipped by their min/max statistics, and only the requested
+    columns are decoded. Filters use the same (column, op, value) form as
+    build_select. The result keeps the stored dtypes.
     """
     try:
-        conn = sqlite3.connect(db_path)
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        print(f"[INFO] SQL query executed successfully: {db_path}")
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        names = set(dataset.schema.names)
+        filters = list(filters or [])
+        if month_column in names:
+            filters += _month_filters(filters, date_column, month_column)
+        filters = [(c, op, _as_timestamps(v)) if c == date_column else (c, op, v)
+                   for c, op, v in filters]
+
+        table = dataset.to_table(columns=list(columns) if columns else None,
+                                 filter=_arrow_filter(filters))
+        df = table.to_pandas()
+        # Partition columns come back as plain strings at the end of the
+        # frame; restore the saved order and categorical dtypes.
+        stored = (dataset.schema.pandas_metadata or {}).get("columns", [])
+        for meta in stored:
+            name = meta["name"]
+            if meta["pandas_type"] == "categorical" and name in df.columns \
+                    and not isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype("category")
+        order = [meta["name"] for meta in stored if meta["name"] in df.columns]
+        df = df[order + [c for c in df.columns if c not in order]]
+        print(f"[INFO] Parquet loaded successfully: {path} ({len(df)} rows)")
+        return df
+    except FileNotFoundError:
+        print(f"[ERROR] Parquet dataset not found: {path}")
+        return pd.DataFrame()
+    except Exception as e:
+        print(f"[ERROR] Failed to load Parquet: {e}")
+        return pd.DataFrame()
+
+
+@instrument(reads="file_path")
+def load_feather(file_path: str, columns=None, memory_map: bool = False) -> pd.DataFrame:
+    """
+    Load a Feather file. With memory_map=True an uncompressed file is mapped
+    instead of read, and numeric columns without nulls point straight into
+    the mapping (no copy).
+    """
+    try:
+        import pyarrow.feather as feather
+
+        table = feather.read_table(file_path, columns=columns, memory_map=memory_map)
+        df = table.to_pandas(split_blocks=memory_map, self_destruct=memory_map)
+        print(f"[INFO] Feather loaded successfully: {file_path}")
         return df
-    except sqlite3.Error as e:
-        print(f"[ERROR] SQL error: {e}")
+    except FileNotFoundError:
+        print(f"[ERROR] Feather file not found: {file_path}")
         return pd.DataFrame()
+    except Exception as e:
+        print(f"[ERROR] Failed to load Feather: {e}")
+        return pd.DataFrame()
+
+
+# -----------------------------
+# Multi-file ingestion (directory, glob or list of paths)
+# -----------------------------
+FILE_READERS = {".csv": "csv", ".json": "json"}
+
+
+def expand_paths(paths) -> list:
+    """
+    Resolve a directory, a glob pattern, a single path or a list of any of
+    those into a sorted, de-duplicated list of CSV/JSON files.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            found = [os.path.join(path, name) for name in os.listdir(path)
+                     if os.path.splitext(name)[1].lower() in FILE_READERS]
+        elif glob.has_magic(path):
+            found = glob.glob(path, recursive=True)
+        else:
+            found = [path]
+        files.extend(sorted(found))
+    return list(dict.fromkeys(files))
+
+
+def _read_file(path: str, schema: Optional[CsvSchema] = None, read_csv_kwargs: dict = None):
+    """Worker: parse one file. Returns (path, frame, error message)."""
+    try:
+        kind = FILE_READERS.get(os.path.splitext(path)[1].lower())
+        if kind == "csv":
+            df = _read_csv(path, schema, **(read_csv_kwargs or {}))
+        elif kind == "json":
+            df = pd.read_json(path)
+            if schema is not None:
+                df = schema.apply(df)
+        else:
+            raise ValueError("unsupported file type")
+        return path, df, None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def _reconcile_categoricals(frames: list) -> list:
+    """
+    Give every categorical column the union of its categories across frames,
+    so concat keeps it categorical instead of falling back to object.
+    """
+    columns = {}
+    for df in frames:
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                columns.setdefault(col, []).append(df[col].cat.categories)
+    for col, category_sets in columns.items():
+        categories = category_sets[0]
+        for other in category_sets[1:]:
+            categories = categories.union(other, sort=False)
+        dtype = pd.CategoricalDtype(categories)
+        for df in frames:
+            if col in df.columns and df[col].dtype != dtype:
+                df[col] = df[col].astype(dtype)
+    return frames
+
+
+@instrument(reads=lambda a: expand_paths(a["paths"]))
+def load_files(paths, schema: Optional[CsvSchema] = None, processes: Optional[int] = None,
+               source_column: Optional[str] = "source_file", **read_csv_kwargs):
+    """
+    Load many CSV/JSON files in parallel (one file per task in a process
+    pool) and concatenate them into one frame.
+
+    Each row is tagged with its file in `source_column` (categorical: one
+    code per row, one string per file). Returns (df, failures) where
+    failures is {path: error message}; failed files are skipped.
+    """
+    files = expand_paths(paths)
+    if not files:
+        print(f"[ERROR] No input files matched: {paths}")
+        return pd.DataFrame(), {}
+
+    workers = min(processes or os.cpu_count() or 1, len(files))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_file, files, [schema] * len(files),
+                                    [read_csv_kwargs] * len(files),
+                                    chunksize=max(1, len(files) // (workers * 4))))
+    else:
+        results = [_read_file(path, schema, read_csv_kwargs) for path in files]
+
+    frames, sources, failures = [], [], {}
+    for path, df, error in results:
+        if error is not None:
+            failures[path] = error
+            print(f"[ERROR] Failed to load {path}: {error}")
+        else:
+            frames.append(df)
+            sources.append(path)
+
+    if not frames:
+        print(f"[ERROR] All {len(files)} input files failed to load")
+        return pd.DataFrame(), failures
+
+    frames = _reconcile_categoricals(frames)
+    df = pd.concat(frames, ignore_index=True, sort=False)
+    if source_column:
+        lengths = [len(frame) for frame in frames]
+        df[source_column] = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(sources)), lengths), categories=sources)
+
+    status = "[WARN]" if failures else "[INFO]"
+    print(f"{status} Loaded {len(df)} rows from {len(frames)}/{len(files)} files "
+          f"using {workers} process(es)")
+    return df, failures
+
+
+# -----------------------------
+# SQL source (pooled, parameterized, chunked)
+# -----------------------------
+_ENGINES = {}
+
+_SQL_OPERATORS = {"=", "!=", "<", "<=", ">", ">=", "in", "between", "is null", "is not null"}
+
+
+def get_engine(db: str):
+    """
+    Pooled SQLAlchemy engine per database URL, created once per process.
+    A plain file path is treated as a SQLite database.
+    """
+    url = db if "://" in db else f"sqlite:///{db}"
+    engine = _ENGINES.get(url)
+    if engine is None:
+        from sqlalchemy import create_engine
+        engine = create_engine(url, pool_pre_ping=True)
+        _ENGINES[url] = engine
+    return engine
+
+
+def build_select(table: str, columns=None, filters=None, quote=None):
+    """
+    Build a parameterized SELECT with projection and simple filters pushed
+    into the SQL.
+
+    filters: [(column, op, value), ...] with op in _SQL_OPERATORS, e.g.
+             [("Transaction Date", "between", ("2023-07-01", "2023-09-30")),
+              ("Location", "in", ["Takeaway"])]
+    Returns (sql, params) for sqlalchemy.text().
+    """
+    quote = quote or (lambda name: '"' + name.replace('"', '""') + '"')
+    projection = ", ".join(quote(c) for c in columns) if columns else "*"
+    sql = f"SELECT {projection} FROM {quote(table)}"
+
+    clauses, params = [], {}
+
+    def bind(value):
+        name = f"p{len(params)}"
+        params[name] = value
+        return f":{name}"
+
+    for column, op, value in filters or []:
+        op = op.lower()
+        if op not in _SQL_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        target = quote(column)
+        if op == "in":
+            clauses.append(f"{target} IN ({', '.join(bind(v) for v in value)})")
+        elif op == "between":
+            clauses.append(f"{target} BETWEEN {bind(value[0])} AND {bind(value[1])}")
+        elif op in ("is null", "is not null"):
+            clauses.append(f"{target} {op.upper()}")
+        else:
+            clauses.append(f"{target} {op} {bind(value)}")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql, params
+
+
+class SqlSource:
+    """
+    Read from a database through a pooled connection:
+
+        source = SqlSource("data/raw/sales.db")
+        df = source.read("SELECT * FROM sales WHERE Location = :loc", {"loc": "Takeaway"})
+        for chunk in source.iter_select("sales", columns=[...], filters=[...], chunksize=50_000):
+            ...
+
+    Results are streamed in row chunks (server-side cursors where the
+    driver supports them, fetchmany-style partitions otherwise).
+    """
+
+    def __init__(self, db: str):
+        self.db = db
+        self.engine = get_engine(db)
+
+    def _quote(self, name: str) -> str:
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def iter_query(self, query: str, params: dict = None, chunksize: int = 50_000):
+        """Yield the result of a parameterized query as DataFrames of chunksize rows."""
+        from sqlalchemy import text
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunksize) \
+                .execute(text(query), params or {})
+            columns = list(result.keys())
+            for rows in result.partitions(chunksize):
+                yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def read(self, query: str, params: dict = None, chunksize: int = 50_000) -> pd.DataFrame:
+        chunks = list(self.iter_query(query, params, chunksize))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    def iter_select(self, table: str, columns=None, filters=None, chunksize: int = 50_000):
+        sql, params = build_select(table, columns, filters, quote=self._quote)
+        return self.iter_query(sql, params, chunksize)
+
+    def select(self, table: str, columns=None, filters=None) -> pd.DataFrame:
+        sql, params = build_select(table, columns, filters, quote=self._quote)
+        return self.read(sql, params)
+
+
+@instrument()
+def load_sql(db_path: str, query: str, params: dict = None) -> pd.DataFrame:
+    """
+    Load data from a SQL database (SQLite path or SQLAlchemy URL) imperatively.
+    Connections come from a per-database pool; params are bound, not formatted.
+    """
+    try:
+        df = SqlSource(db_path).read(query, params)
+        print(f"[INFO] SQL query executed successfully: {db_path}")
+        return df
     except Exception as e:
         print(f"[ERROR] Failed to load SQL data: {e}")
         return pd.DataFrame()
 
 
-def load_data(source_type: str, path_or_query: str) -> pd.DataFrame:
+def _is_multi_path(path) -> bool:
+    if isinstance(path, (list, tuple)):
+        return True
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def load_data(source_type: str, path_or_query, schema: Optional[CsvSchema] = None,
+              query: str = "SELECT * FROM sales", params: dict = None,
+              processes: Optional[int] = None, engine: str = "c") -> pd.DataFrame:
     """
     Unified function to load data based on type: 'csv', 'json', 'sql'
+    For 'sql', path_or_query is the database and query/params the statement.
+
+    'parquet' and 'feather' read the typed columnar outputs.
+    engine selects the CSV parser ('c' or the multithreaded 'pyarrow').
+
+    For 'csv'/'json', path_or_query may also be a directory, a glob or a list
+    of paths: files are parsed in parallel and tagged with 'source_file',
+    and files that failed are listed in df.attrs["load_failures"].
     """
     source_type = source_type.lower()
+    if source_type in ('csv', 'json') and _is_multi_path(path_or_query):
+        df, failures = load_files(path_or_query, schema=schema, processes=processes)
+        df.attrs["load_failures"] = failures
+        return df
     if source_type == 'csv':
-        return load_csv(path_or_query)
+        return load_csv(path_or_query, schema=schema, engine=engine)
     elif source_type == 'json':
         return load_json(path_or_query)
     elif source_type == 'sql':
-        return load_sql(path_or_query, "SELECT * FROM sales")  # default table
+        return load_sql(path_or_query, query, params)
+    elif source_type == 'parquet':
+        return load_parquet(path_or_query)
+    elif source_type == 'feather':
+        return load_feather(path_or_query)
     else:
         print(f"[ERROR] Unsupported source type: {source_type}")
         return pd.DataFrame()
@@ -0,0 +1,254 @@
+# ============================================================
+# METRICS & STRUCTURED LOGGING
+# ============================================================
+# - EVENTS: bounded ring buffer of structured log events
+#   {time, level, message}; the oldest events are dropped first.
+# - Stage metrics: functions decorated with @instrument() record, per
+#   stage name, calls, wall time, rows in/out, rows per second, bytes
+#   read/written and the process's peak RSS.
+# - Counters: named counts a stage reports (record_counts), e.g. the
+#   rows fixed by each consistency-repair rule.
+# - export_metrics() writes both as JSON (metrics.json next to
+#   summary.txt) and appends one line per run to metrics_history.jsonl,
+#   so runs can be compared without scraping console output.
+# - With profiling on (src/profiling.py), instrumented calls are also
+#   run under cProfile / tracemalloc.
+# - lazy_import() defers heavy libraries (matplotlib, seaborn) to their
+#   first use and records the import as an 'import.<module>' stage.
+# ============================================================
+
+import functools
+import importlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from src import profiling
+
+try:
+    import resource
+except ImportError:   # not available on Windows
+    resource = None
+
+MAX_EVENTS = 10_000
+LEVELS = ("DEBUG", "INFO", "OK", "SUCCESS", "CACHE", "WARN", "ERROR")
+
+EVENTS = deque(maxlen=MAX_EVENTS)
+STAGES = {}
+COUNTERS = {}
+_RUN = {"started": time.time(), "events_total": 0}
+ENABLED = True
+_LOCK = threading.Lock()
+
+
+def _level_of(message: str) -> str:
+    """Level from a leading '[LEVEL]' tag, INFO otherwise."""
+    text = message.lstrip()
+    if text.startswith("["):
+        tag = text[1:text.find("]")].strip().upper()
+        if tag in LEVELS:
+            return tag
+    return "INFO"
+
+
+def record_event(message: str, level: str = None, **fields):
+    """Append one structured event to the ring buffer."""
+    event = {"time": time.time(), "level": level or _level_of(message), "message": message}
+    event.update(fields)
+    EVENTS.append(event)
+    _RUN["events_total"] += 1
+    return event
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def record_stage(stage: str, seconds: float, rows_in=None, rows_out=None,
+                 bytes_read=None, bytes_written=None):
+    """Fold one call of a stage into its running totals (thread-safe)."""
+    peak = peak_rss_mb()
+    with _LOCK:
+        entry = STAGES.setdefault(stage, {"calls": 0, "seconds": 0.0, "rows_in": 0, "rows_out": 0,
+                                          "bytes_read": 0, "bytes_written": 0})
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["rows_in"] += rows_in or 0
+        entry["rows_out"] += rows_out or 0
+        entry["bytes_read"] += bytes_read or 0
+        entry["bytes_written"] += bytes_written or 0
+        entry["peak_rss_mb"] = peak
+
+
+def record_counts(group: str, counts: dict):
+    """Add named counts (e.g. rows repaired per rule) to the run's counters under group."""
+    with _LOCK:
+        totals = COUNTERS.setdefault(group, {})
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + int(count)
+
+
+def lazy_import(name: str):
+    """importlib.import_module, timing the first import as stage 'import.<name>'."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    record_stage(f"import.{name}", time.perf_counter() - start)
+    return module
+
+
+def rows_of(value):
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame):
+        return len(value[0])
+    return None
+
+
+def _size(paths) -> int:
+    """Total size of files (directories are walked); missing paths count as 0."""
+    if paths is None:
+        return 0
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        elif os.path.isfile(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def _resolve(spec, arguments):
+    """A path spec is a parameter name or a callable on the bound arguments."""
+    if spec is None:
+        return None
+    if callable(spec):
+        return spec(arguments)
+    return arguments.get(spec)
+
+
+def instrument(stage: str = None, reads=None, writes=None, appends=False):
+    """
+    Decorator recording a call as a stage:
+
+        @instrument(reads="file_path")
+        def load_csv(file_path, ...): ...
+
+        @instrument(writes=lambda a: os.path.join("data", "processed", a["filename"]),
+                    appends="append")
+        def save_csv(df, filename, append=False): ...
+
+    Rows in = length of the first DataFrame argument, rows out = length of
+    the returned DataFrame (or the first item of a returned tuple).
+    Bytes written = size of the output afterwards, or only its growth when
+    the call appends (appends=True or the name of a bool parameter).
+    """
+    def decorate(func):
+        name = stage or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            output = _resolve(writes, arguments)
+            appending = arguments.get(appends, False) if isinstance(appends, str) else appends
+            before = _size(output) if appending else 0
+
+            start = time.perf_counter()
+            if profiling.ENABLED:
+                with profiling.profile_stage(name):
+                    result = func(*args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+
+            frames = [v for v in arguments.values() if isinstance(v, pd.DataFrame)]
+            record_stage(name, seconds,
+                         rows_in=len(frames[0]) if frames else None,
+                         rows_out=rows_of(result),
+                         bytes_read=_size(_resolve(reads, arguments)),
+                         bytes_written=_size(output) - before)
+            return result
+        return wrapper
+    return decorate
+
+
+def stage_report() -> dict:
+    """Per-stage totals with derived throughput."""
+    report = {}
+    for name, entry in STAGES.items():
+        entry = dict(entry)
+        seconds = entry["seconds"]
+        rows = max(entry["rows_in"], entry["rows_out"])
+        entry["seconds"] = round(seconds, 6)
+        entry["rows_per_second"] = round(rows / seconds, 1) if seconds > 0 and rows else None
+        entry["mb_per_second"] = (round((entry["bytes_read"] + entry["bytes_written"]) / 1e6 / seconds, 2)
+                                  if seconds > 0 and (entry["bytes_read"] or entry["bytes_written"])
+                                  else None)
+        report[name] = entry
+    return report
+
+
+def export_metrics(path: str, history_path: str = None) -> dict:
+    """Write this run's metrics to path (JSON) and append a summary line to history_path."""
+    now = time.time()
+    levels = {}
+    for event in EVENTS:
+        levels[event["level"]] = levels.get(event["level"], 0) + 1
+    metrics = {
+        "run": {
+            "started": datetime.fromtimestamp(_RUN["started"], timezone.utc).isoformat(),
+            "finished": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "wall_seconds": round(now - _RUN["started"], 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "argv": sys.argv,
+        },
+        "stages": stage_report(),
+        "counters": {group: dict(counts) for group, counts in COUNTERS.items()},
+        "events": {
+            "total": _RUN["events_total"],
+            "kept": len(EVENTS),
+            "dropped": _RUN["events_total"] - len(EVENTS),
+            "by_level": levels,
+            "errors": [e["message"] for e in EVENTS if e["level"] == "ERROR"][-20:],
+        },
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2, default=str)
+    if history_path:
+        line = {"finished": metrics["run"]["finished"], "wall_seconds": metrics["run"]["wall_seconds"],
+                "peak_rss_mb": metrics["run"]["peak_rss_mb"],
+                "stages": {name: entry["seconds"] for name, entry in metrics["stages"].items()},
+                "counters": metrics["counters"]}
+        with open(history_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line) + "\n")
+    return metrics
+
+
+def reset():
+    EVENTS.clear()
+    STAGES.clear()
+    COUNTERS.clear()
+    _RUN.update(started=time.time(), events_total=0)
@@ -15,6 +15,7 @@
 # 3. save_summary_report(summary, path)
 #    - Save text-based summaries or analysis reports.
 #    - Example: missing-value report, correlation report.
+#    - Also exports per-stage metrics as metrics.json (see src/metrics.py).
 #
 # 4. print_to_console(df, max_rows = 10)
 #    - Display sample rows to user.
@@ -24,24 +25,35 @@
 #    - Used by visualization module.
 #    - Ensures /plots/ directory exists.
 #
+# 6. save_sql(df, db, table)
+#    - Bulk load into a database table in one transaction.
+#    - Optional upsert on a key column; indexes built after the load.
+#
+# 7. save_parquet(df, dirname) / save_feather(df, filename)
+#    - Typed columnar outputs; Parquet is partitioned by month and Location.
+#
 # NOTES:
 # - All saving functions should print confirmation messages.
 # - Handle errors (invalid paths, permission issues).
 # - ALWAYS save processed results to /data/processed/
 # ============================================================
 import os
+import shutil
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from src.metrics import EVENTS, export_metrics, instrument, record_event
 
 # -----------------------------
-# GLOBAL LOG MEMORY
+# LOG (bounded ring buffer of structured events, see src/metrics.py)
 # -----------------------------
-LOG_MESSAGES = []  # كل الرسائل هتتحوش هنا
-
-def log(message: str):
-    """Print message to console and store in log for summary"""
+def log(message: str, level: str = None):
+    """Print message to console and record it as an event for the summary"""
     print(message)
-    LOG_MESSAGES.append(str(message))
+    record_event(str(message), level)
+
+
+def _processed_path(arguments, name="filename"):
+    return os.path.join("data", "processed", arguments[name])
 
 # -----------------------------
 # Ensure directory exists
@@ -55,10 +67,15 @@ def ensure_dir(path: str):
 # -----------------------------
 # Save CSV
 # -----------------------------
-def save_csv(df: pd.DataFrame, filename: str):
+@instrument(writes=_processed_path, appends="append")
+def save_csv(df: pd.DataFrame, filename: str, append: bool = False):
     path = os.path.join("data", "processed", filename)
     try:
         ensure_dir(path)
+        if append and os.path.exists(path):
+            df.to_csv(path, mode="a", header=False, index=False)
+            log(f"[SUCCESS] CSV appended → {path} (+{len(df)} rows)")
+            return
         df.to_csv(path, index=False)
         log(f"[SUCCESS] CSV saved → {path}")
     except Exception as e:
@@ -67,6 +84,7 @@ def save_csv(df: pd.DataFrame, filename: str):
 # -----------------------------
 # Save JSON
 # -----------------------------
+@instrument(writes=_processed_path)
 def save_json(df: pd.DataFrame, filename: str):
     path = os.path.join("data", "processed", filename)
     try:
@@ -76,14 +94,291 @@ def save_json(df: pd.DataFrame, filename: str):
     except Exception as e:
         log(f"[ERROR] Could not save JSON: {e}")
 
+# -----------------------------
+# Streamed JSON (records array written chunk by chunk)
+# -----------------------------
+class JsonRecordsWriter:
+    """
+    Write a JSON array of records incrementally:
+
+        with JsonRecordsWriter("cleaned.json") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, filename: str):
+        self.path = os.path.join("data", "processed", filename)
+        self.file = None
+        self.rows = 0
+
+    def __enter__(self):
+        ensure_dir(self.path)
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.file.write("[")
+        return self
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        body = df.to_json(orient="records", date_format="epoch")[1:-1]
+        if self.rows:
+            self.file.write(",")
+        self.file.write(body)
+        self.rows += len(df)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.write("]")
+        self.file.close()
+        if exc_type is None:
+            log(f"[SUCCESS] JSON saved → {self.path} ({self.rows} rows)")
+        else:
+            log(f"[ERROR] Could not save JSON: {exc}")
+        return False
+
+
+@instrument(writes=_processed_path, appends=True)
+def append_json_records(df: pd.DataFrame, filename: str):
+    """
+    Append records to an existing JSON array in place: only the closing
+    bracket is rewritten, the rows already in the file are not re-read.
+    """
+    path = os.path.join("data", "processed", filename)
+    try:
+        ensure_dir(path)
+        if df.empty and os.path.exists(path):
+            return
+        body = df.to_json(orient="records", date_format="epoch")[1:-1]
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("[" + body + "]")
+        else:
+            with open(path, "r+b") as f:
+                # Step back over trailing whitespace to the closing bracket.
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                f.seek(max(0, end - 64))
+                tail = f.read()
+                close = tail.rstrip().rfind(b"]")
+                if close < 0:
+                    raise ValueError(f"{path} is not a JSON array")
+                f.seek(end - len(tail) + close)
+                before = tail[:close].rstrip()
+                separator = "," if body and not before.endswith(b"[") else ""
+                f.write((separator + body + "]").encode("utf-8"))
+                f.truncate()
+        log(f"[SUCCESS] JSON appended → {path} (+{len(df)} rows)")
+    except Exception as e:
+        log(f"[ERROR] Could not append JSON: {e}")
+
+# -----------------------------
+# Save to SQL (bulk, transactional)
+# -----------------------------
+SQL_KEY_LENGTH = 255
+
+
+def _sql_type(series: pd.Series, indexed: bool = False) -> str:
+    """Column type from the dtype; indexed text is VARCHAR, since MySQL cannot key or index TEXT."""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "DOUBLE PRECISION"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    if indexed:
+        longest = series.dropna().astype(str).str.len().max()
+        return f"VARCHAR({max(SQL_KEY_LENGTH, 0 if pd.isna(longest) else int(longest))})"
+    return "TEXT"
+
+
+def _table_layout(engine, table: str):
+    """(unique column lists, index names) of an existing table, or None if there is no such table."""
+    from sqlalchemy import inspect
+    inspector = inspect(engine)
+    if not inspector.has_table(table):
+        return None
+    indexes = inspector.get_indexes(table)
+    unique = [inspector.get_pk_constraint(table)["constrained_columns"]]
+    unique += [c["column_names"] for c in inspector.get_unique_constraints(table)]
+    unique += [ix["column_names"] for ix in indexes if ix["unique"]]
+    return unique, {ix["name"] for ix in indexes}
+
+
+def _sql_columns(df: pd.DataFrame, iso_dates: bool) -> list:
+    """Column-wise conversion to DB-API values (None for missing), done once per column."""
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        missing = series.isna().to_numpy()
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            values = (series.dt.strftime("%Y-%m-%d %H:%M:%S") if iso_dates
+                      else pd.Series(series.dt.to_pydatetime(), index=series.index)).to_numpy(dtype=object, copy=True)
+        else:
+            values = series.to_numpy(dtype=object, copy=True)
+        values[missing] = None
+        columns.append(values)
+    return columns
+
+
+@instrument()
+def save_sql(df: pd.DataFrame, db: str, table: str, if_exists: str = "append",
+             key: str = None, indexes=(), batch_size: int = 100_000):
+    """
+    Bulk-load df into table, creating it from the frame's dtypes if needed.
+
+    - rows are sent with executemany in batches of batch_size, all inside
+      one transaction (rolled back on error). On SQLite and PostgreSQL the
+      DROP/CREATE of if_exists='replace' is part of it; MySQL commits DDL
+      implicitly, so there a failed replace can leave the table empty.
+    - key: primary-key column; existing rows with the same key are updated
+      (upsert) instead of failing. An existing table must already have a
+      primary key or unique index on it.
+    - indexes: columns to index, created only after the data is loaded
+      (skipped when an index of that name already exists)
+    - if_exists: 'append', 'replace' (drop first) or 'fail'
+    """
+    from src.load_data import get_engine
+
+    engine = get_engine(db)
+    dialect = engine.dialect.name
+    quote = engine.dialect.identifier_preparer.quote
+    marker = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+    columns = list(df.columns)
+    names = ", ".join(quote(c) for c in columns)
+
+    indexed = set(indexes) if key is None else set(indexes) | {key}
+    definitions = [f"{quote(c)} {_sql_type(df[c], c in indexed)}" for c in columns]
+    if key is not None:
+        definitions.append(f"PRIMARY KEY ({quote(key)})")
+    create = f"CREATE TABLE IF NOT EXISTS {quote(table)} ({', '.join(definitions)})"
+
+    insert = f"INSERT INTO {quote(table)} ({names}) VALUES ({', '.join([marker] * len(columns))})"
+    if key is not None:
+        updates = [c for c in columns if c != key]
+        if dialect == "mysql":
+            insert += " ON DUPLICATE KEY UPDATE " + ", ".join(f"{quote(c)} = VALUES({quote(c)})" for c in updates)
+        else:
+            insert += (f" ON CONFLICT ({quote(key)}) DO UPDATE SET "
+                       + ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in updates))
+
+    conn = engine.raw_connection()
+    try:
+        layout = None if if_exists == "replace" else _table_layout(engine, table)
+        if layout is not None:
+            if if_exists == "fail":
+                raise ValueError(f"Table '{table}' already exists")
+            if key is not None and [key] not in layout[0]:
+                raise ValueError(f"Table '{table}' has no primary key or unique index on '{key}' to upsert on")
+        existing_indexes = layout[1] if layout is not None else set()
+
+        cursor = conn.cursor()
+        if dialect == "sqlite":
+            # pysqlite only opens a transaction before DML and would
+            # autocommit the DROP / CREATE below.
+            cursor.execute("BEGIN")
+        if if_exists == "replace":
+            cursor.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+        cursor.execute(create)
+
+        iso_dates = dialect == "sqlite"
+        for start in range(0, len(df), batch_size):
+            batch = _sql_columns(df.iloc[start:start + batch_size], iso_dates)
+            cursor.executemany(insert, list(zip(*batch)))
+
+        # MySQL has no CREATE INDEX IF NOT EXISTS; existing names were looked up above.
+        for col in indexes:
+            name = f"ix_{table}_{col}"
+            if name not in existing_indexes:
+                cursor.execute(f"CREATE INDEX {quote(name)} ON {quote(table)} ({quote(col)})")
+        conn.commit()
+        log(f"[SUCCESS] {len(df)} rows saved → {db} [{table}]")
+    except Exception as e:
+        conn.rollback()
+        log(f"[ERROR] Could not save to SQL: {e}")
+    finally:
+        conn.close()
+
+# -----------------------------
+# Columnar outputs (Parquet dataset / Feather file)
+# -----------------------------
+MONTH_COLUMN = "Transaction Month"
+
+
+def add_month_column(df: pd.DataFrame, date_column: str = "Transaction Date",
+                     month_column: str = MONTH_COLUMN) -> pd.DataFrame:
+    """Derive the 'YYYY-MM' partition column from a datetime column."""
+    months = df[date_column].dt.strftime("%Y-%m").astype(object)
+    return df.assign(**{month_column: months.where(df[date_column].notna(), None)})
+
+
+@instrument(writes=lambda a: _processed_path(a, "dirname"))
+def save_parquet(df: pd.DataFrame, dirname: str, partition_by=(MONTH_COLUMN, "Location"),
+                 date_column: str = "Transaction Date", compression: str = "zstd",
+                 row_group_rows: int = 128 * 1024):
+    """
+    Save a typed, hive-partitioned Parquet dataset under data/processed/dirname,
+    e.g. .../Transaction Month=2023-09/Location=Takeaway/part-0.parquet.
+    Row groups carry min/max statistics, so readers can skip them as well.
+    The dataset is written to a temporary directory and swapped in, so it
+    fully replaces the previous one (no partitions left from older runs).
+    """
+    path = os.path.join("data", "processed", dirname)
+    tmp, old = path + ".tmp", path + ".old"
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partition_by = list(partition_by)
+        if MONTH_COLUMN in partition_by and MONTH_COLUMN not in df.columns:
+            df = add_month_column(df, date_column)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        schema = pa.schema([table.schema.field(c) for c in partition_by])
+        for stale in (tmp, old):
+            shutil.rmtree(stale, ignore_errors=True)
+        ds.write_dataset(
+            table, tmp, format="parquet",
+            partitioning=ds.partitioning(schema, flavor="hive"),
+            file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+            max_rows_per_group=row_group_rows, min_rows_per_group=min(row_group_rows, len(df)) or 1,
+        )
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        log(f"[SUCCESS] Parquet dataset saved → {path} (partitioned by {', '.join(partition_by)})")
+    except Exception as e:
+        shutil.rmtree(tmp, ignore_errors=True)
+        log(f"[ERROR] Could not save Parquet: {e}")
+
+
+@instrument(writes=_processed_path)
+def save_feather(df: pd.DataFrame, filename: str, compression: str = "uncompressed"):
+    """
+    Save a Feather (Arrow IPC) file. Left uncompressed by default so it can
+    be memory-mapped and reloaded without copying (see load_feather).
+    """
+    path = os.path.join("data", "processed", filename)
+    try:
+        import pyarrow.feather as feather
+        ensure_dir(path)
+        feather.write_feather(df.reset_index(drop=True), path, compression=compression)
+        log(f"[SUCCESS] Feather saved → {path}")
+    except Exception as e:
+        log(f"[ERROR] Could not save Feather: {e}")
+
 # -----------------------------
 # Print DataFrame to Console + Log
 # -----------------------------
 def print_to_console(df: pd.DataFrame, title: str = "", max_rows: int = 10):
+    """Show the first rows on the console; only a one-line event is recorded."""
     if title:
-        log(f"\n===== {title} =====")
-    log(df.head(max_rows).to_string())
-    log("========================\n")
+        print(f"\n===== {title} =====")
+    print(df.head(max_rows).to_string())
+    print("========================\n")
+    record_event(f"[INFO] Preview '{title}': {len(df)} rows x {len(df.columns)} columns",
+                 rows=len(df), columns=len(df.columns))
 
 # -----------------------------
 # Save Matplotlib Figure
@@ -101,11 +396,15 @@ def save_plot(fig, filename: str):
 # Save all logs to summary.txt
 # -----------------------------
 def save_summary_report(filename="summary.txt"):
+    """Write the recorded log events to summary.txt and the stage metrics to metrics.json."""
     path = os.path.join("data", "processed", filename)
     try:
         ensure_dir(path)
         with open(path, "w", encoding="utf-8") as f:
-            f.write("\n".join(LOG_MESSAGES))
+            f.write("\n".join(event["message"] for event in EVENTS))
         print(f"[SUCCESS] Summary saved → {path}")
+        metrics_path = os.path.join(os.path.dirname(path), "metrics.json")
+        export_metrics(metrics_path, os.path.join(os.path.dirname(path), "metrics_history.jsonl"))
+        print(f"[SUCCESS] Metrics saved → {metrics_path}")
     except Exception as e:
         print(f"[ERROR] Could not save summary: {e}")
@@ -9,15 +9,484 @@
 # 4. Analyze results
 # 5. Save outputs
 #
-# Team members should implement:
+# Pipeline:
+#    - Stages are declared with the names of the values they read
+#      (inputs) and produce (outputs).
+#    - run() builds the dependency graph and starts every stage as
+#      soon as its inputs exist, so independent branches (CSV save,
+#      JSON save, each plot) run at the same time:
+#         kind="inline"   on the controller thread (cheap steps)
+#         kind="thread"   thread pool (I/O-bound writers)
+#         kind="process"  process pool (CPU-bound rendering)
+#    - report() prints per-stage timings and the critical path.
 #
-# pipeline():
-#    - Reads config or hardcoded paths.
-#    - Calls loader → cleaning → transform → analysis.
-#    - Each step prints clear log messages.
-#    - Saves final cleaned dataset to /data/processed.
+# run_streaming():
+#    - Bounded-memory two-pass clean of one large CSV.
 #
-# NOTES:
-# - This is the main place to connect all modules together.
-# - Use clear step-by-step procedural logic.
+# run_incremental():
+#    - Only the rows appended to the raw CSV since the last run are
+#      loaded, cleaned and appended to the outputs and merged into the
+#      rollup cube (see src/incremental.py, src/rollup.py).
 # ============================================================
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from src.load_data import iter_csv, CAFE_SALES_SCHEMA
+from src.clean_data import (MissingValueImputer, item_price_counts, item_prices_from_counts, learn_item_prices,
+                            repair_sales_consistency)
+from src import profiling
+from src.metrics import record_counts, record_stage, rows_of
+from src.output_data import log, save_csv, JsonRecordsWriter, append_json_records
+from src.transform_data import GroupByAccumulator
+from src.rollup import ROLLUP_PATH, RollupCube
+from src.incremental import (STATE_DIR, HashIndex, PendingRun, Watermark, load_aggregates, read_delta,
+                             save_aggregates)
+
+
+# -----------------------------
+# Streaming mode
+# -----------------------------
+def run_streaming(raw_path: str, csv_name: str, json_name: str,
+                  chunksize: int = 100_000, schema=CAFE_SALES_SCHEMA,
+                  strategy_num="mean", strategy_cat="mode", repair=True):
+    """
+    Clean a CSV that may not fit in memory, in bounded-memory passes:
+
+    0. price pass (repair=True): fold the Item -> price counts of every
+       chunk, reading only those two columns
+    1. statistics pass: read typed chunks, repair, collect fill statistics
+    2. fill-and-write pass: read chunks again, repair, fill, append to the
+       processed CSV and JSON outputs
+
+    The item prices are learned from the whole file before any repair, so
+    the (row-local) repair gives identical results in both passes and
+    matches an in-memory run.
+    """
+    log(f"[INFO] Streaming mode: {raw_path} in chunks of {chunksize} rows")
+
+    item_prices = None
+    if repair:
+        pair_columns = ["Item", "Price Per Unit"]
+        pairs = None
+        for chunk in iter_csv(raw_path, chunksize, schema=schema.select(pair_columns), usecols=pair_columns):
+            counts = item_price_counts(chunk)
+            pairs = counts if pairs is None else pairs.add(counts, fill_value=0)
+        item_prices = item_prices_from_counts(pairs)
+        log(f"[INFO] Price pass done: unit prices of {len(item_prices)} items")
+
+    def prepare(chunk, count=False):
+        if not repair:
+            return chunk
+        chunk, report = repair_sales_consistency(chunk, item_prices, inplace=True, verbose=False)
+        if count:
+            record_counts("repair_sales_consistency", report)
+        return chunk
+
+    imputer = MissingValueImputer(strategy_num, strategy_cat)
+    for chunk in iter_csv(raw_path, chunksize, schema=schema):
+        imputer.partial_fit(prepare(chunk))
+    imputer.report()
+    log(f"[INFO] Statistics pass done: {len(imputer.fill_values)} columns need filling")
+
+    rows = 0
+    with JsonRecordsWriter(json_name) as json_writer:
+        for i, chunk in enumerate(iter_csv(raw_path, chunksize, schema=schema)):
+            chunk = imputer.transform(prepare(chunk, count=True), inplace=True)
+            save_csv(chunk, csv_name, append=i > 0)
+            json_writer.write(chunk)
+            rows += len(chunk)
+
+    log(f"[SUCCESS] Streamed {rows} rows → {csv_name}, {json_name}")
+    return imputer
+
+
+# -----------------------------
+# Incremental mode
+# -----------------------------
+INCREMENTAL_AGGREGATES = {
+    "sales_by_location": ("Location", {"Total Spent": ["sum", "count", "mean"]}),
+    "sales_by_item": ("Item", {"Quantity": ["sum"], "Total Spent": ["sum", "mean"]}),
+}
+
+
+def _write_delta(delta: pd.DataFrame, csv_name: str, json_name: str, full: bool):
+    """Overwrite (full run) or append to the CSV / JSON outputs."""
+    save_csv(delta, csv_name, append=not full)
+    if full:
+        with JsonRecordsWriter(json_name) as json_writer:
+            json_writer.write(delta)
+    else:
+        append_json_records(delta, json_name)
+
+
+def _finish_run(pending: PendingRun, state: dict, delta: pd.DataFrame, csv_name: str, json_name: str,
+                aggregates_path: str):
+    """Write a prepared delta, move its state into place and refresh the aggregate tables."""
+    pending.restore_outputs(state)
+    _write_delta(delta, csv_name, json_name, state["full"])
+    pending.commit(state)
+    for name, accumulator in load_aggregates(aggregates_path).items():
+        save_csv(accumulator.result(), f"{name}.csv")
+
+
+def _resume_rollup(rollup_path: str, csv_path: str) -> RollupCube:
+    """The saved cube, rebuilt from the rows already written if it is missing or outdated."""
+    cube = RollupCube.load(rollup_path)
+    if cube is not None:
+        return cube
+    cube = RollupCube()
+    if not os.path.exists(csv_path):
+        log(f"[WARN] No rollup cube at {rollup_path} and no {csv_path} to rebuild it from")
+        return cube
+    log(f"[WARN] No usable rollup cube at {rollup_path}; rebuilding it from {csv_path}")
+    columns = cube.dims + cube.measures + [cube.date_column]
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=100_000):
+        cube.update(chunk)
+    return cube
+
+
+def run_incremental(raw_path: str, csv_name: str, json_name: str, schema=CAFE_SALES_SCHEMA,
+                    key: str = "Transaction ID", date_column: str = "Transaction Date",
+                    aggregates: dict = None, state_dir: str = STATE_DIR,
+                    strategy_num="mean", strategy_cat="mode", rollup_path: str = ROLLUP_PATH):
+    """
+    Process only the rows appended to raw_path since the previous run.
+
+    The first run (or a run after the raw file was rewritten) processes the
+    whole file, learns the item prices and fill values and overwrites the
+    outputs. Later runs read from the byte watermark, drop rows whose key
+    was already written, clean them with the persisted statistics, append
+    them to the CSV/JSON outputs and merge them into the aggregates and
+    the rollup cube (rollup_path=None skips the cube; a missing or outdated
+    cube is first rebuilt from the CSV output).
+
+    Each run is all-or-nothing (see PendingRun): a run interrupted while
+    writing is finished by the next call before it reads new rows.
+    Returns the number of new rows written.
+    """
+    aggregates = INCREMENTAL_AGGREGATES if aggregates is None else aggregates
+    os.makedirs(state_dir, exist_ok=True)
+    paths = {name: os.path.join(state_dir, name) for name in
+             ("watermark.json", "keys.npy", "imputer.json", "item_prices.json", "aggregates.pkl")}
+    outputs = [os.path.join("data", "processed", name) for name in (csv_name, json_name)]
+
+    pending = PendingRun(state_dir)
+    if pending.exists():
+        state, delta = pending.load()
+        log(f"[WARN] Previous incremental run was interrupted; finishing it ({state['rows']} rows)")
+        _finish_run(pending, state, delta, csv_name, json_name, paths["aggregates.pkl"])
+
+    watermark = Watermark(paths["watermark.json"])
+    full = not watermark.is_valid_for(raw_path)
+    if full:
+        log(f"[INFO] Incremental mode: no valid watermark for {raw_path}, processing the whole file")
+        index = HashIndex(paths["keys.npy"]).clear()
+        states = {}
+        offset = 0
+    else:
+        index = HashIndex(paths["keys.npy"])
+        states = load_aggregates(paths["aggregates.pkl"])
+        offset = watermark.offset
+        log(f"[INFO] Incremental mode: resuming {raw_path} at byte {offset} "
+            f"({watermark.state.get('rows', 0)} rows done)")
+
+    delta, new_offset = read_delta(raw_path, offset, schema)
+    if delta.empty:
+        log("[INFO] No new rows since the last run")
+        return 0
+
+    # New state goes to '<path>.next' and is moved into place by PendingRun.commit().
+    staged = []
+    if full:
+        item_prices = learn_item_prices(delta)
+        with open(PendingRun.staged(paths["item_prices.json"]), "w", encoding="utf-8") as f:
+            json.dump(item_prices, f, indent=2)
+        staged.append(paths["item_prices.json"])
+    else:
+        with open(paths["item_prices.json"], encoding="utf-8") as f:
+            item_prices = json.load(f)
+    delta, repair_report = repair_sales_consistency(delta, item_prices, inplace=True, verbose=False)
+    record_counts("repair_sales_consistency", repair_report)
+
+    fresh = index.new_rows(delta[key])
+    if not fresh.all():
+        log(f"[INFO] Dropped {int((~fresh).sum())} rows with an already-seen {key}")
+        delta = delta[fresh].reset_index(drop=True)
+
+    if full:
+        imputer = MissingValueImputer(strategy_num, strategy_cat).fit(delta)
+        imputer.save(PendingRun.staged(paths["imputer.json"]))
+        staged.append(paths["imputer.json"])
+    else:
+        imputer = MissingValueImputer.load(paths["imputer.json"])
+    delta = imputer.transform(delta, inplace=True)
+
+    for name, (keys, aggs) in aggregates.items():
+        accumulator = states.get(name) or GroupByAccumulator(keys, aggs)
+        states[name] = accumulator.update(delta)
+    if rollup_path:
+        cube = RollupCube() if full else _resume_rollup(rollup_path, outputs[0])
+        cube.update(delta).save(PendingRun.staged(rollup_path))
+        staged.append(rollup_path)
+
+    index.add(delta[key])
+    index.save(PendingRun.staged(paths["keys.npy"]))
+    save_aggregates(PendingRun.staged(paths["aggregates.pkl"]), states)
+    max_date = delta[date_column].max() if date_column in delta.columns else None
+    watermark.advance(raw_path, new_offset, len(delta), None if pd.isna(max_date) else str(max_date),
+                      path=PendingRun.staged(paths["watermark.json"]))
+    staged += [paths["keys.npy"], paths["aggregates.pkl"], paths["watermark.json"]]
+
+    state = pending.prepare(delta, full, outputs, staged)
+    _finish_run(pending, state, delta, csv_name, json_name, paths["aggregates.pkl"])
+
+    log(f"[SUCCESS] Incremental run: {len(delta)} new rows → {csv_name}, {json_name}")
+    return len(delta)
+
+
+# -----------------------------
+# DAG executor
+# -----------------------------
+STAGE_KINDS = ("inline", "thread", "process")
+
+
+class Stage:
+    """
+    One pipeline step: func(*[values of inputs]) → values of outputs.
+
+    With one output the return value is stored under that name; with
+    several, func returns a tuple in the same order. Constant arguments
+    are bound with functools.partial (keeps the stage picklable).
+    setup, if given, is called on the controller just before the stage
+    runs (never on a cache hit), e.g. to import what a worker will need.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), kind="inline",
+                 cache_key=None, cache_outputs=None, setup=None):
+        if kind not in STAGE_KINDS:
+            raise ValueError(f"Stage '{name}': kind must be one of {STAGE_KINDS}")
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.kind = kind
+        self.cache_key = cache_key
+        self.cache_outputs = cache_outputs
+        self.setup = setup
+        self.start = None
+        self.end = None
+        self.cached = False
+
+    @property
+    def duration(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+def _timed_call(func, args, profile=None):
+    """
+    Runs in the worker; wall-clock stamps are comparable across processes.
+    profile=(stage name, profiling settings, controller pid) runs func
+    under the profiler; a worker process writes its own profile files.
+    """
+    start = time.time()
+    if profile is None:
+        result = func(*args)
+    else:
+        name, settings, controller = profile
+        in_worker = os.getpid() != controller
+        profiling.enable(**settings)
+        with profiling.profile_stage(f"pipeline.{name}"):
+            result = func(*args)
+        if in_worker:
+            profiling.flush(quiet=True, clear=True)
+    return result, start, time.time()
+
+
+class Pipeline:
+    """
+    pipeline = Pipeline(cache=StageCache())
+    pipeline.add("load", partial(load_data, "csv", path), outputs=["raw"])
+    pipeline.add("clean", auto_handle_missing, inputs=["raw"], outputs=["clean"])
+    pipeline.add("save_csv", partial(save_csv, filename="x.csv"), inputs=["clean"], kind="thread")
+    values = pipeline.run()
+    pipeline.report()
+
+    Stages with a cache_key are looked up in the StageCache (on the
+    controller, never inside a worker) and skipped on a hit.
+    """
+
+    def __init__(self, max_threads: int = 4, max_processes: int = None, cache=None):
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.cache = cache
+        self.stages = {}
+        self.values = {}
+        self.started = None
+        self.finished = None
+
+    def add(self, name, func, inputs=(), outputs=(), kind="inline",
+            cache_key=None, cache_outputs=None, setup=None):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage name: '{name}'")
+        self.stages[name] = Stage(name, func, inputs, outputs, kind, cache_key, cache_outputs, setup)
+        return self
+
+    # ---- graph ----
+    def _dependencies(self, available) -> dict:
+        """stage name -> set of stage names it waits for; validates the graph."""
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Value '{output}' is produced by both "
+                                     f"'{producers[output]}' and '{stage.name}'")
+                producers[output] = stage.name
+
+        deps = {}
+        for stage in self.stages.values():
+            deps[stage.name] = set()
+            for value in stage.inputs:
+                if value in producers:
+                    deps[stage.name].add(producers[value])
+                elif value not in available:
+                    raise ValueError(f"Stage '{stage.name}' needs '{value}', which nothing produces")
+
+        # Kahn's algorithm, only to reject cycles before anything runs.
+        remaining = {name: set(d) for name, d in deps.items()}
+        ready = [name for name, d in remaining.items() if not d]
+        seen = 0
+        while ready:
+            done = ready.pop()
+            seen += 1
+            for name, d in remaining.items():
+                if done in d:
+                    d.discard(done)
+                    if not d:
+                        ready.append(name)
+        if seen != len(self.stages):
+            raise ValueError("Pipeline has a dependency cycle")
+        return deps
+
+    # ---- execution ----
+    def _store(self, stage, result):
+        if len(stage.outputs) == 1:
+            self.values[stage.outputs[0]] = result
+        elif stage.outputs:
+            for name, value in zip(stage.outputs, result):
+                self.values[name] = value
+
+    def _try_cache(self, stage) -> bool:
+        if self.cache is None or stage.cache_key is None:
+            return False
+        hit, value = self.cache.lookup(stage.cache_key, stage.cache_outputs)
+        if hit:
+            stage.cached = True
+            stage.start = stage.end = time.time()
+            self._store(stage, value)
+        return hit
+
+    def _finish(self, stage, result, start, end):
+        stage.start, stage.end = start, end
+        self._store(stage, result)
+        record_stage(f"pipeline.{stage.name}", end - start, rows_out=rows_of(result))
+        if self.cache is not None and stage.cache_key is not None:
+            self.cache.store(stage.cache_key,
+                             None if stage.cache_outputs is not None else result,
+                             stage.cache_outputs)
+
+    def run(self, initial: dict = None) -> dict:
+        """Run every stage once its inputs exist; returns all produced values."""
+        self.values = dict(initial or {})
+        deps = self._dependencies(set(self.values))
+        done = set()
+        running = {}
+        self.started = time.time()
+
+        threads = ThreadPoolExecutor(max_workers=self.max_threads)
+        processes = None
+        try:
+            while len(done) < len(self.stages):
+                ready = [name for name in self.stages
+                         if name not in done and name not in running.values()
+                         and deps[name] <= done]
+                for name in ready:
+                    stage = self.stages[name]
+                    if self._try_cache(stage):
+                        done.add(name)
+                        continue
+                    if stage.setup is not None:
+                        stage.setup()
+                    args = [self.values[value] for value in stage.inputs]
+                    profile = (name, profiling.settings(), os.getpid()) if profiling.ENABLED else None
+                    if stage.kind == "inline":
+                        self._finish(stage, *_timed_call(stage.func, args, profile))
+                        done.add(name)
+                        continue
+                    if stage.kind == "process":
+                        if processes is None:
+                            processes = ProcessPoolExecutor(max_workers=self.max_processes)
+                        future = processes.submit(_timed_call, stage.func, args, profile)
+                    else:
+                        future = threads.submit(_timed_call, stage.func, args, profile)
+                    running[future] = name
+
+                if ready and not running:
+                    continue   # inline/cached stages may have unblocked others
+                if not running:
+                    break
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    self._finish(self.stages[name], *future.result())
+                    done.add(name)
+        finally:
+            threads.shutdown(wait=True)
+            if processes is not None:
+                processes.shutdown(wait=True)
+
+        self.finished = time.time()
+        return self.values
+
+    # ---- reporting ----
+    def critical_path(self):
+        """Longest chain of dependent stages by duration: (stage names, seconds)."""
+        deps = self._dependencies(set(self.values))
+        finish = {}
+        previous = {}
+
+        def longest(name):
+            if name not in finish:
+                best = max(deps[name], key=longest, default=None)
+                previous[name] = best
+                finish[name] = self.stages[name].duration + (finish[best] if best else 0.0)
+            return finish[name]
+
+        last = max(self.stages, key=longest, default=None)
+        path = []
+        while last is not None:
+            path.append(last)
+            last = previous[last]
+        return list(reversed(path)), (finish[path[0]] if path else 0.0)
+
+    def report(self):
+        """Log per-stage timings, total wall time and the critical path."""
+        log("\n===== Pipeline Stage Timings =====")
+        for stage in sorted(self.stages.values(), key=lambda s: s.start or 0.0):
+            offset = (stage.start or self.started) - self.started
+            note = " (cached)" if stage.cached else ""
+            log(f"  {stage.name:<20} {stage.kind:<8} start +{offset:7.3f}s  "
+                f"took {stage.duration:7.3f}s{note}")
+        path, seconds = self.critical_path()
+        total = sum(stage.duration for stage in self.stages.values())
+        wall = (self.finished or time.time()) - self.started
+        log(f"  Wall time: {wall:.3f}s (sum of stages {total:.3f}s)")
+        log(f"  Critical path ({seconds:.3f}s): {' → '.join(path)}")
+        log("==================================\n")
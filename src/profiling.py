@@ -0,0 +1,243 @@
+# ============================================================
+# PROFILING MODE (opt-in)
+# ============================================================
+# python main.py --profile [DIR]   (default data/processed/profiles)
+#
+# While enabled, every pipeline stage and every @instrument()-ed
+# function called outside a stage is run under cProfile, with
+# tracemalloc tracing allocations. flush() writes, per stage:
+#
+#   <stage>.pstats      cProfile statistics (python -m pstats, snakeviz)
+#   <stage>.collapsed   collapsed stacks, "frame;frame;... microseconds"
+#                       (flamegraph.pl, speedscope, inferno); the stage
+#                       name is the root frame, so
+#                       cat *.collapsed | flamegraph.pl > all.svg
+#                       gives one graph for the whole run
+#   <stage>.memory.json peak traced bytes and the lines holding the most
+#                       memory allocated by the stage when it returned
+#
+# Notes:
+#    - Only the outermost stage on a thread is profiled; nested
+#      instrumented calls show up inside it.
+#    - Repeated calls (e.g. per chunk in --stream mode) accumulate
+#      into the same files.
+#    - tracemalloc is process-wide: each stage clears the traces when
+#      it starts, so stages running at the same time on threads blur
+#      each other's allocations and peak.
+#    - Process-pool stages are profiled and flushed in the worker.
+#    - Disabled (the default), callers only test ENABLED; nothing is
+#      imported, traced or hooked.
+# ============================================================
+
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+PROFILE_DIR = os.path.join("data", "processed", "profiles")
+
+ENABLED = False
+_SETTINGS = {}
+_PROFILES = {}   # stage -> accumulated totals (this process only)
+_LOCAL = threading.local()
+_LOCK = threading.Lock()
+
+
+def enable(output_dir: str = PROFILE_DIR, top: int = 25, frames: int = 1, started: float = None):
+    """
+    Turn profiling on for this process. top = allocating lines kept per
+    stage, frames = traceback depth stored by tracemalloc, started =
+    session start (worker processes pass the controller's).
+    """
+    global ENABLED
+    import tracemalloc
+
+    pid = os.getpid()
+    if ENABLED and _SETTINGS.get("pid") == pid:
+        return
+    # A forked worker inherits the controller's state and traces: start afresh.
+    _PROFILES.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start(frames)
+    _SETTINGS.update(output_dir=output_dir, top=top, frames=frames, pid=pid,
+                     started=started or time.time())
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    import tracemalloc
+
+    ENABLED = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def settings() -> dict:
+    """enable() arguments of the running session (to re-enable in a worker)."""
+    return {key: _SETTINGS[key] for key in ("output_dir", "top", "frames", "started")}
+
+
+def _entry(stage: str) -> dict:
+    import cProfile
+
+    with _LOCK:
+        if stage not in _PROFILES:
+            _PROFILES[stage] = {"profile": cProfile.Profile(), "calls": 0, "seconds": 0.0,
+                                "peak_bytes": 0, "allocated": Counter(), "count": Counter()}
+        return _PROFILES[stage]
+
+
+def _without_self(snapshot):
+    import tracemalloc
+
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+
+
+@contextmanager
+def profile_stage(stage: str):
+    """Profile the enclosed block as `stage` (no-op when nested or disabled)."""
+    if not ENABLED or getattr(_LOCAL, "active", None):
+        yield
+        return
+    import tracemalloc
+
+    entry = _entry(stage)
+    _LOCAL.active = stage
+    # Forget older blocks: the end snapshot then holds only what the stage
+    # allocated and kept, and the peak counts only the stage's allocations.
+    tracemalloc.clear_traces()
+    start = time.perf_counter()
+    entry["profile"].enable()
+    try:
+        yield
+    finally:
+        entry["profile"].disable()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        kept = _without_self(tracemalloc.take_snapshot()).statistics("lineno")
+        _LOCAL.active = None
+        with _LOCK:
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["peak_bytes"] = max(entry["peak_bytes"], peak)
+            for stat in kept:
+                where = str(stat.traceback[0])
+                entry["allocated"][where] += stat.size
+                entry["count"][where] += stat.count
+
+
+# -----------------------------
+# Output
+# -----------------------------
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":   # built-in
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats: dict, root: str = None) -> Counter:
+    """
+    Rebuild "a;b;c" → self-time (µs) stacks from a pstats call graph.
+    cProfile keeps only caller → callee edges, so a function's time is
+    split over its callers in proportion to each edge's cumulative time.
+    """
+    children = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children[caller][func] = edge[3]
+    stacks = Counter()
+
+    def walk(func, path, share):
+        _, _, own, total, _ = stats[func]
+        path = path + (_label(func),)
+        if own * share >= 1e-6:
+            stacks[";".join(path)] += own * share * 1e6
+        for child, edge_total in children[func].items():
+            child_total = stats[child][3]
+            if child_total <= 0 or _label(child) in path:   # skip recursion
+                continue
+            child_share = share * edge_total / child_total
+            if child_share * child_total >= 1e-6:
+                walk(child, path, child_share)
+
+    start = (root,) if root else ()
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, start, 1.0)
+    return stacks
+
+
+def _safe_name(stage: str) -> str:
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in stage)
+
+
+def flush(quiet: bool = False, clear: bool = False) -> list:
+    """
+    Write every profiled stage's files; returns the per-stage summaries.
+    clear=True forgets the written stages (worker processes, which run
+    several stages one after another).
+    """
+    import pstats
+
+    if not ENABLED:
+        return []
+    directory = _SETTINGS["output_dir"]
+    os.makedirs(directory, exist_ok=True)
+    summaries = []
+    with _LOCK:
+        items = list(_PROFILES.items())
+        if clear:
+            _PROFILES.clear()
+    for stage, entry in items:
+        base = os.path.join(directory, _safe_name(stage))
+        profile = entry["profile"]
+        profile.create_stats()
+        profile.dump_stats(base + ".pstats")
+
+        stacks = collapsed_stacks(pstats.Stats(profile).stats, root=stage)
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, micros in sorted(stacks.items()):
+                if round(micros):
+                    f.write(f"{stack} {round(micros)}\n")
+
+        summary = {
+            "stage": stage,
+            "calls": entry["calls"],
+            "seconds": round(entry["seconds"], 6),
+            "peak_bytes": entry["peak_bytes"],
+            "kept_bytes": sum(entry["allocated"].values()),
+            "top_allocators": [
+                {"line": where, "bytes": size, "blocks": entry["count"][where]}
+                for where, size in entry["allocated"].most_common(_SETTINGS["top"])
+            ],
+        }
+        with open(base + ".memory.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        summaries.append(summary)
+
+    if not quiet:
+        # Stages profiled in worker processes wrote their own files.
+        written = {summary["stage"] for summary in summaries}
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".memory.json") and os.path.getmtime(path) >= _SETTINGS["started"]:
+                with open(path, encoding="utf-8") as f:
+                    summary = json.load(f)
+                if summary["stage"] not in written:
+                    summaries.append(summary)
+        print(f"\n===== Profile ({directory}) =====")
+        for summary in sorted(summaries, key=lambda s: s["seconds"], reverse=True):
+            top = summary["top_allocators"][0]["line"] if summary["top_allocators"] else "-"
+            print(f"  {summary['stage']:<40} {summary['seconds']:8.3f}s  "
+                  f"peak {summary['peak_bytes'] / 1e6:9.2f} MB  top {top}")
+        print(f"[SUCCESS] Profiles saved → {directory}")
+    return summaries
@@ -0,0 +1,224 @@
+# ============================================================
+# ROLLUP CUBE (materialized, time-bucketed aggregates)
+# ============================================================
+# Location × Item × Payment Method × day / week / month buckets of
+# Transaction Date, with per measure column only
+#
+#     count, sum, sumsq
+#
+# All three are additive, so cells from different batches merge by
+# plain addition and every coarser view (fewer dimensions, longer
+# buckets) is an exact roll-up: mean = sum / count, sample variance
+# = (sumsq - sum² / count) / (count - 1).
+#
+#   cube = RollupCube().update(df)          # one vectorized pass
+#   cube.update(new_batch)                  # merge, no rescan of history
+#   cube.save(ROLLUP_PATH); RollupCube.load(ROLLUP_PATH)
+#   cube.query("month", by=["Payment Method"])
+#   cube.query("day", by=["Location", "Item"], where={"Location": "Takeaway"},
+#              start="2023-03-01", end="2023-03-31")
+#
+# Weeks start on Monday and are labelled by that Monday; months by
+# their first day. Rows with a missing date or dimension value keep
+# their own (NaT / NaN) cell, so roll-ups still add up to the totals.
+# ============================================================
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.incremental import load_aggregates, save_aggregates
+from src.metrics import instrument
+
+ROLLUP_PATH = os.path.join("data", "processed", "rollup_cube.pkl")
+ROLLUP_DIMENSIONS = ("Location", "Item", "Payment Method")
+ROLLUP_MEASURES = ("Quantity", "Total Spent")
+ROLLUP_GRAINS = ("day", "week", "month")
+ROLLUP_VERSION = 1
+
+BUCKET = "bucket"
+ROWS = "rows"
+_PARTS = ("count", "sum", "sumsq")
+
+
+def _days(values) -> np.ndarray:
+    """Dates (numpy or Arrow-backed) as datetime64[D], NaT kept."""
+    dates = pd.to_datetime(pd.Series(values), errors="coerce")
+    return dates.to_numpy(dtype="datetime64[ns]", na_value=np.datetime64("NaT")).astype("datetime64[D]")
+
+
+def bucket_dates(days: np.ndarray, grain: str) -> np.ndarray:
+    """Start of the day / week (Monday) / month bucket of each datetime64[D] value."""
+    if grain == "day":
+        return days
+    if grain == "week":
+        # 1970-01-01 was a Thursday: shift by 3 so Mondays land on 0 (mod 7)
+        offset = (days.astype("int64") + 3) % 7
+        return days - offset.astype("timedelta64[D]")
+    if grain == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"grain must be one of {ROLLUP_GRAINS}")
+
+
+def _measure_columns(measures):
+    return [f"{measure}_{part}" for measure in measures for part in _PARTS]
+
+
+class RollupCube:
+    """
+    Materialized count / sum / sumsq cells per (bucket, *dims) for every
+    grain. update() folds in a batch, merge() adds another cube built on
+    other batches, query() slices and rolls up without touching the rows.
+    """
+
+    def __init__(self, dims=ROLLUP_DIMENSIONS, measures=ROLLUP_MEASURES,
+                 date_column: str = "Transaction Date", grains=ROLLUP_GRAINS):
+        unknown = set(grains) - set(ROLLUP_GRAINS)
+        if unknown:
+            raise ValueError(f"Unsupported grain(s): {sorted(unknown)}")
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self.date_column = date_column
+        self.grains = [grain for grain in ROLLUP_GRAINS if grain in grains]
+        self.cells = {}
+
+    # ---- building ----
+    def _sum_cells(self, frame: pd.DataFrame) -> pd.DataFrame:
+        keys = [BUCKET] + self.dims
+        return (frame.groupby(keys, dropna=False, sort=True)[[ROWS] + _measure_columns(self.measures)]
+                .sum().reset_index())
+
+    def _partial(self, df: pd.DataFrame) -> dict:
+        """Cells of one batch: day cells from the rows, coarser grains from the day cells."""
+        days = _days(df[self.date_column])
+        frame = pd.DataFrame({BUCKET: days})
+        for dim in self.dims:
+            frame[dim] = df[dim].astype(object).to_numpy()
+        frame[ROWS] = 1
+        for measure in self.measures:
+            values = pd.to_numeric(df[measure], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            frame[f"{measure}_count"] = present.astype(np.int64)
+            frame[f"{measure}_sum"] = filled
+            frame[f"{measure}_sumsq"] = filled * filled
+
+        day_cells = self._sum_cells(frame)
+        partial = {}
+        for grain in self.grains:
+            if grain == "day":
+                partial[grain] = day_cells
+            else:
+                coarser = day_cells.copy()
+                coarser[BUCKET] = bucket_dates(day_cells[BUCKET].to_numpy(dtype="datetime64[D]"), grain)
+                partial[grain] = self._sum_cells(coarser)
+        return partial
+
+    def _merge_cells(self, partial: dict):
+        for grain, cells in partial.items():
+            current = self.cells.get(grain)
+            if current is not None:
+                cells = self._sum_cells(pd.concat([current, cells], ignore_index=True))
+            self.cells[grain] = cells
+
+    @instrument()
+    def update(self, df: pd.DataFrame):
+        """Fold one batch of rows into the cube."""
+        if not df.empty:
+            self._merge_cells(self._partial(df))
+        return self
+
+    def merge(self, other: "RollupCube"):
+        """Add the cells of a cube with the same layout (built on other batches)."""
+        if (other.dims, other.measures, other.grains) != (self.dims, self.measures, self.grains):
+            raise ValueError("Cannot merge rollup cubes with different dimensions, measures or grains")
+        self._merge_cells(other.cells)
+        return self
+
+    # ---- queries ----
+    def query(self, grain: str = "month", by=(), where: dict = None, start=None, end=None,
+              measures=None, totals: bool = False) -> pd.DataFrame:
+        """
+        Slice and roll up the materialized cells.
+
+        by:       dimensions kept in the result (the others are rolled up)
+        where:    {dimension: value or list of values} slice
+        start/end inclusive date range on the bucket start
+        totals:   also roll up the time buckets (one row per `by` group)
+        Returns rows, and per measure count / sum / mean / std.
+        """
+        if grain not in self.cells:
+            raise ValueError(f"No '{grain}' cells; grains: {self.grains}")
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = set(by) | set(where or {})
+        unknown -= set(self.dims)
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {sorted(unknown)}")
+        measures = self.measures if measures is None else ([measures] if isinstance(measures, str)
+                                                           else list(measures))
+
+        cells = self.cells[grain]
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, value in (where or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= cells[dim].isin(values).to_numpy()
+        if start is not None:
+            mask &= (cells[BUCKET] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (cells[BUCKET] <= pd.Timestamp(end)).to_numpy()
+
+        keys = by if totals else [BUCKET] + by
+        columns = [ROWS] + _measure_columns(measures)
+        selected = cells.loc[mask, keys + columns]
+        if keys:
+            rolled = selected.groupby(keys, dropna=False, sort=True)[columns].sum().reset_index()
+        else:
+            rolled = selected[columns].sum().to_frame().T
+
+        result = rolled[keys].copy()
+        result[ROWS] = rolled[ROWS].to_numpy(dtype=np.int64)
+        for measure in measures:
+            n = rolled[f"{measure}_count"].to_numpy(dtype=np.float64)
+            total = rolled[f"{measure}_sum"].to_numpy(dtype=np.float64)
+            sumsq = rolled[f"{measure}_sumsq"].to_numpy(dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(n > 0, total / n, np.nan)
+                variance = np.where(n > 1, (sumsq - total * mean) / (n - 1), np.nan)
+            result[f"{measure}_count"] = n.astype(np.int64)
+            result[f"{measure}_sum"] = total
+            result[f"{measure}_mean"] = mean
+            result[f"{measure}_std"] = np.sqrt(np.clip(variance, 0.0, None))
+        return result
+
+    # ---- persistence ----
+    def save(self, path: str = ROLLUP_PATH) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        save_aggregates(path, {"version": ROLLUP_VERSION, "dims": self.dims, "measures": self.measures,
+                               "date_column": self.date_column, "grains": self.grains,
+                               "cells": self.cells})
+        return path
+
+    @classmethod
+    def load(cls, path: str = ROLLUP_PATH):
+        """The saved cube, or None if there is none (or it has an older layout)."""
+        state = load_aggregates(path)
+        if state.get("version") != ROLLUP_VERSION:
+            return None
+        cube = cls(state["dims"], state["measures"], state["date_column"], state["grains"])
+        cube.cells = state["cells"]
+        return cube
+
+    def __repr__(self):
+        sizes = ", ".join(f"{grain}={len(self.cells.get(grain, ())):,}" for grain in self.grains)
+        return f"RollupCube({' × '.join(self.dims)}; {', '.join(self.measures)}; cells: {sizes})"
+
+
+def build_rollup(df: pd.DataFrame, path: str = ROLLUP_PATH) -> RollupCube:
+    """Pipeline stage: rebuild the cube from the cleaned frame and save it."""
+    cube = RollupCube().update(df)
+    cube.save(path)
+    print(f"[SUCCESS] Rollup cube saved → {path} {cube!r}")
+    return cube
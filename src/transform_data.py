@@ -1,55 +1,549 @@
 # ============================================================
 # TRANSFORMATION MODULE (Imperative Version)
 # ============================================================
+#
+# Column expressions:
+#   col("Quantity") * col("Price Per Unit")
+#   (col("Location") == "Takeaway") & col("Total Spent").notna()
+#
+# Expressions are evaluated over whole columns (one vectorized pass),
+# so filter_rows / add_new_column never walk the frame row by row.
+# Plain per-row callables are still accepted as a fallback.
+# ============================================================
+
+import operator
+import os
+import pickle
+import tempfile
 
+import numpy as np
 import pandas as pd
 
+from src.load_data import CAFE_SALES_SCHEMA
+from src.metrics import instrument
+
+
+_BINARY_OPS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "truediv": operator.truediv,
+    "and": operator.and_,
+    "or": operator.or_,
+}
+
+
+class Expr:
+    """
+    A column expression node, evaluated against a whole DataFrame.
+
+    op:    'col', 'lit', a key of _BINARY_OPS, or a unary/method name
+    args:  child expressions or literal payload
+    """
+
+    __hash__ = None
+
+    def __init__(self, op, *args):
+        self.op = op
+        self.args = args
+
+    # ---- comparison / arithmetic / boolean operators ----
+    def _binary(self, op, other, reverse=False):
+        other = _as_expr(other)
+        return Expr(op, other, self) if reverse else Expr(op, self, other)
+
+    def __eq__(self, other): return self._binary("eq", other)
+    def __ne__(self, other): return self._binary("ne", other)
+    def __lt__(self, other): return self._binary("lt", other)
+    def __le__(self, other): return self._binary("le", other)
+    def __gt__(self, other): return self._binary("gt", other)
+    def __ge__(self, other): return self._binary("ge", other)
+    def __add__(self, other): return self._binary("add", other)
+    def __radd__(self, other): return self._binary("add", other, reverse=True)
+    def __sub__(self, other): return self._binary("sub", other)
+    def __rsub__(self, other): return self._binary("sub", other, reverse=True)
+    def __mul__(self, other): return self._binary("mul", other)
+    def __rmul__(self, other): return self._binary("mul", other, reverse=True)
+    def __truediv__(self, other): return self._binary("truediv", other)
+    def __rtruediv__(self, other): return self._binary("truediv", other, reverse=True)
+    def __and__(self, other): return self._binary("and", other)
+    def __rand__(self, other): return self._binary("and", other, reverse=True)
+    def __or__(self, other): return self._binary("or", other)
+    def __ror__(self, other): return self._binary("or", other, reverse=True)
+    def __invert__(self): return Expr("not", self)
+    def __neg__(self): return Expr("neg", self)
+
+    # ---- column methods ----
+    def isna(self):
+        return Expr("isna", self)
+
+    def notna(self):
+        return Expr("notna", self)
+
+    def isin(self, values):
+        return Expr("isin", self, list(values))
+
+    def between(self, low, high):
+        return (self >= low) & (self <= high)
+
+    def fillna(self, value):
+        return Expr("fillna", self, _as_expr(value))
+
+    # ---- evaluation ----
+    def columns(self) -> set:
+        """Return the set of column names this expression reads."""
+        if self.op == "col":
+            return {self.args[0]}
+        found = set()
+        for arg in self.args:
+            if isinstance(arg, Expr):
+                found |= arg.columns()
+        return found
+
+    def evaluate(self, df: pd.DataFrame):
+        """Evaluate the expression over whole columns of df."""
+        op, args = self.op, self.args
+        if op == "col":
+            return df[args[0]]
+        if op == "lit":
+            return args[0]
+        if op in _BINARY_OPS:
+            return _BINARY_OPS[op](args[0].evaluate(df), args[1].evaluate(df))
+        if op == "not":
+            return ~args[0].evaluate(df)
+        if op == "neg":
+            return -args[0].evaluate(df)
+        if op == "isna":
+            return pd.isna(args[0].evaluate(df))
+        if op == "notna":
+            return pd.notna(args[0].evaluate(df))
+        if op == "isin":
+            return args[0].evaluate(df).isin(args[1])
+        if op == "fillna":
+            return args[0].evaluate(df).fillna(args[1].evaluate(df))
+        raise ValueError(f"Unknown expression op: {op}")
+
+    def __repr__(self):
+        if self.op == "col":
+            return f"col({self.args[0]!r})"
+        if self.op == "lit":
+            return repr(self.args[0])
+        return f"{self.op}({', '.join(repr(a) for a in self.args)})"
+
+
+def col(name: str) -> Expr:
+    """Reference a column by name."""
+    return Expr("col", name)
+
+
+def lit(value) -> Expr:
+    """Wrap a constant value."""
+    return Expr("lit", value)
+
+
+def _as_expr(value) -> Expr:
+    return value if isinstance(value, Expr) else lit(value)
+
+
+def _row_mask(df, condition) -> np.ndarray:
+    """Fallback path: evaluate a per-row callable into a boolean mask."""
+    return np.fromiter((bool(condition(row)) for _, row in df.iterrows()),
+                       dtype=bool, count=len(df))
+
+
+@instrument()
 def filter_rows(df, condition):
-    filtered = []
-    for index, row in df.iterrows():
-        if condition(row):
-            filtered.append(row.to_dict())
-    return pd.DataFrame(filtered)
+    """
+    Keep rows matching condition.
+
+    condition: an Expr (vectorized), a boolean Series/array mask,
+               or a callable taking one row (per-row fallback).
+    """
+    if isinstance(condition, Expr):
+        mask = condition.evaluate(df)
+    elif callable(condition):
+        mask = _row_mask(df, condition)
+    else:
+        mask = condition
+
+    if isinstance(mask, pd.Series):
+        mask = mask.fillna(False).to_numpy(dtype=bool)
+    return df.loc[np.asarray(mask, dtype=bool)].reset_index(drop=True)
 
 
+@instrument()
 def add_new_column(df, name, function):
-    for index, row in df.iterrows():    
-        df.at[index,name] = function(row)
+    """
+    Add (or overwrite) column `name`.
+
+    function: an Expr (vectorized), a scalar/array, or a callable taking
+              one row (per-row fallback, assigned in a single write).
+    """
+    if isinstance(function, Expr):
+        df[name] = function.evaluate(df)
+    elif callable(function):
+        df[name] = [function(row) for _, row in df.iterrows()]
+    else:
+        df[name] = function
     return df
-    
 
-def standardize_date_column(df, column):
-    for index, row in df.iterrows():
-        df.at[index, column] = pd.to_datetime(row[column]).strftime('%Y-%m-%d')
+
+@instrument()
+def standardize_date_column(df, column, date_format=None, errors="raise"):
+    """
+    Normalize a date column to 'YYYY-MM-DD' strings.
+
+    Each distinct raw value is parsed once and the result is broadcast back
+    through the factorized codes, so the cost scales with the number of
+    distinct dates rather than the number of rows.
+    """
+    values = df[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        df[column] = values.dt.strftime('%Y-%m-%d')
+        return df
+
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques)
+    try:
+        parsed = pd.to_datetime(uniques, format=date_format, errors=errors)
+    except (ValueError, TypeError):
+        if date_format is not None:
+            raise
+        # Mixed formats: fall back to parsing each distinct value on its own.
+        parsed = pd.Series([pd.to_datetime(v, errors=errors) for v in uniques],
+                           dtype="datetime64[ns]")
+
+    formatted = parsed.dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    result = np.empty(len(codes), dtype=object)
+    valid = codes >= 0
+    result[valid] = formatted[codes[valid]]
+    result[~valid] = np.nan
+    df[column] = pd.Series(result, index=df.index)
     return df
+
+
+# -----------------------------
+# Group-by with mergeable partial states
+# -----------------------------
+_AGG_FUNCS = ("sum", "count", "mean", "min", "max", "var", "std", "nunique")
+_MOMENT_FUNCS = {"sum", "mean", "var", "std"}
+
+
+class GroupByAccumulator:
+    """
+    Hash group-by over one or more keys with several aggregations per column.
+
+    keys:  a column name or list of names
+    aggs:  {column: 'sum' | ['sum', 'mean', ...]} using names from _AGG_FUNCS
+
+    Per group and column only compact partial states are kept (count, sum,
+    mean and M2 for Welford/Chan variance, min, max, and the distinct-value
+    set when 'nunique' is requested). update() folds in a chunk and merge()
+    combines accumulators built on other chunks or workers exactly, so the
+    aggregation can run over streamed or partitioned input. Rows whose key
+    is missing are dropped, as in pandas groupby.
+    """
+
+    def __init__(self, keys, aggs):
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        self.aggs = {}
+        for column, funcs in aggs.items():
+            funcs = [funcs] if isinstance(funcs, str) else list(funcs)
+            unknown = set(funcs) - set(_AGG_FUNCS)
+            if unknown:
+                raise ValueError(f"Unsupported aggregation(s) for '{column}': {sorted(unknown)}")
+            self.aggs[column] = funcs
+        self.states = {}
+
+    def _partial(self, df, column):
+        """Partial state of one value column for one chunk."""
+        funcs = set(self.aggs[column])
+        grouped = df.groupby(self.keys, observed=True, sort=False)[column]
+        state = pd.DataFrame({"count": grouped.count().astype("float64")})
+        if funcs & _MOMENT_FUNCS:
+            state["sum"] = grouped.sum().astype("float64")
+            state["mean"] = grouped.mean()
+            state["m2"] = (grouped.var(ddof=0) * state["count"]).fillna(0.0)
+        if "min" in funcs:
+            state["min"] = grouped.min()
+        if "max" in funcs:
+            state["max"] = grouped.max()
+        if "nunique" in funcs:
+            distinct = df[self.keys + [column]].dropna().drop_duplicates()
+            sets = distinct.groupby(self.keys, observed=True, sort=False)[column].agg(set)
+            state["distinct"] = sets.reindex(state.index)
+            state["distinct"] = [v if isinstance(v, set) else set() for v in state["distinct"]]
+        return state
+
+    @staticmethod
+    def _merge_states(a, b):
+        index = a.index.union(b.index)
+        a, b = a.reindex(index), b.reindex(index)
+        merged = pd.DataFrame(index=index)
+        na, nb = a["count"].fillna(0.0), b["count"].fillna(0.0)
+        n = na + nb
+        merged["count"] = n
+        if "sum" in a:
+            ma, mb = a["mean"].fillna(0.0), b["mean"].fillna(0.0)
+            delta = mb - ma
+            with np.errstate(divide="ignore", invalid="ignore"):
+                merged["sum"] = a["sum"].fillna(0.0) + b["sum"].fillna(0.0)
+                merged["mean"] = (ma + delta * nb / n).where(n > 0)
+                merged["m2"] = (a["m2"].fillna(0.0) + b["m2"].fillna(0.0)
+                                + (delta ** 2 * na * nb / n).where(n > 0, 0.0))
+        for name in ("min", "max"):
+            if name in a:
+                both = pd.concat([a[name], b[name]], axis=1)
+                merged[name] = both.min(axis=1) if name == "min" else both.max(axis=1)
+        if "distinct" in a:
+            merged["distinct"] = [
+                (x if isinstance(x, set) else set()) | (y if isinstance(y, set) else set())
+                for x, y in zip(a["distinct"], b["distinct"])
+            ]
+        return merged
+
+    def update(self, df: pd.DataFrame):
+        """Fold one chunk into the accumulated states."""
+        for column in self.aggs:
+            partial = self._partial(df, column)
+            current = self.states.get(column)
+            self.states[column] = partial if current is None else self._merge_states(current, partial)
+        return self
+
+    def merge(self, other: "GroupByAccumulator"):
+        """Combine the states of another accumulator built with the same spec."""
+        if other.keys != self.keys or other.aggs != self.aggs:
+            raise ValueError("Cannot merge accumulators with different keys or aggregations")
+        for column, state in other.states.items():
+            current = self.states.get(column)
+            self.states[column] = state if current is None else self._merge_states(current, state)
+        return self
+
+    def result(self) -> pd.DataFrame:
+        """Finalize the states into a DataFrame with one row per group."""
+        if not self.states:
+            names = [f"{c}_{f}" for c, funcs in self.aggs.items() for f in funcs]
+            return pd.DataFrame(columns=self.keys + names)
+        index = None
+        for state in self.states.values():
+            index = state.index if index is None else index.union(state.index)
+
+        columns = {}
+        for column, funcs in self.aggs.items():
+            state = self.states[column].reindex(index)
+            count = state["count"].fillna(0.0)
+            for func in funcs:
+                name = f"{column}_{func}"
+                if func == "count":
+                    columns[name] = count.astype("int64")
+                elif func in ("sum", "mean", "min", "max"):
+                    columns[name] = state[func]
+                elif func in ("var", "std"):
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        var = (state["m2"] / (count - 1)).where(count > 1)
+                    columns[name] = np.sqrt(var) if func == "std" else var
+                elif func == "nunique":
+                    columns[name] = state["distinct"].map(
+                        lambda v: len(v) if isinstance(v, set) else 0).astype("int64")
+        return pd.DataFrame(columns, index=index).reset_index()
+
+
+@instrument()
+def group_by(df, keys, aggs) -> pd.DataFrame:
+    """One-shot group-by: GroupByAccumulator(keys, aggs).update(df).result()."""
+    return GroupByAccumulator(keys, aggs).update(df).result()
+
+
 def aggregate_data(df, group_by_col, agg_col, method):
-    totals = {}
+    """
+    Single-key, single-method aggregation returning {group: value}.
+    Kept for existing callers; see group_by() for the DataFrame API.
+    """
+    if method not in _AGG_FUNCS:
+        return None
+    result = group_by(df, group_by_col, {agg_col: method})
+    return dict(zip(result[group_by_col], result[f"{agg_col}_{method}"]))
+
+
+def _sort_spec(column, ascending):
+    """Normalize sort keys and per-key directions into two equal-length lists."""
+    by = [column] if isinstance(column, str) else list(column)
+    if isinstance(ascending, bool):
+        ascending = [ascending] * len(by)
+    ascending = list(ascending)
+    if len(ascending) != len(by):
+        raise ValueError("ascending must be a bool or have one entry per sort key")
+    return by, ascending
+
+
+@instrument()
+def sort_data(df, column, ascending=True, na_position="last"):
+    """
+    Stable O(n log n) sort on one or more keys.
+
+    column:       a column name or a list of names
+    ascending:    a bool, or one bool per key
+    na_position:  'last' or 'first'
+    """
+    by, ascending = _sort_spec(column, ascending)
+    return df.sort_values(by, ascending=ascending, na_position=na_position,
+                          kind="stable").reset_index(drop=True)
+
+
+# -----------------------------
+# External (out-of-core) sort
+# -----------------------------
+_RUN_COL = "__run"
+_POS_COL = "__pos"
+
+
+def _spill_run(df, path, block_rows):
+    """Write one sorted run as a sequence of pickled blocks."""
+    with open(path, "wb") as f:
+        for start in range(0, len(df), block_rows):
+            pickle.dump(df.iloc[start:start + block_rows], f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path):
+    """Yield the pickled blocks of one run back in order."""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def external_sort(chunks, column, ascending=True, na_position="last",
+                  block_rows=50_000, tmp_dir=None):
+    """
+    Sort an iterable of DataFrame chunks that does not fit in memory.
+
+    Each chunk is sorted and spilled to disk as a run; the runs are then
+    k-way merged block by block. Yields sorted DataFrame blocks. The result
+    is stable: ties keep their input order.
+    """
+    by, ascending = _sort_spec(column, ascending)
+    merge_by = by + [_RUN_COL, _POS_COL]
+    merge_ascending = ascending + [True, True]
+
+    with tempfile.TemporaryDirectory(prefix="sort_runs_", dir=tmp_dir) as run_dir:
+        run_paths = []
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            run = sort_data(chunk, by, ascending, na_position)
+            path = os.path.join(run_dir, f"run_{len(run_paths):05d}.pkl")
+            _spill_run(run, path, block_rows)
+            run_paths.append(path)
+
+        readers = {}
+        buffers = {}
+        for run_id, path in enumerate(run_paths):
+            readers[run_id] = _read_run(path)
+            buffers[run_id] = None
+        offsets = dict.fromkeys(readers, 0)
+
+        while readers or any(b is not None and not b.empty for b in buffers.values()):
+            # Refill drained buffers; a run with nothing left stops constraining the merge.
+            for run_id in list(readers):
+                if buffers[run_id] is None or buffers[run_id].empty:
+                    block = next(readers[run_id], None)
+                    if block is None:
+                        del readers[run_id]
+                        continue
+                    block = block.assign(**{
+                        _RUN_COL: run_id,
+                        _POS_COL: np.arange(offsets[run_id], offsets[run_id] + len(block)),
+                    })
+                    offsets[run_id] += len(block)
+                    buffers[run_id] = block
+
+            pending = [b for b in buffers.values() if b is not None and not b.empty]
+            if not pending:
+                break
+            merged = pd.concat(pending, ignore_index=True).sort_values(
+                merge_by, ascending=merge_ascending, na_position=na_position)
+
+            # Everything up to the earliest "last buffered row" of a still-open
+            # run is final: no unread row of that run can sort before it.
+            run_ids = merged[_RUN_COL].to_numpy()
+            positions = merged[_POS_COL].to_numpy()
+            cutoff = len(merged)
+            for run_id in readers:
+                last_pos = buffers[run_id][_POS_COL].iat[-1]
+                where = np.flatnonzero((run_ids == run_id) & (positions == last_pos))[0]
+                cutoff = min(cutoff, where + 1)
+
+            ready, rest = merged.iloc[:cutoff], merged.iloc[cutoff:]
+            for run_id in buffers:
+                buffers[run_id] = rest[rest[_RUN_COL] == run_id]
+            yield ready.drop(columns=[_RUN_COL, _POS_COL]).reset_index(drop=True)
+
 
-    for index, row in df.iterrows():
-        key = row[group_by_col]
-        value = row[agg_col]
+def _sort_reader(input_path, schema, read_csv_kwargs):
+    """
+    (read_csv kwargs, per-chunk typing) giving every chunk the same column
+    types: the schema's numeric columns as float (bad tokens → NaN), its
+    dates as datetimes, every other column as strings (categoricals too,
+    so the runs compare values rather than codes).
+    """
+    header = pd.read_csv(input_path, nrows=0, **read_csv_kwargs).columns
+    dates = schema.dates if schema is not None else {}
+    kwargs = {"dtype": {c: "str" for c in header if c not in dates}}
+    if schema is not None:
+        kwargs["na_values"] = list(schema.na_values)
+        if dates:
+            kwargs["parse_dates"] = [c for c in dates if c in header]
+            kwargs["date_format"] = {c: f for c, f in dates.items() if c in header}
+    kwargs.update(read_csv_kwargs)
 
-        if key not in totals:
-            totals[key] = []
+    def typed(df):
+        return df if schema is None else schema.finalize(schema.coerce_numeric(df))
 
-        totals[key].append(value)
+    return kwargs, typed
 
-    if method == 'sum':
-        return {k: sum(v) for k, v in totals.items()}
-    elif method == 'count':
-        return {k: len(v) for k, v in totals.items()}
-    elif method == 'mean':
-        return {k: sum(v) / len(v) for k, v in totals.items()}
 
+@instrument(reads="input_path", writes="output_path")
+def sort_csv(input_path, output_path, column, ascending=True, na_position="last",
+             memory_budget_mb=256, schema=CAFE_SALES_SCHEMA, **read_csv_kwargs):
+    """
+    Sort a CSV file into output_path.
 
-def sort_data(df, column, ascending=True):
-    rows = df.to_dict('records')
+    Files that fit in memory_budget_mb are sorted in memory; larger files are
+    read in chunks sized to the budget and merged with external_sort().
 
-    for i in range(len(rows)):
-        for j in range(0, len(rows) - i - 1):
-            if (ascending and rows[j][column] > rows[j+1][column]) or \
-               (not ascending and rows[j][column] < rows[j+1][column]):
-                rows[j], rows[j+1] = rows[j+1], rows[j]
+    Every chunk is parsed with the same types (see _sort_reader), so the
+    runs always compare like with like; columns outside schema are sorted
+    as strings. With a schema, its missing-value tokens are written back
+    as empty cells. schema=None reads every column as a string.
+    """
+    kwargs, typed = _sort_reader(input_path, schema, read_csv_kwargs)
+    budget = int(memory_budget_mb * 1024 * 1024)
+    if os.path.getsize(input_path) <= budget:
+        print(f"[INFO] Sorting {input_path} in memory")
+        df = typed(pd.read_csv(input_path, **kwargs))
+        sort_data(df, column, ascending, na_position).to_csv(output_path, index=False)
+        return
 
-    return pd.DataFrame(rows)
+    # Size chunks from a sample so one sorted run stays within the budget
+    # (sorting needs roughly twice the chunk's memory).
+    sample = typed(pd.read_csv(input_path, nrows=1000, **kwargs))
+    row_bytes = max(1, int(sample.memory_usage(deep=True).sum() / max(len(sample), 1)))
+    chunksize = max(1000, budget // (2 * row_bytes))
+    print(f"[INFO] Sorting {input_path} out of core ({chunksize} rows per run)")
 
+    chunks = map(typed, pd.read_csv(input_path, chunksize=chunksize, **kwargs))
+    header = True
+    for block in external_sort(chunks, column, ascending, na_position,
+                               block_rows=max(1000, chunksize // 8),
+                               tmp_dir=os.path.dirname(os.path.abspath(output_path))):
+        block.to_csv(output_path, mode="w" if header else "a", header=header, index=False)
+        header = False
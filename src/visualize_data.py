@@ -1,8 +1,20 @@
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
+from src.metrics import lazy_import
+
+
+def import_plotting():
+    """
+    matplotlib.pyplot and seaborn, imported on first use (about a second).
+    Calling it before a process pool starts lets forked workers inherit them.
+    """
+    return lazy_import("matplotlib.pyplot"), lazy_import("seaborn")
+
+
 # -------------------------
 # 4. Utility: save plot
 # -------------------------
@@ -17,32 +29,39 @@ def save_plot(fig, filename: str):
 # -------------------------
 # 1. Bar Chart
 # -------------------------
-def plot_bar(df: pd.DataFrame, x_col: str, y_col: str):
+def plot_bar(df: pd.DataFrame, x_col: str, y_col: str, show: bool = True):
     """Create and save a basic bar chart."""
+    plt, sns = import_plotting()
     fig, ax = plt.subplots(figsize=(8,5))
     sns.barplot(x=x_col, y=y_col, data=df, ax=ax)
     ax.set_title(f"{y_col} by {x_col}")
     plt.tight_layout()
     save_plot(fig, f"{y_col}_by_{x_col}_bar.png")
-    plt.show()
+    if show:
+        plt.show()
+    return fig
 
 # -------------------------
 # 2. Line Chart
 # -------------------------
-def plot_line(df: pd.DataFrame, x_col: str, y_col: str):
+def plot_line(df: pd.DataFrame, x_col: str, y_col: str, show: bool = True):
     """Create and save a line chart for trends."""
+    plt, sns = import_plotting()
     fig, ax = plt.subplots(figsize=(8,5))
     sns.lineplot(x=x_col, y=y_col, data=df, marker="o", ax=ax)
     ax.set_title(f"{y_col} Trend over {x_col}")
     plt.tight_layout()
     save_plot(fig, f"{y_col}_over_{x_col}_line.png")
-    plt.show()
+    if show:
+        plt.show()
+    return fig
 
 # -------------------------
 # 3. Histogram
 # -------------------------
-def plot_histogram(df: pd.DataFrame, col: str, bins: int = 10):
+def plot_histogram(df: pd.DataFrame, col: str, bins: int = 10, show: bool = True):
     """Create and save a histogram for numeric data."""
+    plt, sns = import_plotting()
     fig, ax = plt.subplots(figsize=(8,5))
     sns.histplot(df[col], bins=bins, kde=True, ax=ax)
     ax.set_title(f"{col} Distribution")
@@ -50,6 +69,128 @@ def plot_histogram(df: pd.DataFrame, col: str, bins: int = 10):
     ax.set_ylabel("Frequency")
     plt.tight_layout()
     save_plot(fig, f"{col}_histogram.png")
-    plt.show()
+    if show:
+        plt.show()
+    return fig
+
+
+# -------------------------
+# 5. Batch rendering (headless)
+# -------------------------
+# Figures are drawn from small pre-computed data instead of raw rows:
+#   bar   → one mean per group (no bootstrapped confidence intervals)
+#   line  → mean per x value, LTTB-downsampled to max_points
+#   hist  → np.histogram counts (the KDE is fitted to the bin counts)
+# so render time does not grow with the row count, and every figure
+# is written exactly once, with the Agg backend, never shown.
+
+def plot_filename(task: dict) -> str:
+    """File name used for a plot task (same names as plot_bar/line/histogram)."""
+    if task["type"] == "bar":
+        return f"{task['y']}_by_{task['x']}_bar.png"
+    if task["type"] == "line":
+        return f"{task['y']}_over_{task['x']}_line.png"
+    return f"{task['col']}_histogram.png"
+
+
+def lttb_downsample(x: np.ndarray, y: np.ndarray, max_points: int):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a sorted series:
+    keeps the first and last point and, per bucket, the point forming the
+    largest triangle with its neighbours, so peaks and trends survive.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return x, y
+
+    xf = x.astype("datetime64[ns]").astype("int64").astype(float) if np.issubdtype(x.dtype, np.datetime64) \
+        else x.astype(float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xf[end:nxt_end].mean() if nxt_end > end else xf[-1]
+        avg_y = y[end:nxt_end].mean() if nxt_end > end else y[-1]
+        area = np.abs((xf[a] - avg_x) * (y[start:end] - y[a])
+                      - (xf[a] - xf[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def prepare_plot_data(df: pd.DataFrame, task: dict, max_points: int = 1000) -> dict:
+    """Reduce the rows a task needs to a small, picklable spec for render_prepared()."""
+    spec = dict(task)
+    if task["type"] == "bar":
+        means = df.groupby(task["x"], observed=True)[task["y"]].mean()
+        spec["x_values"] = means.index.astype(str).to_numpy()
+        spec["y_values"] = means.to_numpy()
+    elif task["type"] == "line":
+        means = df.groupby(task["x"], observed=True)[task["y"]].mean().sort_index()
+        x, y = lttb_downsample(means.index.to_numpy(), means.to_numpy(dtype=float), max_points)
+        spec["x_values"], spec["y_values"] = x, y
+    elif task["type"] == "hist":
+        values = df[task["col"]].dropna().to_numpy(dtype=float)
+        counts, edges = np.histogram(values, bins=task.get("bins", 10))
+        spec["counts"], spec["edges"] = counts, edges
+    else:
+        raise ValueError(f"Unknown plot type: {task['type']}")
+    return spec
+
+
+def render_prepared(spec: dict, dpi: int = 300) -> str:
+    """Draw one prepared spec with the Agg backend and save it once."""
+    plt, sns = import_plotting()
+    plt.switch_backend("Agg")
+    fig, ax = plt.subplots(figsize=(8, 5))
+    if spec["type"] == "bar":
+        sns.barplot(x=spec["x_values"], y=spec["y_values"], ax=ax)
+        ax.set_xlabel(spec["x"])
+        ax.set_ylabel(spec["y"])
+        ax.set_title(f"{spec['y']} by {spec['x']}")
+    elif spec["type"] == "line":
+        few = len(spec["x_values"]) <= 100
+        sns.lineplot(x=spec["x_values"], y=spec["y_values"], marker="o" if few else None, ax=ax)
+        ax.set_xlabel(spec["x"])
+        ax.set_ylabel(spec["y"])
+        ax.set_title(f"{spec['y']} Trend over {spec['x']}")
+    else:
+        edges = spec["edges"]
+        centers = (edges[:-1] + edges[1:]) / 2
+        binned = pd.DataFrame({spec["col"]: centers, "count": spec["counts"]})
+        sns.histplot(data=binned, x=spec["col"], weights="count", bins=list(edges), kde=True, ax=ax)
+        ax.set_title(f"{spec['col']} Distribution")
+        ax.set_xlabel(spec["col"])
+        ax.set_ylabel("Frequency")
+    fig.tight_layout()
+
+    path = os.path.join("plots", plot_filename(spec))
+    os.makedirs("plots", exist_ok=True)
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    print(f"[INFO] Plot saved to {path}")
+    return path
+
 
+def render_plots(df: pd.DataFrame, tasks: list, processes: int = None, dpi: int = 300,
+                 max_points: int = 1000) -> list:
+    """
+    Headless batch mode: reduce every task's data here, then draw the
+    figures in parallel worker processes (processes=0 draws in-process).
+    Returns the saved paths.
+    """
+    specs = []
+    for task in tasks:
+        needed = [task["col"]] if task["type"] == "hist" else [task["x"], task["y"]]
+        if all(c in df.columns for c in needed):
+            specs.append(prepare_plot_data(df, task, max_points))
+        else:
+            print(f"[WARN] Skipping {task['type']} plot: missing column(s) {needed}")
 
+    if processes == 0 or len(specs) <= 1:
+        return [render_prepared(spec, dpi) for spec in specs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(render_prepared, specs, [dpi] * len(specs)))
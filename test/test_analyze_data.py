@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analyze_data import (CoMomentAccumulator, HyperLogLog, QuantileSketch, StatisticsAccumulator,
+                              correlation_matrix, detect_outliers_iqr, iqr_bounds, quantile_sketches,
+                              summary_statistics)
+
+
+@pytest.mark.parametrize("distinct", [50, 5_000, 200_000])
+def test_hyperloglog_within_error_bound(distinct):
+    values = pd.Series([f"TXN_{i}" for i in range(distinct)] * 2)
+    sketch = HyperLogLog().update(values)
+    assert abs(sketch.count() - distinct) <= 4 * sketch.relative_error * distinct + 1
+
+
+def test_hyperloglog_merge_counts_the_union():
+    a = HyperLogLog(12).update(pd.Series(np.arange(0, 60_000)))
+    b = HyperLogLog(12).update(pd.Series(np.arange(40_000, 100_000)))
+    union = a.merge(b).count()
+    assert abs(union - 100_000) <= 4 * a.relative_error * 100_000
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(14))
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    df = pd.DataFrame({"Quantity": rng.integers(1, 6, n).astype("float64"),
+                       "Total Spent": rng.lognormal(1, 0.5, n),
+                       "Refund": np.nan,
+                       "Transaction ID": [f"TXN_{i}" for i in range(n)]})
+    df.loc[rng.random(n) < 0.1, "Quantity"] = np.nan
+    df.loc[:4_999, "Refund"] = rng.normal(0, 1, 5_000)   # only the first chunk has values
+    return df
+
+
+@pytest.mark.parametrize("distinct", ["exact", "approx"])
+def test_merged_chunk_accumulators_match_pandas(sales, distinct):
+    merged = StatisticsAccumulator(distinct=distinct)
+    for start in range(0, len(sales), 5_000):
+        chunk = sales.iloc[start:start + 5_000]
+        merged.merge(StatisticsAccumulator(distinct=distinct, block_rows=1_000).update(chunk))
+
+    stats = merged.result()
+    numbers = sales.drop(columns="Transaction ID")
+    assert stats["count"].tolist() == numbers.count().tolist()
+    for column, expected in (("mean", numbers.mean()), ("variance", numbers.var()),
+                             ("min", numbers.min()), ("max", numbers.max())):
+        np.testing.assert_allclose(stats[column], expected, rtol=1e-9)
+
+    unique = merged.distinct_counts()
+    expected = sales.nunique(dropna=False)
+    if distinct == "exact":
+        pd.testing.assert_series_equal(unique[expected.index], expected, check_names=False)
+    else:
+        assert abs(unique["Transaction ID"] - len(sales)) <= 4 * HyperLogLog().relative_error * len(sales)
+
+
+def test_empty_frame_gives_zero_counts(sales):
+    stats, unique = summary_statistics(sales.iloc[:0])
+    assert stats["count"].tolist() == [0, 0, 0]
+    assert stats.drop(columns="count").isna().all().all()
+    assert unique.eq(0).all()
+
+    # An empty chunk merged in leaves the statistics unchanged.
+    whole = StatisticsAccumulator(distinct=None).update(sales)
+    merged = StatisticsAccumulator(distinct=None).update(sales.iloc[:0]).merge(whole)
+    pd.testing.assert_frame_equal(merged.result(), whole.result())
+
+
+def _rank_errors(sketch, values, qs):
+    """|rank(sketch quantile) / n - q| for each q."""
+    ordered = np.sort(values)
+    ranks = np.searchsorted(ordered, sketch.quantiles(qs), side="right") / len(ordered)
+    return np.abs(ranks - qs)
+
+
+def test_kll_rank_error_within_bound():
+    values = np.random.default_rng(3).lognormal(2, 1, 200_000)
+    qs = np.linspace(0.01, 0.99, 99)
+    k = 200
+    whole = QuantileSketch(k, seed=1).update(values)
+    assert _rank_errors(whole, values, qs).max() <= 3 / k
+
+    merged = QuantileSketch(k, seed=1)
+    for chunk in np.array_split(values, 17):
+        merged.merge(QuantileSketch(k, seed=2).update(chunk))
+    assert merged.n == len(values)
+    assert _rank_errors(merged, values, qs).max() <= 3 / k
+    assert merged.quantile(0) == values.min() and merged.quantile(1) == values.max()
+
+
+def test_streamed_iqr_bounds_close_to_batch(sales):
+    columns = ["Quantity", "Total Spent"]
+    bounds, mask = detect_outliers_iqr(sales, columns)
+    assert mask.sum().tolist() == bounds["outliers"].tolist()
+    assert not mask.loc[sales["Quantity"].isna(), "Quantity"].any()
+
+    chunks = (sales.iloc[start:start + 3_000] for start in range(0, len(sales), 3_000))
+    streamed = iqr_bounds(columns=columns, sketches=quantile_sketches(chunks, columns))
+    for column in columns:
+        values = np.sort(sales[column].dropna().to_numpy())
+        for q, name in ((0.25, "Q1"), (0.75, "Q3")):
+            # Ties (Quantity is discrete) cover a range of ranks; q must fall inside it.
+            estimate = streamed.loc[column, name]
+            low = np.searchsorted(values, estimate, side="left") / len(values)
+            high = np.searchsorted(values, estimate, side="right") / len(values)
+            assert low - 0.02 <= q <= high + 0.02, (column, name)
+
+
+@pytest.fixture
+def numeric():
+    rng = np.random.default_rng(11)
+    n = 1_000
+    quantity = rng.integers(1, 6, n).astype("float64")
+    price = rng.choice([1.0, 1.5, 2.0, 3.0, 4.0, 5.0], n)
+    df = pd.DataFrame({"Quantity": quantity, "Price Per Unit": price,
+                       "Total Spent": quantity * price + rng.normal(0, 1, n),
+                       "Item": rng.choice(["Tea", "Cake"], n)})
+    for column, share in (("Quantity", 0.1), ("Total Spent", 0.05)):
+        df.loc[rng.random(n) < share, column] = np.nan
+    return df
+
+
+def _chunks(df, rows):
+    return (df.iloc[start:start + rows] for start in range(0, len(df), rows))
+
+
+def test_correlation_matrix_matches_pandas(numeric):
+    r, n, p = correlation_matrix(numeric)
+    numbers = numeric.drop(columns="Item")
+    pd.testing.assert_frame_equal(r, numbers.corr(), check_exact=False, atol=1e-10)
+    present = numbers.notna().astype(int)
+    pd.testing.assert_frame_equal(n.astype(int), present.T @ present, check_names=False)
+    assert ((p >= 0) & (p <= 1)).all().all()
+
+
+def test_chunked_co_moments_match_the_whole_frame(numeric):
+    expected = correlation_matrix(numeric)
+    for result, whole in zip(correlation_matrix(_chunks(numeric, 130)), expected):
+        pd.testing.assert_frame_equal(result, whole, check_exact=False, atol=1e-10)
+
+    merged = CoMomentAccumulator()
+    for chunk in _chunks(numeric, 300):
+        merged.merge(CoMomentAccumulator().update(chunk))
+    pd.testing.assert_frame_equal(merged.pearson(), expected[0], check_exact=False, atol=1e-10)
+
+
+def test_spearman_matches_pandas_without_gaps(numeric):
+    complete = numeric.drop(columns="Item").dropna()
+    r, _, _ = correlation_matrix(complete, method="spearman")
+    pd.testing.assert_frame_equal(r, complete.corr(method="spearman"), check_exact=False, atol=1e-10)
+    with pytest.raises(ValueError, match="global"):
+        correlation_matrix(_chunks(complete, 100), method="spearman")
+
+
+def test_correlation_pvalues_match_scipy(numeric):
+    stats = pytest.importorskip("scipy.stats")
+    r, _, p = correlation_matrix(numeric)
+    pair = numeric[["Quantity", "Price Per Unit"]].dropna()
+    expected = stats.pearsonr(pair["Quantity"], pair["Price Per Unit"])
+    assert r.loc["Quantity", "Price Per Unit"] == pytest.approx(expected[0])
+    assert p.loc["Quantity", "Price Per Unit"] == pytest.approx(expected[1], rel=1e-6)
@@ -0,0 +1,53 @@
+from src.cache import StageCache
+
+
+def test_value_stage_hits_after_store(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    calls = []
+    key = cache.key("stage", 1)
+    assert cache.run(key, lambda: calls.append(1) or 42) == 42
+    assert cache.run(key, lambda: calls.append(1) or 0) == 42
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_file_stage_without_outputs_is_never_a_hit(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    output = str(tmp_path / "out.csv")
+    key = cache.key("save", 1)
+    calls = []
+
+    def write_nothing():
+        calls.append(1)   # e.g. a writer that logged an error instead of raising
+
+    cache.run(key, write_nothing, outputs=[output])
+    cache.run(key, write_nothing, outputs=[output])
+    assert len(calls) == 2
+    assert cache.hits == 0
+
+
+def test_file_stage_reruns_when_an_output_disappears(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    output = tmp_path / "out.csv"
+    key = cache.key("save", 1)
+    calls = []
+
+    def write():
+        calls.append(1)
+        output.write_text("a\n1\n")
+
+    cache.run(key, write, outputs=[str(output)])
+    cache.run(key, write, outputs=[str(output)])
+    assert len(calls) == 1
+    output.unlink()
+    cache.run(key, write, outputs=[str(output)])
+    assert len(calls) == 2
+
+
+def test_outputs_rewritten_under_another_key_are_a_miss(tmp_path):
+    cache = StageCache(cache_dir=str(tmp_path / "cache"))
+    output = tmp_path / "out.csv"
+    cache.run(cache.key("save", 1), lambda: output.write_text("one\n"), outputs=[str(output)])
+    cache.run(cache.key("save", 2), lambda: output.write_text("two!\n"), outputs=[str(output)])
+    hit, _ = cache.lookup(cache.key("save", 1), [str(output)])
+    assert not hit
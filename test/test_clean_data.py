@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+import pandas as pd
+
+from src.clean_data import MAX_TRACKED_VALUES, MissingValueImputer, repair_sales_consistency
+
+
+def _sales(**columns):
+    df = pd.DataFrame(columns)
+    for col in ("Item", "Location"):
+        if col in df:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def test_repair_derives_an_item_missing_from_the_categories():
+    # Coffee is the only 2.0 item, but this batch's categorical has never seen it.
+    df = _sales(**{"Item": ["Tea", None], "Quantity": [1.0, 2.0],
+                   "Price Per Unit": [1.5, 2.0], "Total Spent": [1.5, 4.0]})
+    repaired, report = repair_sales_consistency(df, item_prices={"Coffee": 2.0, "Tea": 1.5},
+                                                verbose=False)
+    assert report["item_from_price"] == 1
+    assert list(repaired["Item"].astype(object)) == ["Tea", "Coffee"]
+    assert isinstance(repaired["Item"].dtype, pd.CategoricalDtype)
+
+
+def test_repair_rules_on_categoricals():
+    df = _sales(**{"Item": ["Cake", "Cake", "Juice", "Juice"],
+                   "Quantity": [2.0, np.nan, 3.0, 1.0],
+                   "Price Per Unit": [np.nan, 3.0, 3.0, 3.0],
+                   "Total Spent": [6.0, 9.0, np.nan, 3.0]})
+    repaired, report = repair_sales_consistency(df, item_prices={"Cake": 3.0, "Juice": 3.0},
+                                                verbose=False)
+    assert repaired["Price Per Unit"].tolist() == [3.0, 3.0, 3.0, 3.0]
+    assert repaired["Quantity"].tolist() == [2.0, 3.0, 3.0, 1.0]
+    assert repaired["Total Spent"].tolist() == [6.0, 9.0, 9.0, 3.0]
+    assert report["price_from_item"] == 1
+    # The input frame is left untouched unless inplace=True.
+    assert df["Price Per Unit"].isna().sum() == 1
+
+
+def test_item_from_price_skips_ambiguous_prices():
+    df = _sales(**{"Item": [None], "Quantity": [1.0], "Price Per Unit": [3.0], "Total Spent": [3.0]})
+    repaired, report = repair_sales_consistency(df, item_prices={"Cake": 3.0, "Juice": 3.0},
+                                                verbose=False)
+    assert report["item_from_price"] == 0
+    assert repaired["Item"].isna().all()
+
+
+def test_imputer_rejects_unknown_strategies():
+    with pytest.raises(ValueError, match="strategy_cat"):
+        MissingValueImputer(strategy_cat="constant")
+    with pytest.raises(ValueError, match="strategy_num"):
+        MissingValueImputer(strategy_num="zero")
+    assert MissingValueImputer("median", "mode").strategy_num == "median"
+
+
+@pytest.mark.parametrize("strategy_num", ["mean", "median"])
+def test_imputer_save_load_round_trip(tmp_path, strategy_num):
+    df = _sales(**{"Item": ["Cake", None, "Tea", "Tea"],
+                   "Quantity": [1.0, np.nan, 4.0, 2.0],
+                   "Payment Method": ["Cash", "Card", None, "Card"],
+                   "Transaction Date": pd.to_datetime(["2023-01-02", None, "2023-01-05", "2023-01-05"])})
+    imputer = MissingValueImputer(strategy_num).fit(df)
+    path = str(tmp_path / "state" / "imputer.json")
+    imputer.save(path)
+    loaded = MissingValueImputer.load(path)
+
+    assert loaded.strategy_num == strategy_num
+    assert loaded.fill_values == imputer.fill_values
+    assert loaded.missing_counts == {"Item": 1, "Quantity": 1, "Payment Method": 1, "Transaction Date": 1}
+    assert loaded.fill_values["Transaction Date"] == pd.Timestamp("2023-01-05")
+    pd.testing.assert_frame_equal(loaded.transform(df), imputer.transform(df))
+    assert not loaded.transform(df).isna().any().any()
+
+
+def _chunks(df, rows):
+    return [df.iloc[start:start + rows] for start in range(0, len(df), rows)]
+
+
+@pytest.fixture
+def stream():
+    rng = np.random.default_rng(2)
+    n = 6_000
+    df = pd.DataFrame({
+        "Transaction ID": [f"TXN_{i}" for i in range(n)],
+        "Quantity": rng.integers(1, 6, n).astype("float64"),
+        "Total Spent": rng.lognormal(2, 0.5, n),
+        "Payment Method": rng.choice(["Cash", "Credit Card", "Digital Wallet"], n, p=[0.5, 0.3, 0.2]),
+        "Note": np.where(rng.random(n) < 0.3, "repeat", [f"note {i}" for i in range(n)]),
+    })
+    df.loc[rng.random(n) < 0.05, ["Quantity", "Total Spent", "Note"]] = np.nan
+    # Payment Method first shows gaps in the last chunk.
+    df.loc[n - 10:, "Payment Method"] = None
+    return df
+
+
+@pytest.mark.parametrize("strategy_num", ["mean", "median"])
+def test_partial_fit_matches_fit_with_bounded_state(stream, strategy_num):
+    streamed = MissingValueImputer(strategy_num)
+    for chunk in _chunks(stream, 1_000):
+        streamed.partial_fit(chunk)
+    exact = MissingValueImputer(strategy_num).fit(stream)
+
+    assert streamed.missing_counts == exact.missing_counts
+    assert streamed.fill_values["Payment Method"] == exact.fill_values["Payment Method"] == "Cash"
+    assert streamed.fill_values["Note"] == "repeat"
+    assert streamed.fill_values["Quantity"] == pytest.approx(exact.fill_values["Quantity"])
+    assert streamed.fill_values["Total Spent"] == pytest.approx(exact.fill_values["Total Spent"], rel=0.02)
+
+    # The unique IDs are never counted, and no per-column state outgrows the cap.
+    assert "Transaction ID" in streamed._keys and "Transaction ID" not in streamed._counts
+    assert max(len(counts) for counts in streamed._counts.values()) <= MAX_TRACKED_VALUES
@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.lazy import scan_csv, scan_parquet, scan_sql
+from src.load_data import CAFE_SALES_SCHEMA, load_data
+from src.output_data import save_parquet, save_sql
+from src.transform_data import col
+
+RAW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                   "data", "raw", "dirty_cafe_sales.csv")
+
+TAKEAWAY_BULK = (col("Location") == "Takeaway") & (col("Quantity") >= 3)
+
+
+@pytest.fixture(scope="module")
+def eager():
+    return load_data("csv", RAW, schema=CAFE_SALES_SCHEMA)
+
+
+def _scan():
+    return scan_csv(RAW, CAFE_SALES_SCHEMA, chunksize=1_500)
+
+
+def _check(plan, expected, order):
+    optimized = plan.collect().sort_values(order).reset_index(drop=True)
+    unoptimized = plan.collect(optimize=False).sort_values(order).reset_index(drop=True)
+    pd.testing.assert_frame_equal(optimized, unoptimized)
+    pd.testing.assert_frame_equal(optimized, expected.sort_values(order).reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_filter_after_derived_column_and_select(eager):
+    plan = (_scan()
+            .with_column("Unit Total", col("Quantity") * col("Price Per Unit"))
+            .select("Transaction ID", "Unit Total", "Location", "Quantity")
+            .filter(TAKEAWAY_BULK)
+            .select("Transaction ID", "Unit Total"))
+    mask = (eager["Location"] == "Takeaway") & (eager["Quantity"] >= 3)
+    expected = eager.loc[mask, ["Transaction ID"]].assign(
+        **{"Unit Total": (eager["Quantity"] * eager["Price Per Unit"])[mask]})
+    _check(plan, expected, "Transaction ID")
+
+    optimized = plan.optimize()
+    assert optimized.scan.chunk_filter is not None
+    assert optimized.steps[0][0] != "filter"
+    assert set(optimized.scan.columns) == {"Transaction ID", "Quantity", "Price Per Unit", "Location"}
+
+
+def test_group_by_matches_eager(eager):
+    plan = (_scan()
+            .filter(TAKEAWAY_BULK)
+            .group_by("Item", {"Total Spent": ["sum", "count", "mean"]}))
+    expected = (eager[(eager["Location"] == "Takeaway") & (eager["Quantity"] >= 3)]
+                .groupby("Item", observed=True)["Total Spent"].agg(["sum", "count", "mean"]))
+    expected.columns = [f"Total Spent_{func}" for func in expected.columns]
+    _check(plan, expected.reset_index(), "Item")
+
+
+def test_sort_matches_eager(eager):
+    plan = (_scan()
+            .filter(col("Transaction Date").between("2023-07-01", "2023-09-30"))
+            .sort(["Total Spent", "Transaction ID"], ascending=[False, True])
+            .select("Transaction ID", "Total Spent"))
+    dates = eager["Transaction Date"]
+    expected = (eager[(dates >= "2023-07-01") & (dates <= "2023-09-30")]
+                .sort_values(["Total Spent", "Transaction ID"], ascending=[False, True], kind="stable")
+                [["Transaction ID", "Total Spent"]].reset_index(drop=True))
+    result = plan.collect()
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_sql_filters_are_pushed_into_the_query(tmp_path, eager):
+    db = str(tmp_path / "sales.db")
+    save_sql(eager.drop(columns="Transaction Date"), db, "sales")
+    plan = (scan_sql(db, "sales", chunksize=2_000)
+            .filter((col("Quantity") >= 3) & (col("Location") == "Takeaway"))
+            .group_by("Item", {"Total Spent": ["sum", "count"]}))
+    optimized = plan.optimize()
+    assert len(optimized.scan.filters) == 2 and optimized.scan.chunk_filter is None
+    pd.testing.assert_frame_equal(plan.collect().sort_values("Item").reset_index(drop=True),
+                                  plan.collect(optimize=False).sort_values("Item").reset_index(drop=True))
+
+
+@pytest.mark.parametrize("source", ["sql", "parquet"])
+def test_pushed_filters_keep_pandas_null_semantics(tmp_path, monkeypatch, eager, source):
+    monkeypatch.chdir(tmp_path)
+    sample = eager.head(2_000)
+    assert sample["Location"].isna().any()
+    if source == "sql":
+        save_sql(sample.drop(columns="Transaction Date"), "sales.db", "sales")
+        plan = scan_sql("sales.db", "sales", chunksize=500)
+    else:
+        save_parquet(sample, "sales.parquet")
+        plan = scan_parquet("data/processed/sales.parquet")
+
+    plan = plan.filter((col("Location") != "Takeaway") & (col("Quantity") >= 3)).select("Transaction ID")
+    pushed = plan.optimize().scan.filters
+    assert [(column, op) for column, op, _ in pushed] == [("Quantity", ">=")]
+
+    expected = sample.loc[(sample["Location"] != "Takeaway") & (sample["Quantity"] >= 3), "Transaction ID"]
+    for result in (plan.collect(), plan.collect(optimize=False)):
+        assert sorted(result["Transaction ID"]) == sorted(expected)
@@ -0,0 +1,157 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.load_data import (CAFE_SALES_SCHEMA, SqlSource, build_select, get_engine, iter_csv, load_csv,
+                           load_data, load_files)
+
+HEADER = "Transaction ID,Item,Quantity,Price Per Unit,Total Spent,Payment Method,Location,Transaction Date\n"
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i, (quantity, date) in enumerate(rows):
+            f.write(f"TXN_{i},Coffee,{quantity},2.0,4.0,Cash,Takeaway,{date}\n")
+    return str(path)
+
+
+@pytest.fixture
+def dirty_csv(tmp_path):
+    rows = [(2, "2023-01-05")] * 10 + [("ERROR", "UNKNOWN"), ("", "")] + [(3, "2023-02-01")] * 8
+    rows[15] = ("two", "not a date")   # not a schema token: the typed parse fails here
+    return _write(tmp_path / "sales.csv", rows)
+
+
+def test_schema_types_columns_at_parse_time(tmp_path):
+    path = _write(tmp_path / "sales.csv", [(2, "2023-01-05"), ("ERROR", "UNKNOWN"), ("", "")])
+    df = load_csv(path, schema=CAFE_SALES_SCHEMA)
+    assert df["Quantity"].dtype == np.float64
+    assert isinstance(df["Item"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df["Transaction Date"])
+    assert df["Quantity"].isna().tolist() == [False, True, True]
+    assert df["Transaction Date"].isna().tolist() == [False, True, True]
+
+
+def test_bad_numeric_token_restarts_with_coercion(dirty_csv, capsys):
+    chunks = list(iter_csv(dirty_csv, chunksize=4, schema=CAFE_SALES_SCHEMA))
+    assert "coercing numeric columns" in capsys.readouterr().out
+
+    df = pd.concat(chunks, ignore_index=True)
+    # Every row exactly once: the chunks yielded before the failure are not re-read.
+    assert df["Transaction ID"].tolist() == [f"TXN_{i}" for i in range(20)]
+    assert all(chunk["Quantity"].dtype == np.float64 for chunk in chunks)
+    assert df["Quantity"].isna().sum() == 3
+    assert df["Transaction Date"].isna().sum() == 3
+    assert pd.api.types.is_datetime64_any_dtype(df["Transaction Date"])
+
+
+def test_whole_file_load_coerces_a_bad_numeric_token(dirty_csv):
+    df = load_csv(dirty_csv, schema=CAFE_SALES_SCHEMA)
+    expected = pd.concat(iter_csv(dirty_csv, chunksize=4, schema=CAFE_SALES_SCHEMA), ignore_index=True)
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False)
+
+
+def test_arrow_engine_matches_the_c_engine(dirty_csv, capsys):
+    pytest.importorskip("pyarrow")
+    c = load_csv(dirty_csv, schema=CAFE_SALES_SCHEMA)
+    arrow = load_csv(dirty_csv, schema=CAFE_SALES_SCHEMA, engine="pyarrow")
+    assert "pyarrow engine, 20 rows" in capsys.readouterr().out
+
+    assert list(arrow.columns) == list(c.columns)
+    assert isinstance(arrow["Item"].dtype, pd.CategoricalDtype)
+    assert arrow["Quantity"].dtype == np.float64
+    # Dates stay Arrow timestamps and strings Arrow-backed: compare values, not dtypes.
+    dates = arrow["Transaction Date"].astype(c["Transaction Date"].dtype)
+    pd.testing.assert_frame_equal(arrow.assign(**{"Transaction Date": dates}), c,
+                                  check_dtype=False, check_categorical=False)
+
+    assert load_csv(dirty_csv, engine="polars").empty
+    assert "Unsupported CSV engine" in capsys.readouterr().out
+
+
+@pytest.fixture
+def batches(tmp_path):
+    """Three daily CSVs with different item sets, one JSON file and one broken JSON file."""
+    folder = tmp_path / "batches"
+    folder.mkdir()
+    for day, items in enumerate((["Coffee"], ["Tea", "Cake"], ["Coffee", "Salad"])):
+        with open(folder / f"day{day}.csv", "w", encoding="utf-8") as f:
+            f.write(HEADER)
+            for i, item in enumerate(items):
+                f.write(f"TXN_{day}{i},{item},2,2.0,4.0,Cash,Takeaway,2023-01-0{day + 1}\n")
+    pd.DataFrame({"Transaction ID": ["TXN_J"], "Item": ["Juice"]}).to_json(folder / "extra.json", orient="records")
+    (folder / "broken.json").write_text("[{not json", encoding="utf-8")
+    (folder / "notes.txt").write_text("ignored", encoding="utf-8")
+    return folder
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_load_files_skips_failures_and_tags_sources(batches, processes, capsys):
+    df, failures = load_files(str(batches), schema=CAFE_SALES_SCHEMA, processes=processes)
+    assert list(failures) == [str(batches / "broken.json")]
+    assert failures[str(batches / "broken.json")].startswith("ValueError")
+    assert "[WARN] Loaded 6 rows from 4/5 files" in capsys.readouterr().out
+
+    assert sorted(df["Transaction ID"]) == ["TXN_00", "TXN_10", "TXN_11", "TXN_20", "TXN_21", "TXN_J"]
+    assert isinstance(df["Item"].dtype, pd.CategoricalDtype)
+    assert set(df["Item"].cat.categories) == {"Coffee", "Tea", "Cake", "Salad", "Juice"}
+    assert df.loc[df["Transaction ID"] == "TXN_J", "source_file"].item() == str(batches / "extra.json")
+
+    via_glob = load_data("csv", str(batches / "day*.csv"), schema=CAFE_SALES_SCHEMA, processes=processes)
+    assert len(via_glob) == 5 and via_glob.attrs["load_failures"] == {}
+
+
+def test_load_files_reports_when_nothing_loads(tmp_path, capsys):
+    (tmp_path / "broken.json").write_text("[{", encoding="utf-8")
+    df, failures = load_files([str(tmp_path / "broken.json"), str(tmp_path / "missing.csv")], processes=2)
+    assert df.empty and len(failures) == 2
+    assert "[ERROR] All 2 input files failed to load" in capsys.readouterr().out
+
+
+@pytest.fixture
+def sales_db(tmp_path):
+    path = str(tmp_path / "sales.db")
+    rows = [(f"TXN_{i}", ["Takeaway", "In-store", None][i % 3], float(i % 5), f"2023-0{1 + i % 9}-15")
+            for i in range(250)]
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE sales ("Transaction ID" TEXT, "Location" TEXT, '
+                     '"Quantity" REAL, "Transaction Date" TEXT)')
+        conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?)", rows)
+    conn.close()
+    return path
+
+
+def test_build_select_binds_every_value():
+    sql, params = build_select("sales", ["Location"], [("Location", "in", ["Takeaway", "x'; DROP TABLE sales; --"]),
+                                                       ("Quantity", "between", (1, 3)),
+                                                       ("Item", "is not null", None)])
+    assert sql == ('SELECT "Location" FROM "sales" WHERE "Location" IN (:p0, :p1) '
+                   'AND "Quantity" BETWEEN :p2 AND :p3 AND "Item" IS NOT NULL')
+    assert params == {"p0": "Takeaway", "p1": "x'; DROP TABLE sales; --", "p2": 1, "p3": 3}
+    with pytest.raises(ValueError):
+        build_select("sales", filters=[("Quantity", "like", "%")])
+
+
+def test_sql_source_streams_filtered_chunks(sales_db):
+    source = SqlSource(sales_db)
+    filters = [("Location", "=", "Takeaway"), ("Transaction Date", "between", ("2023-02-01", "2023-06-30"))]
+    chunks = list(source.iter_select("sales", ["Transaction ID", "Quantity"], filters, chunksize=10))
+    assert [len(chunk) for chunk in chunks[:-1]] == [10] * (len(chunks) - 1)
+
+    df = pd.concat(chunks, ignore_index=True)
+    expected = source.read('SELECT * FROM sales WHERE "Location" = :loc', {"loc": "Takeaway"})
+    expected = expected[expected["Transaction Date"].between("2023-02-01", "2023-06-30")]
+    assert list(df.columns) == ["Transaction ID", "Quantity"]
+    assert df["Transaction ID"].tolist() == expected["Transaction ID"].tolist()
+    assert len(source.select("sales", filters=[("Location", "is null", None)])) == 83
+    assert get_engine(sales_db) is source.engine   # one pooled engine per database
+
+
+def test_load_data_sql_reports_a_bad_query(sales_db, capsys):
+    df = load_data("sql", sales_db, query="SELECT * FROM sales WHERE Quantity > :q", params={"q": 3})
+    assert len(df) == 50 and "[INFO] SQL query executed" in capsys.readouterr().out
+    assert load_data("sql", sales_db, query="SELECT * FROM missing").empty
+    assert "[ERROR] Failed to load SQL data" in capsys.readouterr().out
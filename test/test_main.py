@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+from src import metrics
+
+
+@pytest.fixture
+def fresh_metrics():
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+def test_clean_stage_reports_rows_repaired_per_rule(fresh_metrics, tmp_path):
+    df = pd.DataFrame({"Item": pd.Categorical(["Tea", "Tea", "Cake"]),
+                       "Quantity": [2.0, np.nan, 1.0],
+                       "Price Per Unit": [1.5, 1.5, 3.0],
+                       "Total Spent": [np.nan, 3.0, np.nan]})
+    cleaned = main.clean_stage(df)
+    assert cleaned["Total Spent"].tolist() == [3.0, 3.0, 3.0]
+
+    counts = fresh_metrics.COUNTERS["repair_sales_consistency"]
+    assert counts["total_from_parts"] == 2 and counts["quantity_from_total"] == 1
+    assert any("Consistency repair: 3 values derived" in e["message"] for e in fresh_metrics.EVENTS)
+
+    exported = fresh_metrics.export_metrics(str(tmp_path / "metrics.json"), str(tmp_path / "history.jsonl"))
+    assert exported["counters"]["repair_sales_consistency"]["total_from_parts"] == 2
+    with open(tmp_path / "history.jsonl", encoding="utf-8") as f:
+        assert json.loads(f.readline())["counters"] == exported["counters"]
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _imports_matplotlib(workdir, *argv):
+    """Run main.py's CLI in a fresh interpreter; True if matplotlib got imported."""
+    code = "import sys, main; main.main(sys.argv[1:]); print('matplotlib' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    done = subprocess.run([sys.executable, "-c", code, *argv], cwd=workdir, env=env,
+                          capture_output=True, text=True, check=True)
+    return done.stdout.splitlines()[-1] == "True"
+
+
+def test_only_plots_that_run_import_matplotlib(tmp_path):
+    os.makedirs(tmp_path / "data" / "raw")
+    with open(os.path.join(ROOT, main.RAW_PATH), encoding="utf-8") as f:
+        head = [next(f) for _ in range(501)]
+    with open(tmp_path / main.RAW_PATH, "w", encoding="utf-8") as f:
+        f.writelines(head)
+
+    assert not _imports_matplotlib(tmp_path, "clean")
+    assert not _imports_matplotlib(tmp_path, "analyze")
+    assert _imports_matplotlib(tmp_path, "plot")
+    assert sorted(os.listdir(tmp_path / "plots")) == sorted(main.plot_filename(task) for task in main.tasks)
+    assert not _imports_matplotlib(tmp_path, "plot")   # every plot is a cache hit
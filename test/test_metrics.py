@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src import metrics
+from src.output_data import log, print_to_console, save_csv, save_summary_report
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_events_are_structured_and_bounded(tmp_path):
+    log("[WARN] Something odd")
+    log("plain message")
+    assert [(e["level"], e["message"]) for e in metrics.EVENTS] == [("WARN", "[WARN] Something odd"),
+                                                                    ("INFO", "plain message")]
+
+    for i in range(metrics.MAX_EVENTS + 10):
+        metrics.record_event(f"[ERROR] failure {i}")
+    assert len(metrics.EVENTS) == metrics.MAX_EVENTS
+    assert metrics.EVENTS[0]["message"] == "[ERROR] failure 10"   # the oldest are dropped first
+
+    exported = metrics.export_metrics(str(tmp_path / "metrics.json"))
+    assert exported["events"]["dropped"] == 12 and exported["events"]["kept"] == metrics.MAX_EVENTS
+    assert len(exported["events"]["errors"]) == 20
+
+
+def test_previews_are_not_kept_in_the_log():
+    print_to_console(pd.DataFrame({"a": range(100)}), title="Sample")
+    (event,) = metrics.EVENTS
+    assert event["rows"] == 100 and "\n" not in event["message"]
+
+
+def test_instrumented_stages_and_export(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({"id": range(1_000)})
+    save_csv(df, "sales.csv")
+    size = (tmp_path / "data" / "processed" / "sales.csv").stat().st_size
+    save_csv(df.head(10), "sales.csv", append=True)
+    grown = (tmp_path / "data" / "processed" / "sales.csv").stat().st_size - size
+
+    stage = metrics.STAGES["output_data.save_csv"]
+    assert stage["calls"] == 2 and stage["rows_in"] == 1_010
+    assert stage["bytes_written"] == size + grown   # an append counts only the bytes it added
+    for _ in range(3):
+        metrics.record_event("[ERROR] boom")
+
+    save_summary_report()
+    with open("data/processed/metrics.json", encoding="utf-8") as f:
+        exported = json.load(f)
+    report = exported["stages"]["output_data.save_csv"]
+    assert report["rows_per_second"] > 0 and report["mb_per_second"] > 0
+    assert exported["events"]["by_level"]["ERROR"] == 3 and exported["events"]["dropped"] == 0
+    with open("data/processed/metrics_history.jsonl", encoding="utf-8") as f:
+        assert "output_data.save_csv" in json.loads(f.readline())["stages"]
+    with open("data/processed/summary.txt", encoding="utf-8") as f:
+        assert f.read().count("[ERROR] boom") == 3
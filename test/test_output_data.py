@@ -0,0 +1,133 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.load_data import load_data, load_feather, load_parquet
+from src.output_data import save_csv, save_feather, save_parquet, save_sql
+
+
+def _rows(db, table):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(f'SELECT * FROM "{table}" ORDER BY 1').fetchall()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "sales.db")
+
+
+def test_save_sql_upserts_on_key(db):
+    save_sql(pd.DataFrame({"id": ["a", "b"], "total": [1.0, 2.0]}), db, "sales", key="id")
+    save_sql(pd.DataFrame({"id": ["b", "c"], "total": [20.0, 3.0]}), db, "sales", key="id")
+    assert _rows(db, "sales") == [("a", 1.0), ("b", 20.0), ("c", 3.0)]
+
+
+def _schema(db, table):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+
+
+def test_keyed_and_indexed_text_columns_are_varchar(db):
+    save_sql(pd.DataFrame({"id": ["a", "b" * 300], "Location": ["x", "y"], "note": ["n", "m"]}),
+             db, "sales", key="id", indexes=["Location"])
+    schema = _schema(db, "sales")
+    assert "id VARCHAR(300)" in schema and '"Location" VARCHAR(255)' in schema
+    assert "note TEXT" in schema
+
+
+def test_append_into_an_existing_table(db, capsys):
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE sales (id TEXT, total REAL)")
+        conn.execute("INSERT INTO sales VALUES ('a', 1.0)")
+    conn.close()
+
+    # Without a unique constraint on the key an upsert cannot work: nothing is written.
+    save_sql(pd.DataFrame({"id": ["a"], "total": [5.0]}), db, "sales", key="id")
+    assert "no primary key or unique index on 'id'" in capsys.readouterr().out
+    assert _rows(db, "sales") == [("a", 1.0)]
+
+    for _ in range(2):   # the index is created once, then left alone
+        save_sql(pd.DataFrame({"id": ["b"], "total": [2.0]}), db, "sales", indexes=["id"])
+    assert _rows(db, "sales") == [("a", 1.0), ("b", 2.0), ("b", 2.0)]
+    assert "[ERROR]" not in capsys.readouterr().out
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE keyed (id TEXT, total REAL)")
+        conn.execute("CREATE UNIQUE INDEX ux_keyed ON keyed (id)")
+    conn.close()
+    save_sql(pd.DataFrame({"id": ["a", "b"], "total": [1.0, 2.0]}), db, "keyed", key="id")
+    save_sql(pd.DataFrame({"id": ["b"], "total": [20.0]}), db, "keyed", key="id")
+    assert _rows(db, "keyed") == [("a", 1.0), ("b", 20.0)]
+
+
+def test_failed_replace_rolls_back_to_the_old_table(db):
+    save_sql(pd.DataFrame({"id": ["a", "b", "c"], "total": [1.0, 2.0, 3.0]}), db, "sales")
+    # A list cannot be bound as an SQL parameter: the second batch fails.
+    broken = pd.DataFrame({"id": ["x", "y"], "total": [1.0, [2.0]]})
+    save_sql(broken, db, "sales", if_exists="replace", batch_size=1)
+    assert _rows(db, "sales") == [("a", 1.0), ("b", 2.0), ("c", 3.0)]
+
+
+def test_failed_append_keeps_earlier_batches_out(db):
+    save_sql(pd.DataFrame({"id": ["a"], "total": [1.0]}), db, "sales")
+    save_sql(pd.DataFrame({"id": ["x", "y"], "total": [1.0, [2.0]]}), db, "sales", batch_size=1)
+    assert _rows(db, "sales") == [("a", 1.0)]
+
+
+def _typed_sales(n):
+    return pd.DataFrame({
+        "Transaction ID": [f"TXN_{i}" for i in range(n)],
+        "Item": pd.Categorical(["Coffee", "Tea", "Cake"] * n)[:n],
+        "Total Spent": [float(i) for i in range(n)],
+        "Location": pd.Categorical(["Takeaway", "In-store"] * n)[:n],
+        "Transaction Date": pd.to_datetime(["2023-01-05", "2023-02-10", "2023-02-11"] * n)[:n],
+    })
+
+
+def test_parquet_round_trip_and_pushdown(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = _typed_sales(6)
+    save_parquet(df, "sales.parquet")
+
+    loaded = load_parquet("data/processed/sales.parquet").sort_values("Transaction ID", ignore_index=True)
+    assert list(loaded.columns) == list(df.columns) + ["Transaction Month"]
+    assert sorted(loaded["Transaction Month"].astype(str).unique()) == ["2023-01", "2023-02"]
+    pd.testing.assert_frame_equal(loaded[df.columns], df.sort_values("Transaction ID", ignore_index=True),
+                                  check_dtype=False, check_categorical=False)
+    assert isinstance(loaded["Item"].dtype, pd.CategoricalDtype)
+
+    february = load_parquet("data/processed/sales.parquet",
+                            filters=[("Transaction Date", ">=", "2023-02-01"), ("Location", "==", "Takeaway")])
+    assert sorted(february["Transaction ID"]) == ["TXN_2", "TXN_4"]
+
+
+def test_parquet_rewrite_drops_partitions_of_older_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_parquet(_typed_sales(2), "sales.parquet")
+    save_parquet(_typed_sales(1), "sales.parquet")
+    assert list(load_parquet("data/processed/sales.parquet")["Transaction ID"]) == ["TXN_0"]
+
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_feather_round_trip_keeps_dtypes(tmp_path, monkeypatch, memory_map):
+    monkeypatch.chdir(tmp_path)
+    df = _typed_sales(7)
+    df.loc[3, "Total Spent"] = None
+    save_feather(df, "sales.feather")
+
+    loaded = load_feather("data/processed/sales.feather", memory_map=memory_map)
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+    assert isinstance(loaded["Location"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(loaded["Transaction Date"])
+
+    subset = load_data("feather", "data/processed/sales.feather")[["Transaction ID", "Total Spent"]]
+    assert load_feather("data/processed/sales.feather", columns=["Transaction ID", "Total Spent"]).equals(subset)
+
+
+def test_save_csv_append_is_logged(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    save_csv(pd.DataFrame({"id": ["a"]}), "sales.csv")
+    save_csv(pd.DataFrame({"id": ["b", "c"]}), "sales.csv", append=True)
+    assert pd.read_csv("data/processed/sales.csv")["id"].tolist() == ["a", "b", "c"]
+    assert "[SUCCESS] CSV appended → data/processed/sales.csv (+2 rows)" in capsys.readouterr().out
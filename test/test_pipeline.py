@@ -0,0 +1,219 @@
+import json
+import os
+from functools import partial
+
+import pandas as pd
+import pytest
+
+import src.pipeline as pipeline
+from src.clean_data import auto_handle_missing, repair_sales_consistency
+from src.incremental import HashIndex, PendingRun, read_delta, save_aggregates
+from src.load_data import CAFE_SALES_SCHEMA, load_data
+from src.pipeline import run_incremental, run_streaming
+from src.rollup import ROLLUP_PATH, RollupCube
+
+RAW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                   "data", "raw", "dirty_cafe_sales.csv")
+
+
+def _raw_lines(start, stop):
+    with open(RAW, encoding="utf-8") as f:
+        return f.readlines()[start:stop]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory holding the first 50 raw rows."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("raw")
+    with open("raw/sales.csv", "w", encoding="utf-8") as f:
+        f.writelines(_raw_lines(0, 51))
+    return tmp_path
+
+
+def _append_rows(start, stop):
+    with open("raw/sales.csv", "a", encoding="utf-8") as f:
+        f.writelines(_raw_lines(start, stop))
+
+
+def _run():
+    return run_incremental("raw/sales.csv", "sales.csv", "sales.json", state_dir="state")
+
+
+def _outputs():
+    csv = pd.read_csv("data/processed/sales.csv")
+    with open("data/processed/sales.json", encoding="utf-8") as f:
+        records = json.load(f)
+    return csv, records
+
+
+def test_hash_index_keeps_rows_without_a_key(tmp_path):
+    index = HashIndex(str(tmp_path / "keys.npy")).clear()
+    keys = pd.Series(["a", None, None, "a", "nan"])
+    assert index.new_rows(keys).tolist() == [True, True, True, False, True]
+    index.add(keys)
+    assert index.new_rows(pd.Series(["a", None, "nan", "b"])).tolist() == [False, True, False, True]
+
+    index.add(pd.Series(["c", "b", "a"]))
+    assert len(index) == 4 and (index.hashes[1:] > index.hashes[:-1]).all()   # "a", "nan", "b", "c"
+    assert index.new_rows(pd.Series(["a", "b", "c", "d"])).tolist() == [False, False, False, True]
+
+
+def test_read_delta_streams_complete_rows_from_the_offset(workdir):
+    expected = load_data("csv", "raw/sales.csv", schema=CAFE_SALES_SCHEMA)
+    df, offset = read_delta("raw/sales.csv", 0, CAFE_SALES_SCHEMA, chunksize=7)
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False)
+    assert offset == os.path.getsize("raw/sales.csv")
+
+    # A half-written last line is left for the next run.
+    line = _raw_lines(51, 52)[0]
+    with open("raw/sales.csv", "a", encoding="utf-8") as f:
+        f.write(line[:10])
+    empty, same = read_delta("raw/sales.csv", offset, CAFE_SALES_SCHEMA)
+    assert empty.empty and same == offset
+    with open("raw/sales.csv", "a", encoding="utf-8") as f:
+        f.write(line[10:])
+    df, end = read_delta("raw/sales.csv", offset, CAFE_SALES_SCHEMA)
+    assert df["Transaction ID"].tolist() == [line.split(",")[0]]
+    assert end == os.path.getsize("raw/sales.csv")
+
+
+def _fail_commit(self, state):
+    raise KeyboardInterrupt
+
+
+def _fail_json(df, filename):
+    raise KeyboardInterrupt
+
+
+def _fail_save(self, path=None):
+    raise KeyboardInterrupt
+
+
+@pytest.mark.parametrize("where", ["state", "outputs", "commit"])
+def test_interrupted_run_is_finished_without_duplicates(workdir, monkeypatch, where):
+    assert _run() == 50
+    _append_rows(51, 81)
+
+    with monkeypatch.context() as patch:
+        if where == "state":
+            patch.setattr(HashIndex, "save", _fail_save)
+        elif where == "outputs":
+            patch.setattr(pipeline, "append_json_records", _fail_json)
+        else:
+            patch.setattr(PendingRun, "commit", _fail_commit)
+        with pytest.raises(KeyboardInterrupt):
+            _run()
+    # Interrupted before the journal was written, the run is simply redone.
+    assert PendingRun("state").exists() == (where != "state")
+
+    assert _run() == (30 if where == "state" else 0)
+    assert not PendingRun("state").exists()
+    csv, records = _outputs()
+    assert len(csv) == len(records) == 80
+    assert csv["Transaction ID"].is_unique
+
+    _append_rows(81, 91)
+    assert _run() == 10
+    csv, records = _outputs()
+    assert len(csv) == len(records) == 90
+    assert csv["Transaction ID"].is_unique
+    by_location = pd.read_csv("data/processed/sales_by_location.csv")
+    assert by_location["Total Spent_count"].sum() == 90
+    assert RollupCube.load(ROLLUP_PATH).query("month")["rows"].sum() == 90
+
+
+@pytest.mark.parametrize("damage", ["missing", "old_version"])
+def test_resumed_run_rebuilds_a_missing_rollup_cube(workdir, damage):
+    _run()
+    if damage == "missing":
+        os.remove(ROLLUP_PATH)
+    else:
+        save_aggregates(ROLLUP_PATH, {"version": 0})
+    _append_rows(51, 81)
+    assert _run() == 30
+
+    csv, _ = _outputs()
+    expected = RollupCube().update(csv).query("month", by=["Location"])
+    result = RollupCube.load(ROLLUP_PATH).query("month", by=["Location"])
+    assert result["rows"].sum() == 80
+    pd.testing.assert_frame_equal(result, expected)
+
+
+
+def test_streaming_learns_item_prices_from_every_chunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("raw.csv", "w", encoding="utf-8") as f:
+        f.write("Transaction ID,Item,Quantity,Price Per Unit,Total Spent,Payment Method,Location,"
+                "Transaction Date\n"
+                "T1,Coffee,2,2.0,4.0,Cash,Takeaway,2023-01-01\n"
+                "T2,Tea,1,1.5,1.5,Cash,In-store,2023-01-02\n"
+                "T3,Salad,1,5.0,5.0,Cash,Takeaway,2023-01-03\n"
+                "T4,Salad,3,ERROR,,Cash,Takeaway,2023-01-04\n")
+    run_streaming("raw.csv", "out.csv", "out.json", chunksize=2)
+    out = pd.read_csv("data/processed/out.csv")
+    assert out.loc[3, "Price Per Unit"] == 5.0
+    assert out.loc[3, "Total Spent"] == 15.0
+
+
+def test_streaming_matches_the_in_memory_clean(workdir):
+    with open("raw/sales.csv", "w", encoding="utf-8") as f:
+        f.writelines(_raw_lines(0, 3_001))
+    imputer = run_streaming("raw/sales.csv", "streamed.csv", "streamed.json", chunksize=700)
+
+    df = load_data("csv", "raw/sales.csv", schema=CAFE_SALES_SCHEMA)
+    expected = auto_handle_missing(repair_sales_consistency(df)[0])
+    streamed = pd.read_csv("data/processed/streamed.csv")
+    assert len(streamed) == 3_000 and "Item" in imputer.fill_values
+    with open("data/processed/streamed.json", encoding="utf-8") as f:
+        assert len(json.load(f)) == 3_000
+
+    expected.to_csv("expected.csv", index=False)
+    pd.testing.assert_frame_equal(streamed, pd.read_csv("expected.csv"), check_exact=False)
+
+
+def _record(order, name, *values):
+    order.append(name)
+    return name
+
+
+def test_pipeline_runs_stages_after_their_inputs():
+    order = []
+    p = pipeline.Pipeline()
+    # Declared out of order on purpose.
+    p.add("report", partial(_record, order, "report"), inputs=["left", "right"], outputs=["done"])
+    p.add("right", partial(_record, order, "right"), inputs=["raw"], outputs=["right"], kind="thread")
+    p.add("left", partial(_record, order, "left"), inputs=["raw"], outputs=["left"], kind="thread")
+    p.add("load", partial(_record, order, "load"), outputs=["raw"])
+    values = p.run()
+
+    assert order[0] == "load" and order[-1] == "report"
+    assert values["done"] == "report"
+    path, _ = p.critical_path()
+    assert path[0] == "load" and path[-1] == "report"
+
+
+def test_pipeline_rejects_bad_graphs():
+    p = pipeline.Pipeline()
+    p.add("a", partial(_record, [], "a"), inputs=["b_out"], outputs=["a_out"])
+    p.add("b", partial(_record, [], "b"), inputs=["a_out"], outputs=["b_out"])
+    with pytest.raises(ValueError, match="cycle"):
+        p.run()
+
+    p = pipeline.Pipeline().add("a", partial(_record, [], "a"), inputs=["missing"])
+    with pytest.raises(ValueError, match="nothing produces"):
+        p.run()
+    with pytest.raises(ValueError, match="Duplicate"):
+        p.add("a", partial(_record, [], "a"))
+
+
+def _double(value):
+    return value * 2
+
+
+def test_pipeline_stores_multiple_outputs_and_runs_processes():
+    p = pipeline.Pipeline(max_processes=1)
+    p.add("split", lambda: (1, 2), outputs=["a", "b"])
+    p.add("double", _double, inputs=["b"], outputs=["c"], kind="process")
+    values = p.run(initial={"seed": 0})
+    assert (values["a"], values["b"], values["c"], values["seed"]) == (1, 2, 4, 0)
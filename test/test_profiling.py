@@ -0,0 +1,56 @@
+import json
+import pstats
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import profiling
+from src.analyze_data import summary_statistics
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    directory = tmp_path / "profiles"
+    profiling.enable(str(directory), top=5)
+    yield directory
+    profiling.disable()
+    profiling._PROFILES.clear()
+
+
+def _build(n):
+    blocks = [np.arange(n, dtype=np.float64) for _ in range(4)]
+    return pd.DataFrame({f"c{i}": block for i, block in enumerate(blocks)})
+
+
+def test_stage_profiles_are_written(profile_dir, capsys):
+    with profiling.profile_stage("analyze"):
+        df = _build(200_000)
+        summary_statistics(df)       # instrumented, nested: part of "analyze"
+    summary_statistics(df.head(10))  # instrumented, outside any stage: its own profile
+
+    summaries = {s["stage"]: s for s in profiling.flush()}
+    assert set(summaries) == {"analyze", "analyze_data.summary_statistics"}
+    assert "[SUCCESS] Profiles saved" in capsys.readouterr().out
+
+    analyze = summaries["analyze"]
+    assert analyze["calls"] == 1 and analyze["peak_bytes"] >= 4 * 200_000 * 8
+    assert 0 < len(analyze["top_allocators"]) <= 5
+    with open(profile_dir / "analyze.memory.json", encoding="utf-8") as f:
+        assert json.load(f) == analyze
+
+    functions = {name for _, _, name in pstats.Stats(str(profile_dir / "analyze.pstats")).stats}
+    assert "_build" in functions and "summary_statistics" in functions
+    with open(profile_dir / "analyze.collapsed", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.startswith("analyze;") for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("summary_statistics" in line for line in lines)
+
+
+def test_disabled_profiling_records_nothing(tmp_path):
+    assert not profiling.ENABLED
+    with profiling.profile_stage("analyze"):
+        summary_statistics(_build(10))
+    assert profiling._PROFILES == {} and profiling.flush() == []
+    assert not (tmp_path / "profiles").exists()
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import DIRT_PROFILE, ITEM_PRICES, generate_sales, parse_rows, write_sales_csv
+from src.load_data import CAFE_SALES_SCHEMA, load_data
+
+
+def test_parse_rows():
+    assert parse_rows("10k") == 10_000
+    assert parse_rows("1M") == 1_000_000
+    assert parse_rows("2_500") == 2_500
+    assert parse_rows(1e3) == 1_000
+
+
+def test_generator_is_determined_by_the_seed():
+    pd.testing.assert_frame_equal(generate_sales(500, seed=3), generate_sales(500, seed=3))
+    assert not generate_sales(500, seed=3).equals(generate_sales(500, seed=4))
+
+
+def test_chunked_file_matches_the_raw_schema_and_dirt_profile(tmp_path):
+    path = write_sales_csv(str(tmp_path / "sales.csv"), 30_000, seed=1, chunk_rows=7_000)
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    assert len(raw) == 30_000
+    assert raw["Transaction ID"].is_unique
+
+    for column, (empty, error, unknown) in DIRT_PROFILE.items():
+        shares = raw[column].value_counts(normalize=True)
+        for token, expected in (("", empty), ("ERROR", error), ("UNKNOWN", unknown)):
+            assert shares.get(token, 0.0) == pytest.approx(expected, abs=0.01), (column, token)
+
+    df = load_data("csv", path, schema=CAFE_SALES_SCHEMA)
+    clean = df.dropna(subset=["Item", "Price Per Unit"])
+    assert (clean["Price Per Unit"] == clean["Item"].astype(object).map(ITEM_PRICES)).all()
+    assert df["Transaction Date"].dropna().dt.year.eq(2023).all()
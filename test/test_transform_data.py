@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.transform_data import (GroupByAccumulator, add_new_column, col, external_sort, filter_rows, lit,
+                                sort_csv, standardize_date_column)
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(7)
+    n = 2_000
+    df = pd.DataFrame({
+        "Location": rng.choice(["Takeaway", "In-store", None], n),
+        "Item": rng.choice(["Coffee", "Tea", "Cake", "Salad"], n),
+        "Quantity": rng.integers(1, 6, n).astype("float64"),
+        "Total Spent": rng.normal(10, 4, n).round(1),
+    })
+    df.loc[rng.random(n) < 0.1, "Quantity"] = np.nan
+    df.loc[rng.random(n) < 0.1, "Total Spent"] = np.nan
+    return df
+
+
+def test_filter_rows_expr_matches_boolean_mask(sales):
+    condition = ((col("Quantity") >= 3) & col("Location").isin(["Takeaway"])) | col("Total Spent").isna()
+    expected = sales[((sales["Quantity"] >= 3) & (sales["Location"] == "Takeaway"))
+                     | sales["Total Spent"].isna()].reset_index(drop=True)
+    pd.testing.assert_frame_equal(filter_rows(sales, condition), expected)
+
+
+def test_filter_rows_expr_matches_per_row_callable(sales):
+    condition = (col("Total Spent") / col("Quantity")).between(2, lit(4)) & ~(col("Item") == "Tea")
+    by_row = filter_rows(sales, lambda row: 2 <= row["Total Spent"] / row["Quantity"] <= 4
+                         and row["Item"] != "Tea")
+    pd.testing.assert_frame_equal(filter_rows(sales, condition), by_row)
+    assert condition.columns() == {"Total Spent", "Quantity", "Item"}
+
+
+def test_add_new_column_expr_matches_per_row_callable(sales):
+    by_expr = add_new_column(sales.copy(), "Unit Total", col("Quantity") * col("Total Spent") - 1)
+    by_row = add_new_column(sales.copy(), "Unit Total", lambda row: row["Quantity"] * row["Total Spent"] - 1)
+    pd.testing.assert_series_equal(by_expr["Unit Total"], by_row["Unit Total"].astype("float64"))
+
+
+def test_standardize_date_column_parses_each_distinct_value():
+    df = pd.DataFrame({"Transaction Date": ["2023-01-05", "05/01/2023", None, "2023-01-05"]})
+    result = standardize_date_column(df, "Transaction Date")
+    assert result["Transaction Date"].tolist()[:2] == ["2023-01-05", "2023-05-01"]
+    assert pd.isna(result["Transaction Date"].iat[2]) and result["Transaction Date"].iat[3] == "2023-01-05"
+
+    dates = pd.DataFrame({"d": pd.to_datetime(["2023-02-01", None])})
+    assert standardize_date_column(dates, "d")["d"].iat[0] == "2023-02-01"
+
+
+@pytest.mark.parametrize("by, ascending", [
+    ("Quantity", True),
+    ("Total Spent", False),
+    (["Item", "Quantity"], [True, False]),
+])
+@pytest.mark.parametrize("na_position", ["last", "first"])
+def test_external_sort_matches_sort_values(sales, tmp_path, by, ascending, na_position):
+    chunks = [sales.iloc[start:start + 300] for start in range(0, len(sales), 300)]
+    blocks = list(external_sort(iter(chunks), by, ascending, na_position,
+                                block_rows=64, tmp_dir=str(tmp_path)))
+    expected = sales.sort_values(by, ascending=ascending, na_position=na_position,
+                                 kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.concat(blocks, ignore_index=True), expected)
+    assert not list(tmp_path.iterdir())   # spilled runs are removed
+
+
+def _mixed_csv(path, rows=5_000):
+    """IDs and quantities whose inferred type differs between chunks."""
+    rng = np.random.default_rng(5)
+    ids = [str(i) if i < 2_000 else f"TXN_{i}" for i in range(rows)]
+    quantity = rng.integers(1, 6, rows).astype(object)
+    quantity[3_000:3_100] = "ERROR"
+    quantity[4_000:4_050] = "2.5"
+    pd.DataFrame({"Transaction ID": rng.permutation(ids), "Quantity": quantity,
+                  "Location": rng.choice(["Takeaway", "In-store", "UNKNOWN"], rows)}).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("column", ["Transaction ID", "Quantity", ["Location", "Quantity"]])
+def test_sort_csv_out_of_core_matches_in_memory(tmp_path, column):
+    source = _mixed_csv(str(tmp_path / "raw.csv"))
+    sort_csv(source, str(tmp_path / "memory.csv"), column)
+    sort_csv(source, str(tmp_path / "external.csv"), column, memory_budget_mb=0.01)
+
+    external = pd.read_csv(tmp_path / "external.csv", dtype={"Transaction ID": str})
+    pd.testing.assert_frame_equal(external, pd.read_csv(tmp_path / "memory.csv", dtype={"Transaction ID": str}))
+    assert len(external) == 5_000
+    assert external["Quantity"].isna().sum() == 100
+    keys = [column] if isinstance(column, str) else column
+    pd.testing.assert_frame_equal(external[keys], external[keys].sort_values(keys, kind="stable")
+                                  .reset_index(drop=True))
+
+
+def test_group_by_accumulator_merge_matches_pandas(sales):
+    aggs = {"Total Spent": ["sum", "count", "mean", "min", "max", "var", "std"],
+            "Item": ["nunique"]}
+    parts = [GroupByAccumulator("Location", aggs).update(sales.iloc[start:start + 700])
+             for start in range(0, len(sales), 700)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    result = merged.result().sort_values("Location").reset_index(drop=True)
+
+    expected = sales.groupby("Location").agg(aggs)
+    expected.columns = [f"{column}_{func}" for column, func in expected.columns]
+    expected = expected.reset_index()
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_group_by_accumulator_rejects_different_specs():
+    a = GroupByAccumulator("Location", {"Total Spent": "sum"})
+    with pytest.raises(ValueError):
+        a.merge(GroupByAccumulator("Item", {"Total Spent": "sum"}))
+    with pytest.raises(ValueError):
+        GroupByAccumulator("Location", {"Total Spent": "median"})
+
+
+def test_group_by_accumulator_multi_key_update_in_chunks(sales):
+    aggs = {"Quantity": ["sum", "mean", "count"]}
+    accumulator = GroupByAccumulator(["Location", "Item"], aggs)
+    for start in range(0, len(sales), 300):
+        accumulator.update(sales.iloc[start:start + 300])
+    result = accumulator.result().sort_values(["Location", "Item"]).reset_index(drop=True)
+
+    expected = sales.groupby(["Location", "Item"]).agg(aggs)
+    expected.columns = [f"{column}_{func}" for column, func in expected.columns]
+    pd.testing.assert_frame_equal(result, expected.reset_index(), check_dtype=False)
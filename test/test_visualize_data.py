@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualize_data import lttb_downsample, plot_filename, prepare_plot_data, render_plots
+
+TASKS = [
+    {"type": "bar", "x": "Location", "y": "Total Spent"},
+    {"type": "line", "x": "Transaction Date", "y": "Total Spent"},
+    {"type": "hist", "col": "Total Spent", "bins": 10},
+]
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(4)
+    n = 5_000
+    return pd.DataFrame({
+        "Location": pd.Categorical(rng.choice(["Takeaway", "In-store"], n)),
+        "Total Spent": np.where(rng.random(n) < 0.05, np.nan, rng.normal(10, 3, n)),
+        "Transaction Date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2_000, n), "D"),
+    })
+
+
+def test_prepared_specs_hold_reduced_data(sales):
+    bar = prepare_plot_data(sales, TASKS[0])
+    expected = sales.groupby("Location", observed=True)["Total Spent"].mean()
+    assert dict(zip(bar["x_values"], bar["y_values"])) == pytest.approx(
+        dict(zip(expected.index.astype(str), expected.to_numpy())))
+
+    line = prepare_plot_data(sales, TASKS[1], max_points=200)
+    days = sales.groupby("Transaction Date")["Total Spent"].mean().sort_index()
+    assert len(line["x_values"]) == 200
+    assert line["x_values"][0] == days.index[0] and line["x_values"][-1] == days.index[-1]
+
+    hist = prepare_plot_data(sales, TASKS[2])
+    assert hist["counts"].sum() == sales["Total Spent"].notna().sum()
+    with pytest.raises(ValueError):
+        prepare_plot_data(sales, {"type": "pie"})
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(10_000)
+    y = np.sin(x / 500)
+    y[6_123] = 50.0
+    xs, ys = lttb_downsample(x, y, 100)
+    assert len(xs) == 100 and 6_123 in xs and ys.max() == 50.0
+    assert len(lttb_downsample(x[:50], y[:50], 100)[0]) == 50   # short series are kept whole
+
+
+def test_render_plots_saves_each_plot_once_without_showing(sales, tmp_path, monkeypatch):
+    plt = pytest.importorskip("matplotlib.pyplot")
+    pytest.importorskip("seaborn")
+    monkeypatch.chdir(tmp_path)
+
+    def no_show(*args, **kwargs):
+        raise AssertionError("plt.show() called in batch mode")
+
+    monkeypatch.setattr(plt, "show", no_show)
+    saved = []
+    original = plt.Figure.savefig
+    monkeypatch.setattr(plt.Figure, "savefig", lambda fig, path, **kw: (saved.append(path),
+                                                                      original(fig, path, **kw)))
+    paths = render_plots(sales, TASKS + [{"type": "bar", "x": "Missing", "y": "Total Spent"}],
+                         processes=0, dpi=50)
+
+    assert paths == [os.path.join("plots", plot_filename(task)) for task in TASKS]
+    assert sorted(saved) == sorted(paths)
+    assert all(os.path.getsize(path) > 0 for path in paths)
+    assert plt.get_fignums() == []